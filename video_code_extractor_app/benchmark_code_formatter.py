@@ -0,0 +1,224 @@
+"""Benchmark of the tokenizer-driven formatter against the old per-language loops.
+
+The old formatters (legacy_format_code, kept here only for comparison)
+scanned each line with str methods and, for SQL, ran one re.sub per
+keyword per line. Snippets are generated from per-language templates cut
+to the size of an OCR capture, with their indentation lost as EasyOCR's
+detail=0 output loses it. Prints microseconds per snippet for both, and
+how many snippets the two format differently.
+
+    python benchmark_code_formatter.py [--snippets N]
+"""
+import argparse
+import random
+import re
+import time
+
+from code_formatter import format_code
+
+SEED = 1234
+# Snippets generated per language
+DEFAULT_SNIPPETS = 2000
+# Lines per generated snippet, about one screen of code
+SNIPPET_LINES = (10, 40)
+
+TEMPLATES = {
+    "Python": [
+        "def {name}(items, limit=10):",
+        "    result = []",
+        "    for item in items:",
+        "        if item.{attribute} > limit:",
+        "            result.append({{\"{name}\": item}})",
+        "        elif item is None:",
+        "            continue",
+        "        else:",
+        "            result.append(item)",
+        "    return result",
+        "class {Name}(Base):",
+        "    def __init__(self, value):",
+        "        self.{attribute} = value",
+    ],
+    "JavaScript": [
+        "function {name}(items) {{",
+        "    const result = [];",
+        "    for (const item of items) {{",
+        "        if (item.{attribute}) {{",
+        "            result.push(`${{item}}`);",
+        "        }}",
+        "    }}",
+        "    return result;",
+        "}}",
+    ],
+    "HTML": [
+        "<div class=\"{name}\">",
+        "    <ul>",
+        "        <li><a href=\"/{attribute}\">{Name}</a></li>",
+        "        <li><img src=\"{name}.png\"/></li>",
+        "    </ul>",
+        "    <br>",
+        "</div>",
+    ],
+    "CSS": [
+        ".{name} {{",
+        "    color: #333;",
+        "    margin: 0 auto;",
+        "}}",
+        "#{attribute} a:hover {{",
+        "    text-decoration: underline;",
+        "}}",
+    ],
+    "SQL": [
+        "select {name}.id, count(*) as total",
+        "from {name} left join orders on {name}.id = orders.{attribute}",
+        "where {attribute} is not null and total between 1 and 10",
+        "group by {name}.id order by total",
+        "insert into {name} values (1, '{Name}')",
+        "update {name} set {attribute} = 2 where id in (1, 2)",
+    ],
+}
+
+WORDS = ["user", "order", "item", "price", "name", "total", "account", "event", "message", "record"]
+
+def generate_snippets(language, count, rng):
+    """count snippets of one language, with their indentation lost."""
+    template = TEMPLATES[language]
+    snippets = []
+    for _ in range(count):
+        lines = []
+        while len(lines) < rng.randint(*SNIPPET_LINES):
+            name, attribute = rng.choice(WORDS), rng.choice(WORDS)
+            lines.extend(line.format(name=name, Name=name.title(), attribute=attribute).strip()
+                         for line in template)
+        snippets.append("\n".join(lines))
+    return snippets
+
+def legacy_format_python(code):
+    formatted_lines = []
+    indent_level = 0
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            formatted_lines.append("")
+            continue
+        if stripped.endswith(":"):
+            formatted_lines.append("    " * indent_level + stripped)
+            indent_level += 1
+        elif stripped.startswith(("elif ", "else:", "except ", "finally:")):
+            indent_level = max(indent_level - 1, 0)
+            formatted_lines.append("    " * indent_level + stripped)
+            indent_level += 1
+        elif stripped.startswith(("}", ")")):
+            indent_level = max(indent_level - 1, 0)
+            formatted_lines.append("    " * indent_level + stripped)
+        else:
+            formatted_lines.append("    " * indent_level + stripped)
+    return "\n".join(formatted_lines)
+
+def legacy_format_javascript(code):
+    formatted_lines = []
+    indent_level = 0
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            formatted_lines.append("")
+            continue
+        if stripped.endswith("{"):
+            formatted_lines.append("    " * indent_level + stripped)
+            indent_level += 1
+        elif stripped.startswith("}"):
+            indent_level = max(indent_level - 1, 0)
+            formatted_lines.append("    " * indent_level + stripped)
+        else:
+            formatted_lines.append("    " * indent_level + stripped)
+    return "\n".join(formatted_lines)
+
+def legacy_format_html(code):
+    formatted_lines = []
+    indent_level = 0
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            formatted_lines.append("")
+            continue
+        if stripped.startswith("</"):
+            indent_level = max(indent_level - 1, 0)
+        formatted_lines.append("    " * indent_level + stripped)
+        if stripped.endswith(">") and not stripped.startswith("</") and not stripped.endswith("/>"):
+            indent_level += 1
+    return "\n".join(formatted_lines)
+
+def legacy_format_css(code):
+    formatted_lines = []
+    in_block = False
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            formatted_lines.append("")
+            continue
+        if "{" in stripped and "}" not in stripped:
+            formatted_lines.append(stripped)
+            in_block = True
+        elif "}" in stripped and "{" not in stripped:
+            formatted_lines.append("    " + stripped if in_block else stripped)
+            in_block = False
+        elif in_block:
+            formatted_lines.append("    " + stripped)
+        else:
+            formatted_lines.append(stripped)
+    return "\n".join(formatted_lines)
+
+def legacy_format_sql(code):
+    keywords = [
+        "SELECT", "FROM", "WHERE", "GROUP BY", "ORDER BY", "HAVING",
+        "JOIN", "LEFT JOIN", "RIGHT JOIN", "INNER JOIN", "OUTER JOIN",
+        "ON", "AND", "OR", "NOT", "IN", "BETWEEN", "LIKE", "IS NULL",
+        "IS NOT NULL", "AS", "INSERT INTO", "VALUES", "UPDATE", "SET",
+        "DELETE FROM", "CREATE TABLE", "ALTER TABLE", "DROP TABLE"
+    ]
+    formatted_lines = []
+    for line in code.splitlines():
+        formatted_line = line.strip()
+        for keyword in keywords:
+            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
+            formatted_line = re.sub(pattern, keyword, formatted_line, flags=re.IGNORECASE)
+        formatted_lines.append(formatted_line)
+    return "\n".join(formatted_lines)
+
+LEGACY_FORMATTERS = {
+    "Python": legacy_format_python,
+    "JavaScript": legacy_format_javascript,
+    "HTML": legacy_format_html,
+    "CSS": legacy_format_css,
+    "SQL": legacy_format_sql,
+}
+
+def legacy_format_code(code, language):
+    """The per-language formatting used before code_formatter, for comparison."""
+    formatter = LEGACY_FORMATTERS.get(language)
+    if formatter is None:
+        return "\n".join(line.strip() for line in code.splitlines())
+    return formatter(code)
+
+def _time_per_snippet(format_function, snippets, language):
+    start = time.perf_counter()
+    outputs = [format_function(snippet, language) for snippet in snippets]
+    return (time.perf_counter() - start) / len(snippets) * 1e6, outputs
+
+def benchmark(snippet_count=DEFAULT_SNIPPETS):
+    """Print the speed of both formatters per language and how often their output differs."""
+    rng = random.Random(SEED)
+    print(f"{snippet_count} snippets per language")
+    print(f"{'':12}{'legacy us':>12}{'current us':>12}{'speedup':>10}{'differ':>10}")
+    for language in TEMPLATES:
+        snippets = generate_snippets(language, snippet_count, rng)
+        legacy_us, legacy_outputs = _time_per_snippet(legacy_format_code, snippets, language)
+        current_us, current_outputs = _time_per_snippet(format_code, snippets, language)
+        differ = sum(1 for old, new in zip(legacy_outputs, current_outputs) if old != new)
+        print(f"{language:12}{legacy_us:12.1f}{current_us:12.1f}{legacy_us / current_us:9.1f}x"
+              f"{differ / len(snippets):10.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the code formatter against the old per-language loops")
+    parser.add_argument("--snippets", type=int, default=DEFAULT_SNIPPETS, help="Snippets generated per language")
+    args = parser.parse_args()
+    benchmark(args.snippets)
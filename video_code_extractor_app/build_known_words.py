@@ -0,0 +1,84 @@
+"""Generation of known_words.txt, the words spelling correction leaves alone.
+
+Words are taken from the .py, .txt and .rst files under the given
+directories (by default the Python standard library's sources and
+documentation): whole identifiers and their camelCase parts, lowercased,
+of the lengths spelling correction looks at. Only words occurring at least
+--min-count times are listed, and tokens that cannot be words are dropped
+(runs of one letter such as "aaaaa", no vowel, alphabet runs such as
+"abcdef", a part repeated three times such as "abcabcabc"), so
+misspellings, test data and encoded blobs in the sources stay out.
+Misreads in the substitution table are never listed.
+
+    python build_known_words.py [--dir DIR ...] [--min-count N]
+"""
+import argparse
+import os
+import re
+import sysconfig
+
+from ocr_corrections import DEFAULT_SUBSTITUTIONS, KNOWN_WORDS_FILE, MAX_CORRECTED_LENGTH, MIN_CORRECTED_LENGTH
+
+# Occurrences a word needs in the sources to be listed
+DEFAULT_MIN_COUNT = 3
+SOURCE_EXTENSIONS = (".py", ".txt", ".rst")
+# Tokens of the sources, and their words split at camelCase humps
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+")
+SOURCE_WORD_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+")
+VOWEL_PATTERN = re.compile(r"[aeiouy]")
+# Test data rather than words: a letter three times in a row ("aaaaa"), four
+# consecutive letters of the alphabet ("abcdefg") or a part repeated three times ("ababab")
+TEST_DATA_PATTERN = re.compile(
+    r"(.)\1\1|(..+)\2\2|" + "|".join("abcdefghijklmnopqrstuvwxyz"[start:start + 4] for start in range(23))
+)
+
+def is_plausible_word(word):
+    """Whether a lowercased token can be a word rather than test data or an encoded blob."""
+    return VOWEL_PATTERN.search(word) is not None and not TEST_DATA_PATTERN.search(word)
+
+def count_words(directories):
+    """{lowercased word: occurrences} of the words of corrected length in the sources under directories."""
+    counts = {}
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if not name.endswith(SOURCE_EXTENSIONS):
+                    continue
+                with open(os.path.join(root, name), encoding="utf-8", errors="ignore") as f:
+                    for token in TOKEN_PATTERN.findall(f.read()):
+                        # Whole identifiers and their parts, e.g. "charfield", "char" and "field"
+                        parts = SOURCE_WORD_PATTERN.findall(token)
+                        for word in set([token] + parts) if len(parts) > 1 else [token]:
+                            if MIN_CORRECTED_LENGTH <= len(word) <= MAX_CORRECTED_LENGTH:
+                                word = word.lower()
+                                counts[word] = counts.get(word, 0) + 1
+    return counts
+
+def build_known_words(directories, path=KNOWN_WORDS_FILE, min_count=DEFAULT_MIN_COUNT, header=None):
+    """Write the known words of the sources under directories to path; returns their number.
+
+    header is written first as a # comment, which load_known_words skips.
+    """
+    misreads = {key.lower() for key in DEFAULT_SUBSTITUTIONS}
+    words = sorted(
+        word for word, count in count_words(directories).items()
+        if count >= min_count and word not in misreads and is_plausible_word(word)
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        if header:
+            f.write(f"# {header}\n")
+        f.write("\n".join(words) + "\n")
+    return len(words)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the list of words spelling correction leaves alone")
+    parser.add_argument("--dir", action="append", default=[],
+                        help="Directory of sources and docs to take words from (default: the standard library)")
+    parser.add_argument("--min-count", type=int, default=DEFAULT_MIN_COUNT)
+    parser.add_argument("--output", default=KNOWN_WORDS_FILE)
+    args = parser.parse_args()
+    directories = args.dir or [sysconfig.get_paths()["stdlib"]]
+    header = (f"Generated by build_known_words.py with --min-count {args.min_count} "
+              f"from {' '.join(args.dir) if args.dir else 'the Python standard library'}; do not edit")
+    count = build_known_words(directories, args.output, args.min_count, header)
+    print(f"Wrote {count} known words to {args.output}")
@@ -0,0 +1,275 @@
+"""Code-versus-prose classifier for OCR results.
+
+Every text is turned into a fixed-length feature vector in one pass over
+its UTF-8 bytes with NumPy: character-class ratios, a histogram of the
+symbols code uses, line statistics and hashed character trigrams. A
+logistic regression over those features decides whether the text is
+code. The weights are trained offline by train_code_classifier.py and
+shipped as CLASSIFIER_FILE; scoring many texts at once is a single matrix
+product. Extraction classifies one text per frame, so single texts take
+a shorter path (extract_features) with a handful of NumPy calls.
+"""
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+CLASSIFIER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_classifier.json")
+# Probability above which a text counts as code, unless the weights file sets its own
+DEFAULT_THRESHOLD = 0.5
+
+SYMBOLS = b"{}[]()<>;:=+-*/%&|!^~?,.\"'`#@$\\_"
+NGRAM_BUCKETS = 256
+LINE_ENDINGS = b";{}:),"
+
+_SYMBOL_INDEX = np.frombuffer(SYMBOLS, dtype=np.uint8)
+_LINE_ENDING_INDEX = np.frombuffer(LINE_ENDINGS, dtype=np.uint8)
+_UPPER = np.zeros(256, dtype=bool)
+_UPPER[ord("A"):ord("Z") + 1] = True
+_LOWER = np.zeros(256, dtype=bool)
+_LOWER[ord("a"):ord("z") + 1] = True
+_DIGIT = np.zeros(256, dtype=bool)
+_DIGIT[ord("0"):ord("9") + 1] = True
+_NON_ASCII = np.zeros(256, dtype=bool)
+_NON_ASCII[128:] = True
+# Lowercase letter followed by one of these counts as camelCase or snake_case
+_JOIN_NEXT = _UPPER.copy()
+_JOIN_NEXT[ord("_")] = True
+
+FEATURE_NAMES = (
+    ["upper", "lower", "digit", "space", "newline", "non_ascii", "symbols"]
+    + [f"symbol {chr(symbol)}" for symbol in SYMBOLS]
+    + ["log_length", "log_lines", "mean_line_length", "line_length_spread", "indented_lines",
+       "short_lines", "camel_or_snake"]
+    + [f"line end {chr(ending)}" for ending in LINE_ENDINGS]
+    + [f"trigram {bucket}" for bucket in range(NGRAM_BUCKETS)]
+)
+FEATURE_COUNT = len(FEATURE_NAMES)
+
+# Character class and symbol features each byte value counts towards, so that one
+# product with a text's byte histogram yields all of them
+_CLASS_FEATURES = 7 + len(SYMBOLS)
+_CLASS_MATRIX = np.zeros((256, _CLASS_FEATURES))
+for _column, _members in enumerate((_UPPER, _LOWER, _DIGIT, [ord(" ")], [ord("\n")], _NON_ASCII, _SYMBOL_INDEX)):
+    _CLASS_MATRIX[_members, _column] = 1
+for _column, _symbol in enumerate(SYMBOLS, 7):
+    _CLASS_MATRIX[_symbol, _column] = 1
+
+def extract_features(text):
+    """Feature vector of one text, see FEATURE_NAMES; equal to extract_batch([text])[0].
+
+    Line statistics are computed in plain Python, which is faster than
+    NumPy for the few lines of one text.
+    """
+    features = np.zeros(FEATURE_COUNT, dtype=np.float32)
+    encoded = text.encode("utf-8")
+    length = len(encoded)
+    if not length:
+        return features
+    data = np.frombuffer(encoded, dtype=np.uint8)
+    features[:_CLASS_FEATURES] = np.bincount(data, minlength=256) @ _CLASS_MATRIX / length
+    position = _CLASS_FEATURES
+
+    # A trailing newline ends the last line rather than starting an empty one
+    lines = encoded.split(b"\n")
+    if encoded.endswith(b"\n"):
+        lines.pop()
+    content = [line for line in lines if line]
+    features[position] = math.log1p(length) / 10
+    features[position + 1] = math.log1p(len(lines)) / 5
+    if content:
+        line_lengths = [len(line) for line in content]
+        mean_length = sum(line_lengths) / len(content)
+        mean_square = sum(value * value for value in line_lengths) / len(content)
+        features[position + 2] = mean_length / 80
+        features[position + 3] = math.sqrt(max(mean_square - mean_length ** 2, 0)) / 80
+        features[position + 4] = sum(1 for line in content if line[0] in b" \t") / len(content)
+        features[position + 5] = sum(1 for value in line_lengths if value < 25) / len(content)
+        last_chars = [line[-1] for line in content]
+        for offset, ending in enumerate(LINE_ENDINGS, 7):
+            features[position + offset] = last_chars.count(ending) / len(content)
+    if length > 1:
+        features[position + 6] = np.count_nonzero(_LOWER[data[:-1]] & _JOIN_NEXT[data[1:]]) / (length - 1)
+    position += 7 + len(LINE_ENDINGS)
+
+    # Hashed character trigrams, L2-normalized
+    if length >= 3:
+        wide = data.astype(np.uint32)
+        trigrams = (wide[:-2] << 16) | (wide[1:-1] << 8) | wide[2:]
+        buckets = ((trigrams * np.uint32(2654435761)) >> np.uint32(24)) % NGRAM_BUCKETS
+        histogram = np.bincount(buckets, minlength=NGRAM_BUCKETS)
+        features[position:] = histogram / math.sqrt(int(histogram @ histogram))
+    return features
+
+def _per_text(values, text_ids, count, divisor=None):
+    """Sum values per text, optionally divided by a per-text count (0 where it is 0)."""
+    sums = np.bincount(text_ids, weights=values, minlength=count)
+    if divisor is None:
+        return sums
+    return np.divide(sums, divisor, out=np.zeros(count), where=divisor > 0)
+
+def extract_batch(texts):
+    """Feature matrix with one row per text.
+
+    All texts are concatenated and processed together, so the cost is a
+    fixed number of NumPy passes over the combined bytes.
+    """
+    count = len(texts)
+    features = np.zeros((count, FEATURE_COUNT), dtype=np.float32)
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.array([len(item) for item in encoded], dtype=np.int64)
+    if count == 0 or lengths.sum() == 0:
+        return features
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    text_ids = np.repeat(np.arange(count), lengths)
+    lengths_float = lengths.astype(np.float64)
+    safe_lengths = np.maximum(lengths_float, 1.0)[:, None]
+
+    # Character classes
+    counts = np.bincount(text_ids * 256 + data, minlength=count * 256).reshape(count, 256)
+    features[:, 0] = counts[:, _UPPER].sum(axis=1) / safe_lengths[:, 0]
+    features[:, 1] = counts[:, _LOWER].sum(axis=1) / safe_lengths[:, 0]
+    features[:, 2] = counts[:, _DIGIT].sum(axis=1) / safe_lengths[:, 0]
+    features[:, 3] = counts[:, ord(" ")] / safe_lengths[:, 0]
+    features[:, 4] = counts[:, ord("\n")] / safe_lengths[:, 0]
+    features[:, 5] = counts[:, _NON_ASCII].sum(axis=1) / safe_lengths[:, 0]
+    symbol_counts = counts[:, _SYMBOL_INDEX]
+    features[:, 6] = symbol_counts.sum(axis=1) / safe_lengths[:, 0]
+    position = 7
+    features[:, position:position + len(SYMBOLS)] = symbol_counts / safe_lengths
+    position += len(SYMBOLS)
+
+    # Lines start at the start of a text and after every newline within it
+    newlines = np.flatnonzero(data == ord("\n"))
+    is_start = np.zeros(data.size, dtype=bool)
+    is_start[offsets[:-1][lengths > 0]] = True
+    is_start[newlines[newlines + 1 < data.size] + 1] = True
+    starts = np.flatnonzero(is_start)
+    line_text_ids = text_ids[starts]
+    next_newline = np.searchsorted(newlines, starts)
+    ends = np.minimum(
+        np.append(newlines, data.size)[next_newline],
+        offsets[line_text_ids + 1]
+    )
+    line_lengths = (ends - starts).astype(np.float64)
+    non_empty = line_lengths > 0
+    content_ids = line_text_ids[non_empty]
+    content_lines = np.bincount(content_ids, minlength=count).astype(np.float64)
+    lengths_of_content = line_lengths[non_empty]
+    mean_length = _per_text(lengths_of_content, content_ids, count, content_lines)
+    mean_square = _per_text(lengths_of_content ** 2, content_ids, count, content_lines)
+    first_chars = data[starts[non_empty]]
+    last_chars = data[ends[non_empty] - 1]
+
+    features[:, position] = np.log1p(lengths_float) / 10
+    features[:, position + 1] = np.log1p(np.bincount(line_text_ids, minlength=count)) / 5
+    features[:, position + 2] = mean_length / 80
+    features[:, position + 3] = np.sqrt(np.maximum(mean_square - mean_length ** 2, 0)) / 80
+    indented = (first_chars == ord(" ")) | (first_chars == ord("\t"))
+    features[:, position + 4] = _per_text(indented, content_ids, count, content_lines)
+    features[:, position + 5] = _per_text(lengths_of_content < 25, content_ids, count, content_lines)
+    # Lowercase letter directly followed by an uppercase one or an underscore: camelCase, snake_case
+    same_text = text_ids[:-1] == text_ids[1:]
+    joined = _LOWER[data[:-1]] & (_UPPER[data[1:]] | (data[1:] == ord("_"))) & same_text
+    features[:, position + 6] = _per_text(joined, text_ids[:-1], count, np.maximum(lengths_float - 1, 0))
+    position += 7
+    for ending in LINE_ENDINGS:
+        features[:, position] = _per_text(last_chars == ending, content_ids, count, content_lines)
+        position += 1
+
+    # Hashed character trigrams, L2-normalized
+    if data.size >= 3:
+        within = text_ids[:-2] == text_ids[2:]
+        wide = data.astype(np.uint32)
+        trigrams = ((wide[:-2] << 16) | (wide[1:-1] << 8) | wide[2:])[within]
+        buckets = ((trigrams * np.uint32(2654435761)) >> np.uint32(24)) % NGRAM_BUCKETS
+        histogram = np.bincount(
+            text_ids[:-2][within] * NGRAM_BUCKETS + buckets, minlength=count * NGRAM_BUCKETS
+        ).reshape(count, NGRAM_BUCKETS).astype(np.float64)
+        norms = np.linalg.norm(histogram, axis=1, keepdims=True)
+        features[:, position:] = np.divide(histogram, norms, out=np.zeros_like(histogram), where=norms > 0)
+    return features
+
+class CodeClassifier:
+    """Logistic regression over standardized features"""
+    def __init__(self, weights, bias, mean, scale, threshold=DEFAULT_THRESHOLD):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.threshold = threshold
+        # Standardization folded into the weights, for scoring single texts
+        self.raw_weights = (self.weights / self.scale).astype(np.float64)
+        self.raw_bias = self.bias - float(self.mean.astype(np.float64) @ self.raw_weights)
+
+    def probabilities(self, texts):
+        """Probability of being code for each text."""
+        return self.probabilities_of_features(extract_batch(texts))
+
+    def probabilities_of_features(self, features):
+        logits = ((features - self.mean) / self.scale) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -50, 50)))
+
+    def probability(self, text):
+        """Probability of being code for one text."""
+        logit = float(extract_features(text) @ self.raw_weights) + self.raw_bias
+        return 1.0 / (1.0 + math.exp(-min(max(logit, -50.0), 50.0)))
+
+    def is_code(self, text, threshold=None):
+        return self.probability(text) >= (self.threshold if threshold is None else threshold)
+
+    def are_code(self, texts, threshold=None):
+        """is_code for many texts at once, scored with one matrix product."""
+        threshold = self.threshold if threshold is None else threshold
+        return [bool(probability >= threshold) for probability in self.probabilities(texts)]
+
+    @classmethod
+    def train(cls, texts, labels, epochs=300, learning_rate=0.5, l2=1e-3, threshold=DEFAULT_THRESHOLD):
+        """Fit by full-batch gradient descent; labels are 1 for code and 0 for prose."""
+        features = extract_batch(texts)
+        labels = np.asarray(labels, dtype=np.float32)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale < 1e-6] = 1.0
+        standardized = (features - mean) / scale
+        weights = np.zeros(FEATURE_COUNT, dtype=np.float32)
+        bias = 0.0
+        for _ in range(epochs):
+            predictions = 1.0 / (1.0 + np.exp(-np.clip(standardized @ weights + bias, -50, 50)))
+            error = predictions - labels
+            weights -= learning_rate * (standardized.T @ error / len(labels) + l2 * weights)
+            bias -= learning_rate * float(error.mean())
+        return cls(weights, bias, mean, scale, threshold)
+
+    def save(self, path=CLASSIFIER_FILE):
+        with open(path, "w") as f:
+            json.dump({
+                "features": FEATURE_COUNT,
+                "threshold": self.threshold,
+                "bias": self.bias,
+                "weights": [round(float(value), 6) for value in self.weights],
+                "mean": [round(float(value), 6) for value in self.mean],
+                "scale": [round(float(value), 6) for value in self.scale],
+            }, f)
+
+    @classmethod
+    def load(cls, path=CLASSIFIER_FILE):
+        with open(path) as f:
+            data = json.load(f)
+        if data["features"] != FEATURE_COUNT:
+            raise ValueError(f"{path} was trained for {data['features']} features, expected {FEATURE_COUNT}")
+        return cls(data["weights"], data["bias"], data["mean"], data["scale"], data.get("threshold", DEFAULT_THRESHOLD))
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """The shipped classifier, loaded on first use."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = CodeClassifier.load()
+        return _classifier
@@ -0,0 +1,293 @@
+"""Tokenizer-driven code formatter shared by all supported languages.
+
+Each language is described by a LanguageRules table: how its strings and
+comments look, which tokens open and close blocks, and which keywords get
+their case fixed. The text is lexed once with a single compiled regular
+expression; indentation and keyword casing are decided token by token, so
+braces or keywords inside strings and comments are left alone.
+"""
+import re
+
+INDENT = "    "
+
+class LanguageRules:
+    """Token tables for one language"""
+    def __init__(self, strings=(), comments=(), openers="", closers="", tags=False,
+                 line_openers=(), dedent_keywords=(), keywords=(), keyword_case=None,
+                 statement_keywords_only=True, phrases=None, reindent=True):
+        self.openers = set(openers)  # Tokens raising the indentation of following lines
+        self.closers = set(closers)  # Tokens lowering it; a line starting with one is dedented itself
+        self.line_openers = tuple(line_openers)  # Line endings that open a block (Python's ":")
+        self.dedent_keywords = set(dedent_keywords)  # Statements continuing the enclosing block (elif, else)
+        # Lowercase keyword -> canonical spelling
+        self.keyword_case = {keyword.lower(): (keyword_case or (lambda k: k))(keyword) for keyword in keywords}
+        self.statement_keywords_only = statement_keywords_only  # Only fix keywords starting a line
+        self.phrases = phrases or {}  # Keywords only cased when followed by one of the listed words
+        self.reindent = reindent
+
+        # Only tokens that affect formatting are matched; finditer skips everything in between
+        alternatives = [r"(?P<newline>\r?\n)"]
+        alternatives += [f"(?P<comment{i}>{comment})" for i, comment in enumerate(comments)]
+        alternatives += [f"(?P<string{i}>{string})" for i, string in enumerate(strings)]
+        if tags:
+            alternatives.append(r"(?P<tag></?[!A-Za-z][^<>\n]*>)")
+        if openers or closers:
+            alternatives.append(f"(?P<bracket>[{re.escape(openers + closers)}])")
+        if not statement_keywords_only:
+            alternatives.append(r"(?P<word>\b[A-Za-z_]\w*)")
+        self.pattern = re.compile("|".join(alternatives))
+        self.kinds = {name: name.rstrip("0123456789") for name in self.pattern.groupindex}
+
+DOUBLE_QUOTED = r'"(?:[^"\\\n]|\\.)*"?'
+SINGLE_QUOTED = r"'(?:[^'\\\n]|\\.)*'?"
+BACKTICK_QUOTED = r"`(?:[^`\\]|\\.)*`?"
+TRIPLE_QUOTED = r'"""[\s\S]*?(?:"""|$)|' + r"'''[\s\S]*?(?:'''|$)"
+C_COMMENTS = (r"//[^\n]*", r"/\*[\s\S]*?(?:\*/|$)")
+
+HTML_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source",
+    "track", "wbr", "!doctype",
+}
+
+RULES = {
+    "Python": LanguageRules(
+        strings=(TRIPLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED),
+        comments=(r"#[^\n]*",),
+        openers="([{", closers=")]}",  # Continuation lines inside brackets are indented
+        line_openers=(":",),
+        dedent_keywords=("elif", "else", "except", "finally"),
+        keywords=("def", "class", "return", "import", "from", "if", "elif", "else", "for", "while",
+                  "try", "except", "finally", "with", "pass", "break", "continue", "raise", "yield",
+                  "global", "nonlocal", "assert", "del", "async", "await"),
+    ),
+    "JavaScript": LanguageRules(
+        strings=(DOUBLE_QUOTED, SINGLE_QUOTED, BACKTICK_QUOTED),
+        comments=C_COMMENTS,
+        openers="{", closers="}",
+        keywords=("function", "return", "var", "let", "const", "if", "else", "for", "while", "do",
+                  "switch", "case", "break", "continue", "try", "catch", "finally", "throw", "class",
+                  "import", "export"),
+    ),
+    "Java": LanguageRules(
+        strings=(DOUBLE_QUOTED, SINGLE_QUOTED),
+        comments=C_COMMENTS,
+        openers="{", closers="}",
+        keywords=("public", "private", "protected", "static", "final", "class", "interface", "return",
+                  "import", "package", "if", "else", "for", "while", "try", "catch", "finally", "throw"),
+    ),
+    "C++": LanguageRules(
+        strings=(DOUBLE_QUOTED, SINGLE_QUOTED),
+        comments=C_COMMENTS,
+        openers="{", closers="}",
+        keywords=("return", "if", "else", "for", "while", "class", "struct", "namespace", "template",
+                  "using", "try", "catch", "throw"),
+    ),
+    "HTML": LanguageRules(
+        comments=(r"<!--[\s\S]*?(?:-->|$)",),
+        tags=True,
+    ),
+    "CSS": LanguageRules(
+        strings=(DOUBLE_QUOTED, SINGLE_QUOTED),
+        comments=(r"/\*[\s\S]*?(?:\*/|$)",),
+        openers="{", closers="}",
+    ),
+    "SQL": LanguageRules(
+        strings=(SINGLE_QUOTED, DOUBLE_QUOTED),
+        comments=(r"--[^\n]*", r"/\*[\s\S]*?(?:\*/|$)"),
+        keywords=("SELECT", "FROM", "WHERE", "HAVING", "JOIN", "ON", "AND", "OR", "NOT", "IN",
+                  "BETWEEN", "LIKE", "AS", "VALUES", "UPDATE", "SET"),
+        keyword_case=str.upper,
+        statement_keywords_only=False,
+        # Cased only as part of these phrases, since they are common column names on their own
+        phrases={
+            "group": {"by"}, "order": {"by"}, "left": {"join"}, "right": {"join"}, "inner": {"join"},
+            "outer": {"join"}, "is": {"null", "not"}, "not": {"null"}, "insert": {"into"},
+            "delete": {"from"}, "create": {"table"}, "alter": {"table"}, "drop": {"table"},
+        },
+        reindent=False,
+    ),
+}
+
+GENERIC_RULES = LanguageRules(reindent=False)
+
+FIRST_WORD_PATTERN = re.compile(r"[ \t]*([A-Za-z_]\w*)")
+
+def format_code(code, language, reindent=True):
+    """Format code of one of RULES' languages; other languages only get their lines stripped.
+
+    With reindent=False the existing indentation is kept, e.g. when it was
+    rebuilt from the text's position on screen, and only keywords are cased.
+    """
+    rules = RULES.get(language, GENERIC_RULES)
+    if not reindent:
+        return "\n".join(text for _, text in _format_lines(rules, code, keep_indent=True))
+    return "\n".join(
+        INDENT * indent_level + text if text else ""
+        for indent_level, text in _format_lines(rules, code)
+    )
+
+def format_many(items):
+    """Format (code, language) pairs, yielding the formatted code of each in order."""
+    for code, language in items:
+        yield format_code(code, language)
+
+class _Line:
+    """Formatting state of the line being scanned"""
+    __slots__ = ("start", "content_end", "delta", "leading_closers", "only_closers", "gap_start", "edits")
+
+    def __init__(self, start):
+        self.start = start
+        self.content_end = None  # Start of a trailing comment
+        self.delta = 0  # Depth change caused by the line's brackets and tags
+        self.leading_closers = 0  # Closers before anything else on the line
+        self.only_closers = True
+        self.gap_start = start  # End of the last matched token
+        self.edits = []  # (start, end, replacement) keyword case fixes
+
+def _format_lines(rules, code, keep_indent=False):
+    """Yield (indent level, stripped text) for every line of code.
+
+    With keep_indent the text keeps its leading whitespace and the level is 0.
+    """
+    depth = 0
+    line = _Line(0)
+    kinds = rules.kinds
+    openers = rules.openers
+    previous_word, previous_word_end = None, 0
+
+    for match in rules.pattern.finditer(code):
+        kind = kinds[match.lastgroup]
+        start, end = match.span()
+        if kind == "newline":
+            indent_level, text, depth = _finish_line(rules, code, line, start, depth, keep_indent)
+            yield indent_level, text
+            line = _Line(end)
+            continue
+
+        if line.only_closers and code[line.gap_start:start].strip():
+            line.only_closers = False
+        line.gap_start = end
+        closes = False
+        if kind == "bracket":
+            if match.group() in openers:
+                line.delta += 1
+            else:
+                line.delta -= 1
+                closes = True
+        elif kind == "tag":
+            delta = _tag_delta(match.group())
+            line.delta += delta
+            closes = delta < 0
+        elif kind == "comment":
+            if line.content_end is None:
+                line.content_end = start
+        elif kind == "word":
+            word = match.group()
+            follows = previous_word if code[previous_word_end:start].isspace() else None
+            replacement = _cased_keyword(rules, code, word, end, follows)
+            if replacement != word:
+                line.edits.append((start, end, replacement))
+            previous_word, previous_word_end = word, end
+        if closes and line.only_closers:
+            line.leading_closers += 1
+        else:
+            line.only_closers = False
+
+    if line.start < len(code) or code.endswith("\n"):
+        indent_level, text, depth = _finish_line(rules, code, line, len(code), depth, keep_indent)
+        yield indent_level, text
+
+def _finish_line(rules, code, line, end, depth, keep_indent=False):
+    """(indent level, text) of a scanned line, and the depth of the line after it."""
+    first_word = None
+    if rules.statement_keywords_only and rules.keyword_case or rules.dedent_keywords:
+        match = FIRST_WORD_PATTERN.match(code, line.start, end)
+        if match:
+            first_word = match.group(1)
+            keyword = rules.keyword_case.get(first_word.lower()) if rules.statement_keywords_only else None
+            if keyword and keyword != first_word:
+                line.edits.insert(0, (match.start(1), match.end(1), keyword))
+                first_word = keyword
+
+    if line.edits:
+        parts, position = [], line.start
+        for edit_start, edit_end, replacement in line.edits:
+            parts.append(code[position:edit_start])
+            parts.append(replacement)
+            position = edit_end
+        parts.append(code[position:end])
+        text = "".join(parts)
+    else:
+        text = code[line.start:end]
+    text = text.rstrip() if keep_indent else text.strip()
+
+    if keep_indent or not rules.reindent:
+        return 0, text, depth
+    indent_level = depth - line.leading_closers
+    if first_word in rules.dedent_keywords:
+        indent_level -= 1
+    depth = max(depth + line.delta, 0)
+    if rules.line_openers:
+        content = code[line.start:end if line.content_end is None else line.content_end].rstrip()
+        if content.endswith(rules.line_openers) and first_word not in rules.dedent_keywords:
+            depth += 1  # A dedent keyword's block replaces the one it continues instead of nesting
+    return max(indent_level, 0), text, depth
+
+def _cased_keyword(rules, code, word, end, previous_word):
+    """word with its keyword casing fixed, if it is a keyword where it stands."""
+    lower = word.lower()
+    if lower in rules.phrases:
+        following = PHRASE_NEXT_WORD_PATTERN.match(code, end)
+        if following and following.group(1).lower() in rules.phrases[lower]:
+            return word.upper()
+    if lower in rules.keyword_case:
+        return rules.keyword_case[lower]
+    # Second word of a phrase, e.g. the BY of GROUP BY
+    if previous_word is not None and lower in rules.phrases.get(previous_word.lower(), ()):
+        return word.upper()
+    return word
+
+PHRASE_NEXT_WORD_PATTERN = re.compile(r"\s+([A-Za-z_]\w*)")
+
+def _tag_delta(tag):
+    """+1 for an opening tag, -1 for a closing tag, 0 for void and self-closing tags."""
+    if tag.startswith("</"):
+        return -1
+    name = re.match(r"<([!\w-]+)", tag).group(1).lower()
+    if tag.endswith("/>") or name in HTML_VOID_TAGS:
+        return 0
+    return 1
+
+def reformat_stored_snippets(language=None, batch_size=500, progress_callback=None):
+    """Reformat stored snippets with the current rules, e.g. after a rules upgrade.
+
+    Only snippets whose formatted code differs are rewritten; snippets stored
+    with reindent=False keep their indentation. progress_callback
+    receives (snippets done, total). Returns the number of snippets changed.
+    """
+    from database import CodeSnippet, session, iter_snippets_with_code, update_snippet_codes
+
+    query = session.query(CodeSnippet.id).order_by(CodeSnippet.id)
+    if language:
+        query = query.filter(CodeSnippet.language == language)
+    snippet_ids = [snippet_id for snippet_id, in query]
+    changed = 0
+    pending = {}
+    for done, (snippet, code) in enumerate(iter_snippets_with_code(snippet_ids, batch_size), 1):
+        formatted = format_code(code, snippet.language, snippet.reindent)
+        if formatted != code:
+            pending[snippet.id] = formatted
+        if len(pending) >= batch_size or done == len(snippet_ids):
+            changed += update_snippet_codes(pending) if pending else 0
+            pending = {}
+        if progress_callback:
+            progress_callback(done, len(snippet_ids))
+    return changed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reformat stored snippets with the current formatting rules")
+    parser.add_argument("--language", help="Only reformat snippets of this language")
+    args = parser.parse_args()
+    print(f"Reformatted {reformat_stored_snippets(args.language)} snippets")
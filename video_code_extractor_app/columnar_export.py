@@ -0,0 +1,269 @@
+"""Columnar export of the snippet corpus for analytics, as Parquet or Arrow IPC files.
+
+Every snippet field is exported, plus the snippet time in seconds, the
+source video's fingerprint (from the watch daemon's ledger, see
+database.ProcessedVideo; null for sources extracted elsewhere) and the
+content hash. Rows are read from the database in id order, CHUNK_ROWS at a
+time, and written as row groups, so memory use does not grow with the
+corpus. Files are partitioned Hive-style by source or language:
+
+    OUTPUT_DIR/language=Python/part-00003-0001.parquet
+
+An export directory remembers the highest snippet ID it holds in
+STATE_FILE; running the export again only appends files with newer
+snippets. Rows changed after they were exported (occurrence counts,
+is_head, reformatted code) are only refreshed by a full export.
+
+pyarrow is optional; it is only needed here. Load an export with
+read_export(), or e.g. pandas.read_parquet(OUTPUT_DIR).
+
+    python columnar_export.py OUTPUT_DIR [--partition-by source|language] [--format parquet|arrow] [--full]
+"""
+import glob
+import json
+import os
+from urllib.parse import quote
+
+PARTITION_COLUMNS = {"source": "source_file", "language": "language"}
+FORMAT_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+STATE_FILE = "_export_state.json"
+# Snippets read from the database per query
+CHUNK_ROWS = 5000
+# Buffered rows across all partitions before the largest partition is written out
+MAX_BUFFERED_ROWS = 100000
+# Directory name of rows whose partition value is null, as pyarrow's Hive partitioning expects
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Columnar export needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+def snippet_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.string()),
+        ("time_seconds", pa.int32()),
+        ("last_timestamp", pa.string()),
+        ("last_time_seconds", pa.int32()),
+        ("language", pa.string()),
+        ("code", pa.large_string()),
+        ("code_size", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        ("source_file", pa.string()),
+        ("source_fingerprint", pa.string()),
+        ("content_hash", pa.string()),
+        ("occurrences", pa.int32()),
+        ("parent_id", pa.int64()),
+        ("chain_id", pa.int64()),
+        ("chain_depth", pa.int32()),
+        ("is_delta", pa.bool_()),
+        ("is_head", pa.bool_()),
+        ("frame_number", pa.int64()),
+        ("reindent", pa.bool_()),
+    ])
+
+def timestamp_seconds(timestamp):
+    """Seconds of an "HH:MM:SS" snippet timestamp, or None."""
+    if not timestamp:
+        return None
+    seconds = 0
+    for part in timestamp.split(":"):
+        if not part.isdigit():
+            return None
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def _source_fingerprints():
+    from database import ProcessedVideo, session
+
+    # A source extracted several times keeps its latest fingerprint
+    return {
+        source_file: fingerprint for source_file, fingerprint in session.query(
+            ProcessedVideo.source_file, ProcessedVideo.fingerprint).order_by(ProcessedVideo.processed_at)
+    }
+
+def _row(snippet, code, fingerprints):
+    return {
+        "id": snippet.id,
+        "timestamp": snippet.timestamp,
+        "time_seconds": timestamp_seconds(snippet.timestamp),
+        "last_timestamp": snippet.last_timestamp,
+        "last_time_seconds": timestamp_seconds(snippet.last_timestamp),
+        "language": snippet.language,
+        "code": code,
+        "code_size": snippet.code_size,
+        "created_at": snippet.created_at,
+        "source_file": snippet.source_file,
+        "source_fingerprint": fingerprints.get(snippet.source_file),
+        "content_hash": snippet.content_hash,
+        "occurrences": snippet.occurrences,
+        "parent_id": snippet.parent_id,
+        "chain_id": snippet.chain_id,
+        "chain_depth": snippet.chain_depth,
+        "is_delta": bool(snippet.is_delta),
+        "is_head": bool(snippet.is_head),
+        "frame_number": snippet.frame_number,
+        "reindent": bool(snippet.reindent),
+    }
+
+def iter_snippet_rows(after_id=0, chunk_rows=CHUNK_ROWS):
+    """Yield lists of export rows of snippets with IDs above after_id, in ID order."""
+    from database import CodeSnippet, session, iter_snippets_with_code
+
+    fingerprints = _source_fingerprints()
+    last_id = after_id
+    while True:
+        ids = [row_id for row_id, in session.query(CodeSnippet.id).filter(
+            CodeSnippet.id > last_id).order_by(CodeSnippet.id).limit(chunk_rows)]
+        if not ids:
+            return
+        yield [_row(snippet, code, fingerprints) for snippet, code in iter_snippets_with_code(ids, chunk_rows)]
+        last_id = ids[-1]
+
+class _PartitionWriters:
+    """One open Parquet or Arrow file per partition value of an export run"""
+    def __init__(self, pa, output_dir, partition_column, file_format, run):
+        self.pa = pa
+        self.output_dir = output_dir
+        self.partition_column = partition_column
+        self.file_format = file_format
+        self.run = run
+        full_schema = snippet_schema(pa)
+        # The partition value is in the directory name, not in the files
+        self.schema = full_schema.remove(full_schema.get_field_index(partition_column))
+        self.writers = {}
+        self.paths = []
+
+    def write(self, value, rows):
+        writer = self.writers.get(value)
+        if writer is None:
+            directory = os.path.join(
+                self.output_dir,
+                f"{self.partition_column}={NULL_PARTITION if value is None else quote(value, safe='')}"
+            )
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{self.run:05d}-{len(self.paths):04d}{FORMAT_EXTENSIONS[self.file_format]}")
+            if self.file_format == "parquet":
+                writer = self.pa.parquet.ParquetWriter(path, self.schema)
+            else:
+                writer = self.pa.ipc.new_file(path, self.schema)
+            self.writers[value] = writer
+            self.paths.append(path)
+        columns = {name: [row[name] for row in rows] for name in self.schema.names}
+        writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+def _read_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _remove_export_files(output_dir, partition_column):
+    for path in glob.glob(os.path.join(output_dir, f"{partition_column}=*", "part-*")):
+        os.remove(path)
+    for directory in glob.glob(os.path.join(output_dir, f"{partition_column}=*")):
+        if not os.listdir(directory):
+            os.rmdir(directory)
+
+def export_columnar(output_dir, partition_by="source", file_format="parquet", full=False,
+                    chunk_rows=CHUNK_ROWS, progress_callback=None):
+    """Export snippets added since the last export of output_dir (all of them with full).
+
+    partition_by is "source" or "language"; an existing export keeps the
+    partitioning and format it was created with, unless full starts over.
+    progress_callback receives the number of rows written so far. Returns
+    the number of rows written.
+    """
+    pa = _pyarrow()
+    if partition_by not in PARTITION_COLUMNS:
+        raise ValueError(f"Unknown partitioning: {partition_by}")
+    if file_format not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unknown format: {file_format}")
+    os.makedirs(output_dir, exist_ok=True)
+    columns = snippet_schema(pa).names
+    state = _read_state(output_dir)
+    if state is not None and full:
+        _remove_export_files(output_dir, PARTITION_COLUMNS[state["partition_by"]])
+        state = None
+    if state is not None and (state["partition_by"], state["format"]) != (partition_by, file_format):
+        raise ValueError(
+            f"{output_dir} holds a {state['format']} export partitioned by {state['partition_by']}; "
+            "use the same settings or a full export"
+        )
+    if state is not None and state.get("columns") != columns:
+        # Files of one dataset must share a schema
+        raise ValueError(f"{output_dir} was exported with other columns; run a full export")
+    state = state or {"partition_by": partition_by, "format": file_format, "columns": columns, "last_id": 0, "runs": 0}
+
+    partition_column = PARTITION_COLUMNS[partition_by]
+    writers = _PartitionWriters(pa, output_dir, partition_column, file_format, state["runs"])
+    buffers = {}
+    buffered = 0
+    written = 0
+    last_id = state["last_id"]
+    try:
+        for rows in iter_snippet_rows(state["last_id"], chunk_rows):
+            for row in rows:
+                buffers.setdefault(row[partition_column], []).append(row)
+            buffered += len(rows)
+            last_id = rows[-1]["id"]
+            # Write the largest partitions as row groups until the buffer is small again
+            while buffered > MAX_BUFFERED_ROWS:
+                value = max(buffers, key=lambda key: len(buffers[key]))
+                writers.write(value, buffers[value])
+                buffered -= len(buffers.pop(value))
+            written += len(rows)
+            if progress_callback:
+                progress_callback(written)
+        for value, rows in buffers.items():
+            writers.write(value, rows)
+    finally:
+        writers.close()
+
+    if written:
+        # Recorded only after the files are complete, so a failed run is redone next time
+        state.update(last_id=last_id, runs=state["runs"] + 1)
+        temporary = os.path.join(output_dir, STATE_FILE + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, os.path.join(output_dir, STATE_FILE))
+    return written
+
+def read_export(output_dir):
+    """The exported snippets as a pyarrow Table, with the partition column restored."""
+    pa = _pyarrow()
+    import pyarrow.dataset as ds
+
+    state = _read_state(output_dir)
+    if state is None:
+        raise ValueError(f"{output_dir} holds no export")
+    partitioning = ds.partitioning(
+        pa.schema([(PARTITION_COLUMNS[state["partition_by"]], pa.string())]), flavor="hive"
+    )
+    file_format = "parquet" if state["format"] == "parquet" else "ipc"
+    # STATE_FILE starts with "_", which datasets skip
+    return ds.dataset(output_dir, format=file_format, partitioning=partitioning).to_table()
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Export snippets as partitioned Parquet or Arrow files")
+    parser.add_argument("output_dir")
+    parser.add_argument("--partition-by", choices=sorted(PARTITION_COLUMNS), default="source")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="parquet")
+    parser.add_argument("--full", action="store_true", help="Replace the export instead of appending new snippets")
+    args = parser.parse_args()
+    start = time.monotonic()
+    count = export_columnar(args.output_dir, args.partition_by, args.format, args.full)
+    print(f"Exported {count} snippets in {time.monotonic() - start:.1f}s")
@@ -1,21 +1,199 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, func, or_, and_
+from sqlalchemy import create_engine, Column, Integer, Float, String, Text, DateTime, LargeBinary, Boolean, Index, func, or_, and_, event, inspect, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import column_property, sessionmaker, scoped_session, deferred, object_session, undefer
+from sqlalchemy.pool import QueuePool
 import datetime
+import difflib
+import hashlib
 import re
 import json
+import os
+import sqlite3
+import sys
+import zlib
+
+from text_distance import edit_distance
 
 Base = declarative_base()
 
+# Per-source policies for snippets whose normalized content was already stored
+DUPLICATE_POLICY_ALLOW = "allow"    # store every capture as its own row
+DUPLICATE_POLICY_REJECT = "reject"  # drop captures whose content is already stored
+DUPLICATE_POLICY_COUNT = "count"    # keep the first row and count further occurrences
+DUPLICATE_POLICY_SPAN = "span"      # like "count", and also track the last timestamp seen
+DUPLICATE_POLICIES = (DUPLICATE_POLICY_ALLOW, DUPLICATE_POLICY_REJECT,
+                      DUPLICATE_POLICY_COUNT, DUPLICATE_POLICY_SPAN)
+DEFAULT_DUPLICATE_POLICY = DUPLICATE_POLICY_ALLOW
+
+def normalize_code(code):
+    """Normalize code for duplicate detection by dropping all whitespace."""
+    return "".join(code.split())
+
+def compute_content_hash(code):
+    """Stable digest of the normalized code, identical across processes and runs."""
+    return hashlib.sha1(normalize_code(code).encode("utf-8")).hexdigest()
+
+# Storage format of code bodies: a marker byte followed by the payload.
+# Never change an existing format (including the dictionary), add a new marker instead.
+CODE_FORMAT_RAW = b"\x00"   # UTF-8 text, used when compression does not help
+CODE_FORMAT_ZLIB = b"\x01"  # zlib stream primed with CODE_DICTIONARY
+CODE_FORMAT_DELTA = b"\x02"  # zlib-compressed JSON line edits against the parent snippet
+
+# Within a chain, every SNAPSHOT_INTERVAL-th version is stored in full so that
+# reconstructing any version applies at most SNAPSHOT_INTERVAL - 1 deltas
+SNAPSHOT_INTERVAL = 10
+
+# Preset dictionary of tokens common in captured code. zlib prefers matches near the
+# end of the dictionary, so the most frequent tokens come last.
+CODE_DICTIONARY = (
+    "<!DOCTYPE html><html><head></head><body></body></html><div class=\"\"></div><span></span>"
+    "<p></p><a href=\"\"></a><script></script><style></style> margin: padding: color: "
+    "background: font-size: display: width: height: border: position: "
+    "SELECT FROM WHERE GROUP BY ORDER BY INSERT INTO VALUES UPDATE SET DELETE FROM JOIN ON "
+    "#include <iostream> std::cout << std::endl; int main() { public static void main(String[] args) "
+    "System.out.println( private protected interface extends implements @Override "
+    "function console.log( document.getElementById( const let var => { } return null; "
+    "undefined true false this. "
+    "models.Model models.CharField(max_length= models.TextField() models.ForeignKey( "
+    "models.DateTimeField( on_delete=models.CASCADE from django.db import models "
+    "import from def class self. __init__(self, print( if elif else: for in range( while try: "
+    "except Exception as e: with open( as f: lambda None True False return "
+    "    \n        \n    "
+).encode("utf-8")
+
+def compress_code(code):
+    """Encode a code body for storage."""
+    data = code.encode("utf-8")
+    compressor = zlib.compressobj(9, zdict=CODE_DICTIONARY)
+    packed = compressor.compress(data) + compressor.flush()
+    if len(packed) < len(data):
+        return CODE_FORMAT_ZLIB + packed
+    return CODE_FORMAT_RAW + data
+
+def decompress_code(blob):
+    """Decode a code body stored by compress_code."""
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    marker, payload = blob[:1], blob[1:]
+    if marker == CODE_FORMAT_ZLIB:
+        decompressor = zlib.decompressobj(zdict=CODE_DICTIONARY)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+    if marker == CODE_FORMAT_RAW:
+        return payload.decode("utf-8")
+    if marker == CODE_FORMAT_DELTA:
+        raise ValueError("Delta-encoded code needs its parent, use get_snippet_code()")
+    raise ValueError(f"Unknown code storage format: {marker!r}")
+
+def encode_delta(parent_code, code):
+    """Encode code as line edits against parent_code.
+
+    The delta is a list of [start, end] ranges of parent lines to copy and
+    strings of new text, in order.
+    """
+    parent_lines = parent_code.splitlines(keepends=True)
+    lines = code.splitlines(keepends=True)
+    operations = []
+    matcher = difflib.SequenceMatcher(None, parent_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            operations.append([i1, i2])
+        elif j2 > j1:
+            operations.append("".join(lines[j1:j2]))
+    return CODE_FORMAT_DELTA + zlib.compress(json.dumps(operations, separators=(",", ":")).encode("utf-8"), 9)
+
+def apply_delta(parent_code, blob):
+    """Rebuild code from its parent's code and a delta made by encode_delta."""
+    parent_lines = parent_code.splitlines(keepends=True)
+    parts = []
+    for operation in json.loads(zlib.decompress(bytes(blob)[1:]).decode("utf-8")):
+        if isinstance(operation, list):
+            parts.extend(parent_lines[operation[0]:operation[1]])
+        else:
+            parts.append(operation)
+    return "".join(parts)
+
+def _sql_snippet_code(blob):
+    """snippet_code() SQL function; NULL for delta-encoded rows, which need their chain."""
+    if blob is not None and bytes(blob[:1]) == CODE_FORMAT_DELTA:
+        return None
+    return decompress_code(blob)
+
 class CodeSnippet(Base):
     __tablename__ = 'code_snippets'
+    __table_args__ = (
+        Index('ix_code_snippets_source_hash', 'source_file', 'content_hash'),
+        Index('ix_code_snippets_language_timestamp', 'language', 'timestamp'),
+        Index('ix_code_snippets_timestamp', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(String(20), nullable=False)
-    language = Column(String(50), nullable=False)
-    code = Column(Text, nullable=False)
+    # The statistics counters are keyed by language and source_file and sum code_size, so
+    # their old values are loaded before a change even when the attribute was expired
+    language = column_property(Column(String(50), nullable=False), active_history=True)
+    code_blob = deferred(Column(LargeBinary, nullable=False))  # Compressed body, only loaded when code is accessed
+    code_size = column_property(Column(Integer, nullable=False, default=0), active_history=True)  # Length in characters
     created_at = Column(DateTime, default=datetime.datetime.utcnow)  # Add created_at column
-    source_file = Column(String(255), nullable=True)  # Add source_file column
+    source_file = column_property(Column(String(255), nullable=True), active_history=True)
+    content_hash = Column(String(40), nullable=True, index=True)  # Digest of the whitespace-normalized code
+    occurrences = Column(Integer, nullable=False, default=1)  # Captures merged into this row by the duplicate policy
+    last_timestamp = Column(String(20), nullable=True)  # Last capture time under the "span" policy
+    parent_id = Column(Integer, nullable=True, index=True)  # Earlier capture this one is an edit of
+    chain_id = Column(Integer, nullable=True, index=True)  # ID of the first snippet of the edit chain
+    chain_depth = Column(Integer, nullable=False, default=0)  # Deltas since the last full snapshot
+    is_delta = Column(Boolean, nullable=False, default=False)  # code_blob holds a delta against the parent
+    is_head = Column(Boolean, nullable=False, default=True, index=True)  # Latest version of its chain
+    frame_number = Column(Integer, nullable=True)  # Source frame, for thumbnails and seeking
+    video_key = Column(String(16), nullable=True)  # Video file the frame is in, see thumbnails.video_key
+    # False where the indentation was taken from the text's position on screen
+    # (line OCR, scroll stitching); reformatting must not guess it again
+    reindent = Column(Boolean, nullable=False, default=True)
+    
+    @hybrid_property
+    def code(self):
+        """The snippet's code, decompressed (and for deltas reconstructed) on access."""
+        if self.is_delta:
+            return _reconstruct_code(object_session(self) or session, self.id)
+        return decompress_code(self.code_blob)
+    
+    @code.setter
+    def code(self, value):
+        # Always stores a full snapshot; add_snippet decides when to store deltas
+        self.code_blob = compress_code(value)
+        self.code_size = len(value)
+        self.content_hash = compute_content_hash(value)
+        self._plain_code = value  # Indexed by _index_trigrams at flush time
+        self.is_delta = False
+        self.chain_depth = 0
+    
+    def set_code_delta(self, parent, value, parent_code=None):
+        """Store value as a delta against the parent snippet (whose code may be passed in)."""
+        self.code_blob = encode_delta(parent.code if parent_code is None else parent_code, value)
+        self.code_size = len(value)
+        self.content_hash = compute_content_hash(value)
+        self._plain_code = value
+        self.is_delta = True
+        self.chain_depth = (parent.chain_depth or 0) + 1
+    
+    @code.expression
+    def code(cls):
+        # Decompressed inside SQLite, see _register_sql_functions
+        return func.snippet_code(cls.code_blob)
+    
+    def to_summary(self):
+        """Metadata shown in snippet lists; never loads the code body."""
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "language": self.language,
+            "size": self.code_size,
+            "source_file": self.source_file,
+            "frame_number": self.frame_number,
+            "video_key": self.video_key
+        }
     
     def to_dict(self):
         """Convert snippet to dictionary for JSON serialization."""
@@ -24,38 +202,594 @@ class CodeSnippet(Base):
             "timestamp": self.timestamp,
             "language": self.language,
             "code": self.code,
+            "code_size": self.code_size,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "source_file": self.source_file
+            "source_file": self.source_file,
+            "content_hash": self.content_hash,
+            "occurrences": self.occurrences,
+            "last_timestamp": self.last_timestamp,
+            "parent_id": self.parent_id,
+            "chain_id": self.chain_id,
+            "is_delta": self.is_delta,
+            "is_head": self.is_head,
+            "frame_number": self.frame_number,
+            "video_key": self.video_key,
+            "reindent": self.reindent
         }
     
     @staticmethod
     def from_dict(data):
-        """Create a snippet from dictionary data."""
+        """Create a snippet from dictionary data; see import_from_json for the edit chain fields."""
         return CodeSnippet(
             timestamp=data.get("timestamp", "00:00:00"),
             language=data.get("language", "Unknown"),
             code=data.get("code", ""),
-            source_file=data.get("source_file")
+            source_file=data.get("source_file"),
+            occurrences=data.get("occurrences", 1),
+            last_timestamp=data.get("last_timestamp"),
+            frame_number=data.get("frame_number"),
+            video_key=data.get("video_key"),
+            reindent=data.get("reindent", True)
+        )
+
+class SourcePolicy(Base):
+    __tablename__ = 'source_policies'
+
+    source_file = Column(String(255), primary_key=True)
+    duplicate_policy = Column(String(20), nullable=False, default=DEFAULT_DUPLICATE_POLICY)
+
+class ProcessedVideo(Base):
+    """Ledger of video files extracted by the watch-folder daemon, so none is extracted twice."""
+    __tablename__ = 'processed_videos'
+
+    fingerprint = Column(String(40), primary_key=True)  # Digest of the file's size and content, see watch_daemon
+    path = Column(String(1024), nullable=False)
+    source_file = Column(String(255), nullable=False, index=True)  # The snippets' source_file
+    size = Column(Integer, nullable=False, default=0)
+    new_snippets = Column(Integer, nullable=False, default=0)
+    seconds = Column(Float, nullable=True)  # Extraction wall time
+    processed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class SnippetStatistic(Base):
+    """Counters per source, language and hour of creation, kept in step with code_snippets."""
+    __tablename__ = 'snippet_statistics'
+
+    source_file = Column(String(255), primary_key=True)  # '' for snippets without a source
+    language = Column(String(50), primary_key=True)
+    bucket = Column(String(13), primary_key=True)  # created_at truncated to the hour, "YYYY-MM-DD HH"
+    snippet_count = Column(Integer, nullable=False, default=0)
+    code_bytes = Column(Integer, nullable=False, default=0)  # Sum of code_size
+    first_seen = Column(DateTime, nullable=True)
+    last_seen = Column(DateTime, nullable=True)
+
+def _statistics_bucket(moment):
+    """Hour bucket a creation time is counted in."""
+    return moment.strftime("%Y-%m-%d %H")
+
+def _add_to_statistics(connection, source_file, language, created_at, count, code_bytes):
+    """Add (or with negative values, remove) snippets to the statistics counters."""
+    table = SnippetStatistic.__table__
+    key = {
+        "source_file": source_file or "",
+        "language": language,
+        "bucket": _statistics_bucket(created_at),
+    }
+    if count > 0:
+        statement = sqlite_insert(table).values(
+            snippet_count=count, code_bytes=code_bytes,
+            first_seen=created_at, last_seen=created_at, **key
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                "snippet_count": table.c.snippet_count + statement.excluded.snippet_count,
+                "code_bytes": table.c.code_bytes + statement.excluded.code_bytes,
+                "first_seen": func.min(table.c.first_seen, statement.excluded.first_seen),
+                "last_seen": func.max(table.c.last_seen, statement.excluded.last_seen),
+            }
+        )
+        connection.execute(statement)
+        return
+
+    key_filter = and_(*(table.c[name] == value for name, value in key.items()))
+    connection.execute(table.update().where(key_filter).values(
+        snippet_count=table.c.snippet_count + count,
+        code_bytes=table.c.code_bytes + code_bytes
+    ))
+    connection.execute(table.delete().where(and_(key_filter, table.c.snippet_count <= 0)))
+    row = connection.execute(select(table.c.first_seen, table.c.last_seen).where(key_filter)).first()
+    if row is None or created_at not in (row.first_seen, row.last_seen):
+        return
+    # The removed snippet was the first or last of its bucket; the flush already took it out of code_snippets
+    snippets = CodeSnippet.__table__
+    first_seen, last_seen = connection.execute(
+        select(func.min(snippets.c.created_at), func.max(snippets.c.created_at)).where(
+            func.coalesce(snippets.c.source_file, "") == key["source_file"],
+            snippets.c.language == language,
+            func.strftime("%Y-%m-%d %H", snippets.c.created_at) == key["bucket"]
         )
+    ).first()
+    connection.execute(table.update().where(key_filter).values(first_seen=first_seen, last_seen=last_seen))
+
+@event.listens_for(CodeSnippet, "after_insert")
+def _count_inserted_snippet(mapper, connection, target):
+    created_at = target.created_at or datetime.datetime.utcnow()
+    _add_to_statistics(connection, target.source_file, target.language, created_at, 1, target.code_size)
+
+@event.listens_for(CodeSnippet, "after_delete")
+def _count_deleted_snippet(mapper, connection, target):
+    created_at = target.created_at or datetime.datetime.utcnow()
+    _add_to_statistics(connection, target.source_file, target.language, created_at, -1, -target.code_size)
+
+@event.listens_for(CodeSnippet, "after_update")
+def _count_updated_snippet(mapper, connection, target):
+    state = inspect(target)
+    changed = [name for name in ("code_size", "language", "source_file") if state.attrs[name].history.has_changes()]
+    if not changed:
+        return
+
+    def previous(name):
+        history = state.attrs[name].history
+        return history.deleted[0] if history.deleted else getattr(target, name)
+
+    created_at = target.created_at or datetime.datetime.utcnow()
+    _add_to_statistics(connection, previous("source_file"), previous("language"), created_at,
+                       -1, -previous("code_size"))
+    _add_to_statistics(connection, target.source_file, target.language, created_at,
+                       1, target.code_size)
+
+# Trigrams are taken per word of the lowercased code, with the word padded by
+# two spaces in front and one behind so that word starts weigh more
+_WORD_PATTERN = re.compile(r"\w+")
+# Default similarity a fuzzy query's words must have to the snippet's words;
+# an OCR error in a five-letter word leaves a similarity of 0.8
+FUZZY_SEARCH_THRESHOLD = 0.5
+# Snippets sharing the most trigrams with a fuzzy query that are scored word by word
+FUZZY_CANDIDATES = 1000
+
+def code_trigrams(code):
+    """Set of word trigrams of code, as stored in the trigram index."""
+    trigrams = set()
+    for word in _WORD_PATTERN.findall(code.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+class CodeTrigram(Base):
+    """Inverted index from word trigrams to the snippets whose code contains them."""
+    __tablename__ = 'code_trigrams'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    trigram = Column(String(3), primary_key=True)
+    snippet_id = Column(Integer, primary_key=True, index=True)
+
+def _index_trigrams(connection, snippet_id, code):
+    rows = [{"trigram": trigram, "snippet_id": snippet_id} for trigram in code_trigrams(code)]
+    if rows:
+        connection.execute(CodeTrigram.__table__.insert(), rows)
+
+def _unindex_trigrams(connection, snippet_id):
+    connection.execute(CodeTrigram.__table__.delete().where(CodeTrigram.snippet_id == snippet_id))
+
+class CodeSearchText(Base):
+    """Lowercased plain code of every snippet, so substring filters run in SQL.
+
+    code_blob holds compressed bodies and deltas that SQLite cannot search;
+    this copy is kept in step with it like the trigram index.
+    """
+    __tablename__ = 'code_search_text'
+
+    snippet_id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+
+def _index_search_text(connection, snippet_id, code):
+    connection.execute(CodeSearchText.__table__.insert(), {"snippet_id": snippet_id, "text": code.lower()})
+
+def _unindex_search_text(connection, snippet_id):
+    connection.execute(CodeSearchText.__table__.delete().where(CodeSearchText.snippet_id == snippet_id))
+
+@event.listens_for(CodeSnippet, "after_insert")
+def _index_inserted_snippet(mapper, connection, target):
+    _index_trigrams(connection, target.id, target.__dict__.get("_plain_code", ""))
+    _index_search_text(connection, target.id, target.__dict__.get("_plain_code", ""))
+
+@event.listens_for(CodeSnippet, "after_update")
+def _reindex_updated_snippet(mapper, connection, target):
+    # Re-encoding the same content (e.g. materializing a delta) keeps the index valid;
+    # content only changes through the code setters, which leave _plain_code behind
+    if "_plain_code" in target.__dict__ and inspect(target).attrs.content_hash.history.has_changes():
+        _unindex_trigrams(connection, target.id)
+        _index_trigrams(connection, target.id, target.__dict__.get("_plain_code", ""))
+        _unindex_search_text(connection, target.id)
+        _index_search_text(connection, target.id, target.__dict__.get("_plain_code", ""))
+
+@event.listens_for(CodeSnippet, "after_delete")
+def _unindex_deleted_snippet(mapper, connection, target):
+    _unindex_trigrams(connection, target.id)
+    _unindex_search_text(connection, target.id)
 
 # Database setup
-engine = create_engine('sqlite:///code_snippets.db')
+# Keep connections open between commits instead of reconnecting (and
+# checkpointing the WAL) each time, which dominates the cost of small inserts
+engine = create_engine('sqlite:///code_snippets.db', poolclass=QueuePool,
+                       connect_args={"check_same_thread": False})
+
+@event.listens_for(engine, "connect")
+def _register_sql_functions(dbapi_connection, connection_record):
+    """Let SQL expressions such as CodeSnippet.code.like() see decompressed code."""
+    dbapi_connection.create_function("snippet_code", 1, _sql_snippet_code, deterministic=True)
+    # Every insert also writes statistics and trigram rows; WAL keeps those commits cheap
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
 Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
-session = Session()
+# Thread-local: the GUI reads while extraction threads insert
+session = scoped_session(Session)
+
+# ALTER TABLE ... DROP COLUMN, needed to retire the old plain-text code column
+DROP_COLUMN_SQLITE_VERSION = (3, 35, 0)
+
+def has_legacy_code_column(bind=None):
+    """Whether code_snippets still has the plain-text code column of the first schema."""
+    return "code" in {column["name"] for column in inspect(bind or engine).get_columns("code_snippets")}
+
+def _add_new_columns(bind):
+    """Add columns and indexes introduced after a database file was first created."""
+    existing_columns = {column["name"] for column in inspect(bind).get_columns("code_snippets")}
+    new_columns = {
+        "code_blob": "BLOB",
+        "code_size": "INTEGER NOT NULL DEFAULT 0",
+        "content_hash": "VARCHAR(40)",
+        "occurrences": "INTEGER NOT NULL DEFAULT 1",
+        "last_timestamp": "VARCHAR(20)",
+        "parent_id": "INTEGER",
+        "chain_id": "INTEGER",
+        "chain_depth": "INTEGER NOT NULL DEFAULT 0",
+        "is_delta": "BOOLEAN NOT NULL DEFAULT 0",
+        "is_head": "BOOLEAN NOT NULL DEFAULT 1",
+        "frame_number": "INTEGER",
+        "reindent": "BOOLEAN NOT NULL DEFAULT 1",
+        "video_key": "VARCHAR(16)",
+    }
+    with bind.begin() as connection:
+        for name, ddl in new_columns.items():
+            if name not in existing_columns:
+                connection.execute(text(f"ALTER TABLE code_snippets ADD COLUMN {name} {ddl}"))
+        for index in CodeSnippet.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+def _backfill_derived_data():
+    """Compute hashes, statistics and search indexes missing for stored snippets."""
+    backfill_content_hashes()
+    if session.query(SnippetStatistic).first() is None and session.query(CodeSnippet).first() is not None:
+        rebuild_statistics()
+    if session.query(CodeSnippet).first() is not None and (
+            session.query(CodeTrigram).first() is None or session.query(CodeSearchText).first() is None):
+        rebuild_trigram_index()
+
+def _migrate_schema():
+    """Bring the database file up to the current schema on startup.
+
+    Only cheap, always possible steps run here. A database still holding
+    code in the first schema's plain-text column is left to
+    `python database.py migrate`, since that rewrites every row.
+    """
+    _add_new_columns(engine)
+    if has_legacy_code_column():
+        print("code_snippets.db uses the old code column; run `python database.py migrate` to upgrade it",
+              file=sys.stderr)
+        return
+    _backfill_derived_data()
+
+def migrate_legacy_code_column(bind=None, batch_size=500):
+    """Move code bodies from the old plain-text code column into code_blob and drop the column.
+
+    Needs SQLite 3.35 or newer; older versions raise RuntimeError before
+    anything is changed. Returns the number of snippets moved. Run
+    compact_database() afterwards to release the space of the old column.
+    """
+    bind = bind or engine
+    if sqlite3.sqlite_version_info < DROP_COLUMN_SQLITE_VERSION:
+        raise RuntimeError(f"Migrating the database needs SQLite 3.35 or newer, this is SQLite {sqlite3.sqlite_version}")
+    if not has_legacy_code_column(bind):
+        return 0
+    _add_new_columns(bind)
+    moved = 0
+    with bind.begin() as connection:
+        last_id = 0
+        while True:
+            rows = connection.execute(text(
+                "SELECT id, code FROM code_snippets WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+            connection.execute(
+                text("UPDATE code_snippets SET code_blob = :blob, code_size = :size WHERE id = :id"),
+                [{"id": row_id, "blob": compress_code(code or ""), "size": len(code or "")} for row_id, code in rows]
+            )
+            last_id = rows[-1][0]
+            moved += len(rows)
+        connection.execute(text("ALTER TABLE code_snippets DROP COLUMN code"))
+    return moved
+
+def compact_database():
+    """Rewrite the database file to release space freed by deletions or recompression."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM"))
+
+def backfill_content_hashes(batch_size=500):
+    """Compute content hashes for rows stored before hashing was introduced."""
+    while True:
+        batch = session.query(CodeSnippet).filter(CodeSnippet.content_hash.is_(None)).limit(batch_size).all()
+        if not batch:
+            break
+        for snippet in batch:
+            snippet.content_hash = compute_content_hash(snippet.code)
+        session.commit()
+
+# Source file -> duplicate policy, since add_snippet needs it for every capture.
+# Each process caches its own; extractions run in processes started after the policy was set.
+_duplicate_policies = {}
+
+def get_duplicate_policy(source_file):
+    """Get the duplicate policy configured for a source file."""
+    source_file = source_file or ""
+    if source_file not in _duplicate_policies:
+        policy = session.query(SourcePolicy.duplicate_policy).filter(SourcePolicy.source_file == source_file).first()
+        _duplicate_policies[source_file] = policy[0] if policy else DEFAULT_DUPLICATE_POLICY
+    return _duplicate_policies[source_file]
+
+def set_duplicate_policy(source_file, duplicate_policy):
+    """Set how snippets duplicating already stored content of a source are handled."""
+    if duplicate_policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy: {duplicate_policy}")
+    policy = session.query(SourcePolicy).filter(SourcePolicy.source_file == (source_file or "")).first()
+    if policy is None:
+        policy = SourcePolicy(source_file=source_file or "")
+        session.add(policy)
+    policy.duplicate_policy = duplicate_policy
+    session.commit()
+    _duplicate_policies.pop(source_file or "", None)
+
+def is_video_processed(fingerprint):
+    """Whether a video file with this fingerprint was already extracted."""
+    return session.query(ProcessedVideo.fingerprint).filter(ProcessedVideo.fingerprint == fingerprint).first() is not None
+
+def record_processed_video(fingerprint, path, size, new_snippets, seconds=None):
+    """Add an extracted video file to the ledger."""
+    session.merge(ProcessedVideo(
+        fingerprint=fingerprint,
+        path=path,
+        source_file=os.path.basename(path),
+        size=size,
+        new_snippets=new_snippets,
+        seconds=seconds,
+        processed_at=datetime.datetime.utcnow()
+    ))
+    session.commit()
+
+def add_snippet(timestamp, language, code, source_file=None, parent_id=None, frame_number=None, reindent=True,
+                video_key=None):
+    """Add a new code snippet to the database, applying the source's duplicate policy.
+
+    If parent_id names the head of an edit chain of the same source that this
+    capture is an edit of, the snippet joins the chain as its new head and is
+    stored as a delta (or as a periodic full snapshot).
+
+    reindent is False for code whose indentation was read off the screen
+    rather than reconstructed by the formatter (see format_code). video_key
+    names the video frame_number is in, for thumbnails.
+
+    Returns the new snippet, the existing snippet the capture was merged into,
+    or None if the policy rejected the capture.
+    """
+    content_hash = compute_content_hash(code)
+    policy = get_duplicate_policy(source_file)
+    if policy != DUPLICATE_POLICY_ALLOW:
+        existing = session.query(CodeSnippet).filter(
+            CodeSnippet.source_file == source_file,
+            CodeSnippet.content_hash == content_hash
+        ).order_by(CodeSnippet.id).first()
+        if existing:
+            if policy == DUPLICATE_POLICY_REJECT:
+                return None
+            existing.occurrences = (existing.occurrences or 1) + 1
+            if policy == DUPLICATE_POLICY_SPAN:
+                existing.last_timestamp = max(existing.last_timestamp or existing.timestamp, timestamp)
+            session.commit()
+            return existing
 
-def add_snippet(timestamp, language, code, source_file=None):
-    """Add a new code snippet to the database."""
     snippet = CodeSnippet(
         timestamp=timestamp,
         language=language,
-        code=code,
-        source_file=source_file
+        source_file=source_file,
+        frame_number=frame_number,
+        reindent=reindent,
+        video_key=video_key
     )
+    parent = get_snippet_by_id(parent_id) if parent_id is not None else None
+    # A chain has one head; a capture resembling an older version starts a new chain
+    if parent is not None and parent.source_file == source_file and parent.is_head:
+        snippet.parent_id = parent.id
+        snippet.chain_id = parent.chain_id or parent.id
+        if (parent.chain_depth or 0) + 1 < SNAPSHOT_INTERVAL:
+            snippet.set_code_delta(parent, code)
+        if not snippet.is_delta or len(snippet.code_blob) >= len(compress_code(code)):
+            snippet.code = code
+        parent.is_head = False
+    else:
+        snippet.code = code
     session.add(snippet)
     session.commit()
     return snippet
 
+def _reconstruct_code(db_session, snippet_id, cache=None):
+    """Rebuild a snippet's code by applying deltas from the nearest full snapshot.
+
+    cache maps already reconstructed snippet IDs to their code.
+    """
+    cache = {} if cache is None else cache
+    pending = []
+    current_id = snippet_id
+    code = None
+    while current_id is not None:
+        if current_id in cache:
+            code = cache[current_id]
+            break
+        row = db_session.query(CodeSnippet.parent_id, CodeSnippet.is_delta, CodeSnippet.code_blob).filter(
+            CodeSnippet.id == current_id
+        ).first()
+        if row is None:
+            return None
+        parent_id, is_delta, blob = row
+        if not is_delta:
+            code = decompress_code(blob)
+            cache[current_id] = code
+            break
+        pending.append((current_id, blob))
+        current_id = parent_id
+    if code is None:
+        raise ValueError(f"Snippet {snippet_id} has a broken delta chain")
+    for pending_id, blob in reversed(pending):
+        code = apply_delta(code, blob)
+        cache[pending_id] = code
+    return code
+
+def rebuild_trigram_index(batch_size=500):
+    """Recompute the trigram index and the search text from the stored snippets."""
+    cache = {}
+    session.query(CodeTrigram).delete()
+    session.query(CodeSearchText).delete()
+    last_id = 0
+    while True:
+        ids = [row_id for row_id, in session.query(CodeSnippet.id).filter(
+            CodeSnippet.id > last_id).order_by(CodeSnippet.id).limit(batch_size)]
+        if not ids:
+            break
+        for snippet_id in ids:
+            code = _reconstruct_code(session, snippet_id, cache)
+            _index_trigrams(session.connection(), snippet_id, code)
+            _index_search_text(session.connection(), snippet_id, code)
+        session.commit()
+        last_id = ids[-1]
+        # Later batches only need the most recent chain versions
+        cache = {key: value for key, value in cache.items() if key > last_id - batch_size}
+
+def _substring_candidates(text):
+    """Subquery of IDs of snippets that may contain text, or None if the index cannot narrow it.
+
+    Any snippet containing text contains every trigram inside text's words.
+    """
+    trigrams = set()
+    for word in _WORD_PATTERN.findall(text.lower()):
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    if not trigrams:
+        return None
+    return session.query(CodeTrigram.snippet_id).filter(
+        CodeTrigram.trigram.in_(trigrams)
+    ).group_by(CodeTrigram.snippet_id).having(func.count(CodeTrigram.trigram) == len(trigrams))
+
+def word_similarity(a, b, threshold=0.0):
+    """1 minus the edit distance of two words relative to the longer one; 0 if below threshold."""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    max_distance = int((1 - threshold) * longest)
+    similarity = 1 - edit_distance(a, b, max_distance) / longest
+    return similarity if similarity >= threshold else 0.0
+
+def _fuzzy_scores(text, threshold=FUZZY_SEARCH_THRESHOLD, candidates=FUZZY_CANDIDATES, source_files=None):
+    """{snippet ID: score} of the snippets matching text with a score of at least threshold.
+
+    Each word of text is compared with the snippet's words one by one, and
+    scores its best word_similarity; the snippet's score is the mean over
+    text's words. Trigrams shared across several words (e.g. "char" and
+    "field" for CharField) therefore do not add up. The trigram index only
+    picks the candidates, the snippets sharing the most trigrams with text,
+    among the snippets of source_files if given.
+    """
+    query_words = sorted(set(_WORD_PATTERN.findall(text.lower())))
+    if not query_words:
+        return {}
+    matches = func.count(CodeTrigram.trigram)
+    candidate_query = session.query(CodeTrigram.snippet_id).filter(CodeTrigram.trigram.in_(code_trigrams(text)))
+    if source_files is not None:
+        candidate_query = candidate_query.filter(CodeTrigram.snippet_id.in_(
+            session.query(CodeSnippet.id).filter(CodeSnippet.source_file.in_(source_files))))
+    candidate_ids = [snippet_id for snippet_id, in candidate_query.group_by(
+        CodeTrigram.snippet_id).order_by(matches.desc(), CodeTrigram.snippet_id).limit(candidates)]
+
+    similarities = {}  # (query word, word) -> similarity; snippets share most of their words
+    scores = {}
+    for snippet, code in iter_snippets_with_code(candidate_ids):
+        words = set(_WORD_PATTERN.findall(code.lower()))
+        total = 0.0
+        for query_word in query_words:
+            best = 0.0
+            for word in words:
+                # Words too different in length cannot reach threshold
+                if abs(len(word) - len(query_word)) > (1 - threshold) * max(len(word), len(query_word)):
+                    continue
+                key = (query_word, word)
+                if key not in similarities:
+                    similarities[key] = word_similarity(query_word, word, threshold)
+                best = max(best, similarities[key])
+                if best == 1.0:
+                    break
+            total += best
+        score = total / len(query_words)
+        if score >= threshold:
+            scores[snippet.id] = score
+    return scores
+
+def fuzzy_search_snippets(text, threshold=FUZZY_SEARCH_THRESHOLD, limit=50):
+    """Search code for text while tolerating OCR character errors.
+
+    Returns up to limit (snippet, score) pairs, best first, where score is the
+    mean similarity of text's words to their closest words in the snippet
+    (see _fuzzy_scores) and at least threshold.
+    """
+    scores = _fuzzy_scores(text, threshold)
+    ranked = sorted(scores, key=lambda snippet_id: (-scores[snippet_id], snippet_id))[:limit]
+    snippets = {snippet.id: snippet for snippet in session.query(CodeSnippet).filter(CodeSnippet.id.in_(ranked))}
+    return [(snippets[snippet_id], scores[snippet_id]) for snippet_id in ranked if snippet_id in snippets]
+
+def _content_condition(text):
+    """SQL condition for snippets whose code contains text, ignoring case.
+
+    Runs on the search text table, narrowed by the trigram index when text
+    has words of three or more characters; no code body is decompressed.
+    """
+    matches = session.query(CodeSearchText.snippet_id).filter(func.instr(CodeSearchText.text, text.lower()) > 0)
+    candidates = _substring_candidates(text)
+    if candidates is not None:
+        matches = matches.filter(CodeSearchText.snippet_id.in_(candidates))
+    return CodeSnippet.id.in_(matches)
+
+def _filter_by_content(query, text):
+    """Restrict a snippet query to code containing text."""
+    return query.filter(_content_condition(text))
+
+def get_snippet_chain(snippet_id):
+    """Get every version in the edit chain of a snippet, oldest first."""
+    snippet = get_snippet_by_id(snippet_id)
+    if snippet is None:
+        return []
+    chain_id = snippet.chain_id or snippet.id
+    return session.query(CodeSnippet).filter(
+        or_(CodeSnippet.id == chain_id, CodeSnippet.chain_id == chain_id)
+    ).order_by(CodeSnippet.id).all()
+
+def get_final_snippets(source_file=None):
+    """Get only the latest version of every edit chain."""
+    query = session.query(CodeSnippet).filter(CodeSnippet.is_head.is_(True))
+    if source_file is not None:
+        query = query.filter(CodeSnippet.source_file == source_file)
+    return query.order_by(CodeSnippet.timestamp).all()
+
 def get_all_snippets():
     """Get all snippets from the database."""
     return session.query(CodeSnippet).order_by(CodeSnippet.timestamp).all()
@@ -64,6 +798,10 @@ def get_snippet_by_id(snippet_id):
     """Get a specific snippet by ID."""
     return session.query(CodeSnippet).filter(CodeSnippet.id == snippet_id).first()
 
+def get_snippet_code(snippet_id):
+    """Get only the code of a snippet, without loading the rest of the row."""
+    return _reconstruct_code(session, snippet_id)
+
 def get_snippets_by_language(language):
     """Get all snippets for a specific language."""
     return session.query(CodeSnippet).filter(CodeSnippet.language == language).all()
@@ -77,22 +815,105 @@ def get_snippets_by_time_range(start_time, end_time):
 
 def get_snippets_containing(text):
     """Get snippets containing specific text."""
-    search_pattern = f"%{text}%"
-    return session.query(CodeSnippet).filter(CodeSnippet.code.like(search_pattern)).all()
+    return _filter_by_content(session.query(CodeSnippet), text).all()
 
 def delete_snippet(snippet_id):
     """Delete a snippet by ID."""
     snippet = session.query(CodeSnippet).filter(CodeSnippet.id == snippet_id).first()
     if snippet:
+        # Store children in full so their chains survive without this version
+        for child in session.query(CodeSnippet).filter(CodeSnippet.parent_id == snippet.id).all():
+            child.code = child.code
+            child.parent_id = snippet.parent_id
+        if snippet.parent_id is not None and snippet.is_head:
+            siblings = session.query(CodeSnippet.id).filter(
+                CodeSnippet.parent_id == snippet.parent_id, CodeSnippet.id != snippet.id
+            ).first()
+            parent = get_snippet_by_id(snippet.parent_id)
+            if parent is not None and siblings is None:
+                parent.is_head = True
         session.delete(snippet)
         session.commit()
         return True
     return False
 
-def filter_snippets(language=None, start_time=None, end_time=None, content=None, remove_duplicates=False):
-    """Filter snippets based on multiple criteria."""
+def update_snippet_codes(new_codes):
+    """Replace the code of many snippets at once, e.g. after a formatting rules upgrade.
+
+    new_codes maps snippet IDs to their new code. The edit chains of the
+    changed snippets are re-encoded, so deltas stay valid against their
+    parents' new code. Returns the number of snippets whose code changed.
+    """
+    chain_ids = {
+        chain_id or snippet_id for snippet_id, chain_id in
+        session.query(CodeSnippet.id, CodeSnippet.chain_id).filter(CodeSnippet.id.in_(list(new_codes)))
+    }
+    changed = 0
+    for chain_id in chain_ids:
+        members = session.query(CodeSnippet).filter(
+            or_(CodeSnippet.id == chain_id, CodeSnippet.chain_id == chain_id)
+        ).order_by(CodeSnippet.id).all()
+        cache = {}
+        old_codes = {member.id: _reconstruct_code(session, member.id, cache) for member in members}
+        codes = {member_id: new_codes.get(member_id, code) for member_id, code in old_codes.items()}
+        by_id = {member.id: member for member in members}
+        # Parents have lower IDs, so they are re-encoded before their children
+        for member in members:
+            code = codes[member.id]
+            parent = by_id.get(member.parent_id)
+            if parent is not None and (parent.chain_depth or 0) + 1 < SNAPSHOT_INTERVAL:
+                member.set_code_delta(parent, code, parent_code=codes[parent.id])
+                if len(member.code_blob) >= len(compress_code(code)):
+                    member.code = code
+            else:
+                member.code = code
+            if code != old_codes[member.id]:
+                changed += 1
+        session.commit()
+    return changed
+
+def filter_snippets(language=None, start_time=None, end_time=None, content=None, remove_duplicates=False,
+                    final_only=False, fuzzy=False, source_files=None):
+    """Filter snippets based on multiple criteria.
+
+    With fuzzy, content matches snippets similar enough to it through the
+    trigram index instead of requiring an exact substring. source_files
+    limits the search to the snippets of those sources.
+    """
+    return _filtered_query(language, start_time, end_time, content, remove_duplicates, final_only, fuzzy,
+                           source_files).all()
+
+def iter_filtered_summaries(language=None, start_time=None, end_time=None, content=None, remove_duplicates=False,
+                            final_only=False, fuzzy=False, source_files=None, batch_size=500):
+    """Like filter_snippets, but yield lists of snippet summaries as rows are read.
+
+    Only metadata is read, so code bodies are never loaded. Safe to run on a
+    worker thread, which gets its own session.
+    """
+    query = _filtered_query(language, start_time, end_time, content, remove_duplicates, final_only, fuzzy,
+                            source_files)
+    batch = []
+    for snippet in query.yield_per(batch_size):
+        batch.append(snippet.to_summary())
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _filtered_query(language, start_time, end_time, content, remove_duplicates, final_only, fuzzy,
+                    source_files=None):
+    """Build the query behind filter_snippets, ordered by timestamp."""
     query = session.query(CodeSnippet)
     
+    # Only the sources being looked at
+    if source_files is not None:
+        query = query.filter(CodeSnippet.source_file.in_(source_files))
+    
+    # Only the latest version of each edit chain
+    if final_only:
+        query = query.filter(CodeSnippet.is_head.is_(True))
+    
     # Apply language filter
     if language:
         query = query.filter(CodeSnippet.language == language)
@@ -104,66 +925,182 @@ def filter_snippets(language=None, start_time=None, end_time=None, content=None,
         query = query.filter(CodeSnippet.timestamp <= end_time)
     
     # Apply content filter
-    if content:
-        query = query.filter(CodeSnippet.code.like(f"%{content}%"))
+    if content and fuzzy:
+        query = query.filter(CodeSnippet.id.in_(list(_fuzzy_scores(content, source_files=source_files))))
+    elif content:
+        query = _filter_by_content(query, content)
     
-    # Get results
-    results = query.order_by(CodeSnippet.timestamp).all()
-    
-    # Remove duplicates if required
+    # Keep only the first matching snippet of each distinct content
     if remove_duplicates:
-        unique_snippets = []
-        code_hashes = set()
-        for snippet in results:
-            code_hash = hash(snippet.code)
-            if code_hash not in code_hashes:
-                unique_snippets.append(snippet)
-                code_hashes.add(code_hash)
-        return unique_snippets
+        first_ids = query.with_entities(func.min(CodeSnippet.id)).group_by(CodeSnippet.content_hash)
+        query = session.query(CodeSnippet).filter(CodeSnippet.id.in_(first_ids))
     
-    return results
+    return query.order_by(CodeSnippet.timestamp)
+
+def iter_snippets_with_code(snippet_ids=None, batch_size=500):
+    """Yield (snippet, code) pairs, reading code bodies one batch at a time.
+
+    Snippets come in the order of snippet_ids, or by timestamp for all
+    snippets. Each batch is released from the session once consumed, so
+    memory use does not grow with the number of snippets.
+    """
+    if snippet_ids is None:
+        snippet_ids = [row_id for row_id, in session.query(CodeSnippet.id).order_by(CodeSnippet.timestamp)]
+    for start in range(0, len(snippet_ids), batch_size):
+        batch_ids = snippet_ids[start:start + batch_size]
+        snippets = {snippet.id: snippet for snippet in session.query(CodeSnippet).options(
+            undefer(CodeSnippet.code_blob)).filter(CodeSnippet.id.in_(batch_ids))}
+        cache = {}
+        for snippet_id in batch_ids:
+            snippet = snippets.get(snippet_id)
+            if snippet is None:
+                continue
+            if snippet.is_delta:
+                code = _reconstruct_code(session, snippet_id, cache)
+            else:
+                code = decompress_code(snippet.code_blob)
+            yield snippet, code
+        for snippet in snippets.values():
+            session.expunge(snippet)
 
 def export_all_to_json(file_path):
-    """Export all snippets to a JSON file."""
-    snippets = get_all_snippets()
-    data = [snippet.to_dict() for snippet in snippets]
-    
-    with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
+    """Export all snippets to a JSON file, streamed from the database."""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for index, (snippet, code) in enumerate(iter_snippets_with_code()):
+            data = snippet.to_dict()
+            data["code"] = code
+            f.write(",\n    " if index else "\n    ")
+            f.write(json.dumps(data, indent=4).replace("\n", "\n    "))
+        f.write("\n]")
+
+def export_snippets(export_path, export_format, **options):
+    """Export snippets headless; see exporter.export_snippets for the options."""
+    from exporter import export_snippets as run_export
+    return run_export(export_path, export_format, **options)
 
 def import_from_json(file_path):
-    """Import snippets from a JSON file."""
+    """Import snippets from a JSON file written by export_all_to_json.
+
+    Edit chains are restored under the new IDs: parent_id and chain_id are
+    remapped, and versions exported as deltas are stored as deltas of their
+    imported parent again. A snippet whose parent is not in the file starts
+    a chain of its own.
+    """
     with open(file_path, 'r') as f:
         data = json.load(f)
     
-    for item in data:
+    imported = {}  # Exported ID -> (imported snippet, code)
+    # Parents have lower IDs than their edits, so they are imported first
+    for item in sorted(data, key=lambda item: item.get("id") or 0):
         snippet = CodeSnippet.from_dict(item)
+        parent, parent_code = imported.get(item.get("parent_id"), (None, None))
+        if parent is not None and parent.is_head:
+            snippet.parent_id = parent.id
+            snippet.chain_id = parent.chain_id or parent.id
+            if item.get("is_delta"):
+                snippet.set_code_delta(parent, item.get("code", ""), parent_code)
+            parent.is_head = False
         session.add(snippet)
+        session.flush()
+        if item.get("id") is not None:
+            imported[item["id"]] = (snippet, item.get("code", ""))
     
     session.commit()
 
 def clear_database():
     """Remove all snippets from the database."""
     session.query(CodeSnippet).delete()
+    session.query(SnippetStatistic).delete()
+    session.query(CodeTrigram).delete()
+    session.query(CodeSearchText).delete()
     session.commit()
 
-def get_statistics():
-    """Get statistics about the database."""
-    total_snippets = session.query(CodeSnippet).count()
-    languages = session.query(CodeSnippet.language, func.count(CodeSnippet.id)).group_by(CodeSnippet.language).all()
-    
-    language_stats = {lang: count for lang, count in languages}
-    
+def rebuild_statistics():
+    """Recompute the statistics counters from the snippets table."""
+    bucket = func.strftime("%Y-%m-%d %H", CodeSnippet.created_at)
+    rows = session.query(
+        func.coalesce(CodeSnippet.source_file, ""),
+        CodeSnippet.language,
+        bucket,
+        func.count(CodeSnippet.id),
+        func.sum(CodeSnippet.code_size),
+        func.min(CodeSnippet.created_at),
+        func.max(CodeSnippet.created_at)
+    ).group_by(CodeSnippet.source_file, CodeSnippet.language, bucket).all()
+
+    session.query(SnippetStatistic).delete()
+    for source_file, language, bucket_key, count, code_bytes, first_seen, last_seen in rows:
+        session.add(SnippetStatistic(
+            source_file=source_file,
+            language=language,
+            bucket=bucket_key or _statistics_bucket(datetime.datetime.utcnow()),
+            snippet_count=count,
+            code_bytes=code_bytes or 0,
+            first_seen=first_seen,
+            last_seen=last_seen
+        ))
+    session.commit()
+
+def get_statistics(source_file=None, start=None, end=None):
+    """Get statistics about the database from the maintained counters.
+
+    Optionally restricted to one source file and to snippets created between
+    the datetimes start and end (at hour granularity).
+    """
+    query = session.query(SnippetStatistic)
+    if source_file is not None:
+        query = query.filter(SnippetStatistic.source_file == source_file)
+    if start:
+        query = query.filter(SnippetStatistic.bucket >= _statistics_bucket(start))
+    if end:
+        query = query.filter(SnippetStatistic.bucket <= _statistics_bucket(end))
+
+    totals = query.with_entities(
+        func.sum(SnippetStatistic.snippet_count),
+        func.sum(SnippetStatistic.code_bytes),
+        func.min(SnippetStatistic.first_seen),
+        func.max(SnippetStatistic.last_seen)
+    ).one()
+    languages = query.with_entities(
+        SnippetStatistic.language, func.sum(SnippetStatistic.snippet_count)
+    ).group_by(SnippetStatistic.language).all()
+    sources = query.with_entities(
+        SnippetStatistic.source_file, func.sum(SnippetStatistic.snippet_count)
+    ).group_by(SnippetStatistic.source_file).all()
+
     return {
-        "total_snippets": total_snippets,
-        "languages": language_stats
+        "total_snippets": totals[0] or 0,
+        "total_code_bytes": totals[1] or 0,
+        "first_seen": totals[2],
+        "last_seen": totals[3],
+        "languages": {lang: count for lang, count in languages},
+        "sources": {source: count for source, count in sources}
     }
 
 def search_snippets(query):
     """Search snippets by language or content."""
-    return session.query(CodeSnippet).filter(
+    snippets = session.query(CodeSnippet)
+    return snippets.filter(
         or_(
             CodeSnippet.language.like(f"%{query}%"),
-            CodeSnippet.code.like(f"%{query}%")
+            _content_condition(query)
         )
-    ).all()
\ No newline at end of file
+    ).all()
+
+_migrate_schema()
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild-statistics"]:
+        rebuild_statistics()
+        print(json.dumps(get_statistics(), default=str, indent=4))
+    elif sys.argv[1:] == ["rebuild-trigram-index"]:
+        rebuild_trigram_index()
+    elif sys.argv[1:] == ["migrate"]:
+        print(f"Moved {migrate_legacy_code_column()} snippets out of the old code column")
+        _backfill_derived_data()
+        print("Run `python database.py compact` to release the space it used")
+    elif sys.argv[1:] == ["compact"]:
+        compact_database()
+    else:
+        print("Usage: python database.py rebuild-statistics | rebuild-trigram-index | migrate | compact")
@@ -0,0 +1,334 @@
+"""Streaming export of stored snippets to files or archives.
+
+Snippets are read from the database in batches and written straight to
+disk, so exports of any size run in bounded memory. Nothing here depends
+on Qt; the GUI runs export_snippets on a worker thread.
+"""
+import html
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from database import iter_snippets_with_code
+
+ARCHIVE_ZIP = "zip"
+ARCHIVE_TAR_GZ = "tar.gz"
+
+class DirectorySink:
+    """Writes export files into a directory
+
+    Files are written under temporary names and only renamed into place by
+    close(), so a cancelled or failed export leaves the directory as it was.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = directory
+        self.written = []  # (temporary path, final path)
+
+    @contextmanager
+    def open(self, name):
+        path = os.path.join(self.directory, name)
+        temporary = f"{path}.{os.getpid()}.part"
+        self.written.append((temporary, path))
+        with open(temporary, 'w', encoding='utf-8') as f:
+            yield f
+
+    def close(self):
+        for temporary, path in self.written:
+            os.replace(temporary, path)
+        self.written = []
+
+    def discard(self):
+        for temporary, _ in self.written:
+            try:
+                os.remove(temporary)
+            except FileNotFoundError:
+                pass
+        self.written = []
+
+class ZipSink:
+    """Streams export files into a zip archive"""
+    def __init__(self, path):
+        self.path = path
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    @contextmanager
+    def open(self, name):
+        with self.archive.open(name, 'w', force_zip64=True) as member:
+            with io.TextIOWrapper(member, encoding='utf-8') as f:
+                yield f
+
+    def close(self):
+        self.archive.close()
+
+    def discard(self):
+        self.archive.close()
+        os.remove(self.path)
+
+class TarSink:
+    """Writes export files into a gzip-compressed tar archive
+
+    Tar headers need each member's size up front, so members are spooled
+    to a temporary file (in memory while small) before being added.
+    """
+    SPOOL_LIMIT = 8 * 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.archive = tarfile.open(path, 'w:gz')
+
+    @contextmanager
+    def open(self, name):
+        with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_LIMIT) as spool:
+            f = io.TextIOWrapper(spool, encoding='utf-8')
+            yield f
+            f.flush()
+            info = tarfile.TarInfo(name)
+            info.size = spool.tell()
+            info.mtime = int(datetime.now().timestamp())
+            spool.seek(0)
+            self.archive.addfile(info, spool)
+            f.detach()
+
+    def close(self):
+        self.archive.close()
+
+    def discard(self):
+        self.archive.close()
+        os.remove(self.path)
+
+def open_sink(export_path, base_filename, archive=None):
+    """Sink writing into export_path, or into an archive created there"""
+    if archive == ARCHIVE_ZIP:
+        return ZipSink(os.path.join(export_path, f"{base_filename}.zip"))
+    if archive == ARCHIVE_TAR_GZ:
+        return TarSink(os.path.join(export_path, f"{base_filename}.tar.gz"))
+    return DirectorySink(export_path)
+
+class SnippetWriter:
+    """Writes one export format as a header, one entry per snippet and a footer"""
+    extension = ".txt"
+    separate_files = False  # Whether the format can write one file per snippet
+
+    def __init__(self, include_timestamps=True, include_language=True, source_label="video"):
+        self.include_timestamps = include_timestamps
+        self.include_language = include_language
+        self.source_label = source_label
+
+    def accepts(self, snippet):
+        return True
+
+    def header(self, f):
+        pass
+
+    def snippet(self, f, number, snippet, code, first):
+        raise NotImplementedError
+
+    def footer(self, f):
+        pass
+
+class PythonWriter(SnippetWriter):
+    extension = ".py"
+    separate_files = True
+
+    def accepts(self, snippet):
+        return snippet.language.lower() == "python"
+
+    def snippet(self, f, number, snippet, code, first):
+        f.write(f"# Snippet {number}\n")
+        if self.include_timestamps:
+            f.write(f"# Timestamp: {snippet.timestamp}\n")
+        if self.include_language:
+            f.write(f"# Language: {snippet.language}\n")
+        f.write("\n")
+        f.write(code)
+        f.write("\n\n" + "#" * 80 + "\n\n")
+
+class HtmlWriter(SnippetWriter):
+    extension = ".html"
+
+    def header(self, f):
+        f.write("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Extracted Code Snippets</title>
+    <style>
+        body { font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; }
+        .snippet { margin-bottom: 30px; border: 1px solid #ddd; padding: 15px; border-radius: 5px; }
+        .snippet-header { margin-bottom: 10px; color: #555; }
+        pre { background-color: #f5f5f5; padding: 10px; border-radius: 3px; overflow-x: auto; }
+        .divider { margin: 40px 0; border-top: 1px solid #eee; }
+    </style>
+</head>
+<body>
+    <h1>Extracted Code Snippets</h1>
+    <p>Extracted from: """ + html.escape(self.source_label) + """</p>
+""")
+
+    def snippet(self, f, number, snippet, code, first):
+        if not first:
+            f.write('<div class="divider"></div>\n')
+        f.write('<div class="snippet">\n')
+        f.write('<div class="snippet-header">\n')
+        f.write(f'<h2>Snippet {number}</h2>\n')
+        if self.include_timestamps:
+            f.write(f'<p><strong>Timestamp:</strong> {snippet.timestamp}</p>\n')
+        if self.include_language:
+            f.write(f'<p><strong>Language:</strong> {html.escape(snippet.language)}</p>\n')
+        f.write('</div>\n')
+        f.write(f'<pre><code>{html.escape(code)}</code></pre>\n')
+        f.write('</div>\n')
+
+    def footer(self, f):
+        f.write("""</body>
+</html>""")
+
+class MarkdownWriter(SnippetWriter):
+    extension = ".md"
+
+    def header(self, f):
+        f.write("# Extracted Code Snippets\n\n")
+        f.write(f"Extracted from: {self.source_label}\n\n")
+
+    def snippet(self, f, number, snippet, code, first):
+        if not first:
+            f.write("---\n\n")
+        f.write(f"## Snippet {number}\n\n")
+        if self.include_timestamps:
+            f.write(f"**Timestamp:** {snippet.timestamp}\n\n")
+        if self.include_language:
+            f.write(f"**Language:** {snippet.language}\n\n")
+        f.write(f"```{snippet.language.lower()}\n")
+        f.write(code)
+        f.write("\n```\n\n")
+
+class TextWriter(SnippetWriter):
+    extension = ".txt"
+
+    def header(self, f):
+        f.write("EXTRACTED CODE SNIPPETS\n")
+        f.write("=" * 80 + "\n\n")
+        f.write(f"Extracted from: {self.source_label}\n\n")
+
+    def snippet(self, f, number, snippet, code, first):
+        f.write(f"SNIPPET {number}\n")
+        f.write("-" * 80 + "\n")
+        if self.include_timestamps:
+            f.write(f"Timestamp: {snippet.timestamp}\n")
+        if self.include_language:
+            f.write(f"Language: {snippet.language}\n")
+        f.write("\n")
+        f.write(code)
+        f.write("\n\n")
+
+class JsonWriter(SnippetWriter):
+    extension = ".json"
+
+    def header(self, f):
+        f.write("[")
+
+    def snippet(self, f, number, snippet, code, first):
+        data = {
+            "timestamp": snippet.timestamp,
+            "language": snippet.language,
+            "code": code
+        }
+        f.write("\n    " if first else ",\n    ")
+        f.write(json.dumps(data, indent=4).replace("\n", "\n    "))
+
+    def footer(self, f):
+        f.write("\n]")
+
+EXPORT_WRITERS = {
+    "python": PythonWriter,
+    "html": HtmlWriter,
+    "markdown": MarkdownWriter,
+    "text": TextWriter,
+    "json": JsonWriter,
+}
+
+def export_snippets(export_path, export_format, snippet_ids=None, base_filename=None,
+                    include_timestamps=True, include_language=True, separate_files=False,
+                    archive=None, source_label=None, progress_callback=None, cancel_event=None):
+    """Export snippets to export_path in one of EXPORT_WRITERS' formats.
+
+    snippet_ids selects and orders the snippets (all snippets by timestamp
+    if None). With archive set to ARCHIVE_ZIP or ARCHIVE_TAR_GZ the files are
+    written into a single archive in export_path. separate_files writes one
+    file per snippet for the Python format only; the other formats always
+    write one document. progress_callback receives (snippets done, total);
+    setting cancel_event (a threading.Event) stops the export and removes
+    everything it wrote.
+
+    Returns the path written to, or None if the export was cancelled.
+    """
+    if export_format not in EXPORT_WRITERS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if base_filename is None:
+        base_filename = f"code_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if snippet_ids is None:
+        from database import CodeSnippet, session
+        snippet_ids = [row_id for row_id, in session.query(CodeSnippet.id).order_by(CodeSnippet.timestamp)]
+    writer = EXPORT_WRITERS[export_format](include_timestamps, include_language, source_label or "video")
+    total = len(snippet_ids)
+    sink = open_sink(export_path, base_filename, archive)
+    
+    try:
+        snippets = iter_snippets_with_code(snippet_ids)
+        if separate_files and writer.separate_files:
+            for index, (snippet, code) in enumerate(snippets):
+                if cancel_event is not None and cancel_event.is_set():
+                    sink.discard()
+                    return None
+                if writer.accepts(snippet):
+                    with sink.open(f"{base_filename}_{index + 1}{writer.extension}") as f:
+                        writer.header(f)
+                        writer.snippet(f, index + 1, snippet, code, True)
+                        writer.footer(f)
+                if progress_callback:
+                    progress_callback(index + 1, total)
+        else:
+            with sink.open(f"{base_filename}{writer.extension}") as f:
+                writer.header(f)
+                first = True
+                for index, (snippet, code) in enumerate(snippets):
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    if writer.accepts(snippet):
+                        writer.snippet(f, index + 1, snippet, code, first)
+                        first = False
+                    if progress_callback:
+                        progress_callback(index + 1, total)
+                writer.footer(f)
+            if cancel_event is not None and cancel_event.is_set():
+                sink.discard()
+                return None
+    except Exception:
+        sink.discard()
+        raise
+    sink.close()
+    return sink.path
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Export stored code snippets")
+    parser.add_argument("export_path", help="Directory to write the export into")
+    parser.add_argument("--format", choices=sorted(EXPORT_WRITERS), default="markdown")
+    parser.add_argument("--archive", choices=[ARCHIVE_ZIP, ARCHIVE_TAR_GZ])
+    parser.add_argument("--separate-files", action="store_true")
+    parser.add_argument("--name", help="Base file name of the export")
+    args = parser.parse_args()
+    
+    path = export_snippets(
+        args.export_path, args.format, base_filename=args.name,
+        separate_files=args.separate_files, archive=args.archive,
+        progress_callback=lambda done, total: print(f"\r{done}/{total}", end="", flush=True)
+    )
+    print(f"\nExported to {path}")
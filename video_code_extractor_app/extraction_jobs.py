@@ -0,0 +1,262 @@
+"""Extraction jobs run in worker processes, and the queue scheduling them.
+
+EasyOCR and the text stages are CPU-bound Python, so extractions running as
+threads of one process take turns on the GIL. extract_in_process() runs
+extract_code_from_video in a spawned process instead and relays its
+callbacks and pause/cancel requests, so the GUI can drive it from a thread
+as before. Each process loads its own OCR models, which is why the number
+of jobs running at once is bounded by JobQueue's concurrency.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+
+# Seconds between two checks of a job process for messages and control changes
+POLL_INTERVAL = 0.1
+# Seconds a job process gets to stop on its own after it was cancelled or finished
+JOIN_TIMEOUT = 5.0
+
+class ExtractionControl:
+    """Cooperative cancel and pause for extract_code_from_video, checked between frames.
+
+    Also exposes the number of frames decoded so far for progress reporting.
+    With a multiprocessing context the state lives in shared memory, so the
+    control can be passed to a process started from that context.
+    """
+    def __init__(self, context=None):
+        events = threading if context is None else context
+        self._cancelled = events.Event()
+        self._running = events.Event()
+        self._running.set()
+        # frames_done, total_frames
+        self._counters = [0, 0] if context is None else context.RawArray("q", 2)
+
+    @property
+    def frames_done(self):
+        return self._counters[0]
+
+    @frames_done.setter
+    def frames_done(self, value):
+        self._counters[0] = value
+
+    @property
+    def total_frames(self):
+        return self._counters[1]
+
+    @total_frames.setter
+    def total_frames(self, value):
+        self._counters[1] = value
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # Wake a paused extraction so it can stop
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        """Block while paused; return False once the extraction should stop."""
+        self._running.wait()
+        return not self._cancelled.is_set()
+
+def _run_extraction(extract, video_path, options, control, messages):
+    """Body of a job process: extract and report through the messages queue."""
+    from database import session
+
+    if extract is None:
+        from ocr_extractor import extract_code_from_video as extract
+    try:
+        extract(
+            video_path,
+            progress_callback=lambda value: messages.put(("progress", value)),
+            snippet_callback=lambda snippet: messages.put(("snippet", snippet)),
+            control=control,
+            **options
+        )
+        messages.put(("done", None))
+    except Exception as e:
+        messages.put(("done", str(e)))
+    finally:
+        session.remove()
+
+def extract_in_process(video_path, progress_callback=None, snippet_callback=None, control=None, extract=None,
+                       **options):
+    """Run extract_code_from_video in a new process; same signature, and blocks the same way.
+
+    The callbacks are called on the calling thread, and control is mirrored
+    into the process. extract replaces extract_code_from_video with another
+    picklable function taking the same arguments.
+    """
+    # Spawned, so the process does not inherit the database connections of this one
+    context = multiprocessing.get_context("spawn")
+    shared = ExtractionControl(context)
+    messages = context.Queue()
+    process = context.Process(target=_run_extraction, args=(extract, video_path, options, shared, messages),
+                              daemon=True)
+    process.start()
+    paused = False
+    try:
+        while True:
+            if control is not None:
+                if control.cancelled:
+                    shared.cancel()
+                elif control.paused != paused:
+                    paused = control.paused
+                    if paused:
+                        shared.pause()
+                    else:
+                        shared.resume()
+                control.frames_done = shared.frames_done
+                control.total_frames = shared.total_frames
+            try:
+                kind, value = messages.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not process.is_alive():
+                    raise RuntimeError(f"Extraction process exited with code {process.exitcode}")
+                continue
+            if kind == "progress" and progress_callback:
+                progress_callback(value)
+            elif kind == "snippet" and snippet_callback:
+                snippet_callback(value)
+            elif kind == "done":
+                if control is not None:
+                    control.frames_done = shared.frames_done
+                    control.total_frames = shared.total_frames
+                if value is not None:
+                    raise RuntimeError(value)
+                return
+    finally:
+        shared.cancel()  # Stops the process if the caller gave up waiting
+        process.join(JOIN_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+class ExtractionJob:
+    """A queued video together with its control and progress"""
+    PENDING, RUNNING, PAUSED, DONE, CANCELLED, FAILED = (
+        "Pending", "Running", "Paused", "Done", "Cancelled", "Failed")
+
+    def __init__(self, video_path):
+        self.video_path = video_path
+        self.control = ExtractionControl()
+        self.thread = None  # Set by the GUI to the thread waiting on the job's process
+        self.status = self.PENDING
+        self.progress = 0
+        self.error = None
+        self.active_seconds = 0.0  # Time spent running, excluding pauses
+        self.resumed_at = None
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.CANCELLED, self.FAILED)
+
+    def elapsed(self):
+        if self.resumed_at is None:
+            return self.active_seconds
+        return self.active_seconds + time.monotonic() - self.resumed_at
+
+    def throughput(self):
+        """Decoded video frames per second of running time."""
+        elapsed = self.elapsed()
+        return self.control.frames_done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Estimated seconds left, or None while unknown."""
+        rate = self.throughput()
+        if rate <= 0 or not self.control.total_frames:
+            return None
+        return max(self.control.total_frames - self.control.frames_done, 0) / rate
+
+class JobQueue:
+    """Extraction jobs in the order queued, started while fewer than concurrency are active
+
+    start_job(job) launches a job's extraction; whoever runs it reports the
+    end through job_finished(). Paused jobs keep their slot, since their
+    process keeps its models loaded.
+    """
+    def __init__(self, start_job, concurrency=1):
+        self.start_job = start_job
+        self.concurrency = concurrency
+        self.jobs = []
+
+    @property
+    def idle(self):
+        return all(job.finished for job in self.jobs)
+
+    def add(self, video_path):
+        """Queue a video; call start_pending() to start it if there is room."""
+        job = ExtractionJob(video_path)
+        self.jobs.append(job)
+        return job
+
+    def running_count(self):
+        return sum(1 for job in self.jobs if job.status in (ExtractionJob.RUNNING, ExtractionJob.PAUSED))
+
+    def set_concurrency(self, concurrency):
+        self.concurrency = concurrency
+        self.start_pending()
+
+    def start_pending(self):
+        """Start pending jobs until the concurrency limit is reached"""
+        for job in self.jobs:
+            if self.running_count() >= self.concurrency:
+                break
+            if job.status == ExtractionJob.PENDING:
+                job.status = ExtractionJob.RUNNING
+                job.resumed_at = time.monotonic()
+                self.start_job(job)
+
+    def job_finished(self, job, error=None):
+        job.active_seconds = job.elapsed()
+        job.resumed_at = None
+        job.error = error
+        if error is not None:
+            job.status = ExtractionJob.FAILED
+        elif job.control.cancelled:
+            job.status = ExtractionJob.CANCELLED
+        else:
+            job.status = ExtractionJob.DONE
+            job.progress = 100
+        self.start_pending()
+
+    def toggle_pause(self, job):
+        if job.status == ExtractionJob.RUNNING:
+            job.control.pause()
+            job.active_seconds = job.elapsed()
+            job.resumed_at = None
+            job.status = ExtractionJob.PAUSED
+        elif job.status == ExtractionJob.PAUSED:
+            job.control.resume()
+            job.resumed_at = time.monotonic()
+            job.status = ExtractionJob.RUNNING
+
+    def cancel(self, job):
+        if job.status == ExtractionJob.PENDING:
+            job.status = ExtractionJob.CANCELLED
+        elif not job.finished:
+            # The job stops at its next frame and reports through job_finished
+            job.control.cancel()
+
+    def cancel_all(self):
+        for job in self.jobs:
+            self.cancel(job)
+
+    def clear_finished(self):
+        """Forget finished jobs; returns their former positions, last first."""
+        rows = [row for row in reversed(range(len(self.jobs))) if self.jobs[row].finished]
+        for row in rows:
+            del self.jobs[row]
+        return rows
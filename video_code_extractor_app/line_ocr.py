@@ -0,0 +1,168 @@
+"""Line-level incremental OCR across consecutive frames.
+
+In live-coding videos most of the screen stays the same between two
+sampled frames; usually only the line being typed changes. IncrementalLineOCR
+keeps the text boxes found in the previous frame together with their
+recognized text, compares each box's pixels with the new frame and runs
+recognition only on the boxes that changed. Text detection itself is only
+repeated when pixels change outside the known boxes.
+
+The boxes' x offsets are also used to rebuild the indentation that
+EasyOCR's plain text output loses.
+"""
+import numpy as np
+
+# Fraction of a box's pixels that must differ for it to be recognized again
+BOX_CHANGE_THRESHOLD = 0.02
+# Differing pixels outside the known boxes that trigger a new text detection
+NEW_TEXT_PIXELS = 50
+# Pixel tolerance when matching newly detected boxes to cached ones
+BOX_MATCH_TOLERANCE = 4
+# Margin around boxes treated as belonging to them when looking for new text
+BOX_MARGIN = 4
+# Spaces per indentation level of the rebuilt text
+INDENT_WIDTH = 4
+
+class TextBox:
+    """A detected text region with its recognized text"""
+    __slots__ = ("x_min", "x_max", "y_min", "y_max", "text", "confidence")
+
+    def __init__(self, x_min, x_max, y_min, y_max, text="", confidence=0.0):
+        # Detection margins can reach past the image edge; recognition clips them the same way
+        self.x_min, self.y_min = max(int(x_min), 0), max(int(y_min), 0)
+        self.x_max, self.y_max = int(x_max), int(y_max)
+        self.text = text
+        self.confidence = confidence
+
+    @property
+    def coordinates(self):
+        return [self.x_min, self.x_max, self.y_min, self.y_max]
+
+    def region(self, image):
+        return image[self.y_min:self.y_max, self.x_min:self.x_max]
+
+    def matches(self, other, tolerance=BOX_MATCH_TOLERANCE):
+        return all(abs(a - b) <= tolerance for a, b in zip(self.coordinates, other.coordinates))
+
+class IncrementalLineOCR:
+    """OCR of a sequence of preprocessed frames with an EasyOCR reader, reusing unchanged lines
+
+    Call read() with each frame in order; it returns the recognized boxes.
+    lines_recognized and lines_reused count the work done and saved.
+    """
+    def __init__(self, reader, change_threshold=BOX_CHANGE_THRESHOLD):
+        self.reader = reader
+        self.change_threshold = change_threshold
+        self.previous_frame = None
+        self.boxes = []
+        self.lines_recognized = 0
+        self.lines_reused = 0
+        self.detections = 0
+
+    def reset(self):
+        """Forget the previous frame, e.g. after seeking."""
+        self.previous_frame = None
+        self.boxes = []
+
+    def read(self, frame):
+        """Recognized TextBoxes of frame, top to bottom."""
+        if self.previous_frame is None or self.previous_frame.shape != frame.shape:
+            boxes = self._detect(frame)
+            self._recognize(frame, boxes)
+        else:
+            changed = self.previous_frame != frame
+            if self._has_new_text(changed):
+                boxes = self._detect(frame)
+                stale = []
+                for box in boxes:
+                    cached = next((old for old in self.boxes if old.matches(box)), None)
+                    if cached is not None and not self._box_changed(changed, cached):
+                        box.text, box.confidence = cached.text, cached.confidence
+                        self.lines_reused += 1
+                    else:
+                        stale.append(box)
+            else:
+                boxes = self.boxes
+                stale = [box for box in boxes if self._box_changed(changed, box)]
+                self.lines_reused += len(boxes) - len(stale)
+            self._recognize(frame, stale)
+
+        self.previous_frame = frame.copy()
+        self.boxes = [box for box in boxes if box.text]
+        return self.boxes
+
+    def _detect(self, frame):
+        self.detections += 1
+        horizontal_list, _ = self.reader.detect(frame)
+        boxes = [TextBox(*coordinates) for coordinates in horizontal_list[0]]
+        boxes.sort(key=lambda box: (box.y_min, box.x_min))
+        return boxes
+
+    def _recognize(self, frame, boxes):
+        if not boxes:
+            return
+        results = self.reader.recognize(frame, horizontal_list=[box.coordinates for box in boxes], free_list=[], detail=1)
+        # Results come back with the corner points of their box; match them up by the top-left corner
+        by_corner = {(box.x_min, box.y_min): box for box in boxes}
+        for points, text, confidence in results:
+            box = by_corner.get((int(points[0][0]), int(points[0][1])))
+            if box is not None:
+                box.text, box.confidence = text, float(confidence)
+        self.lines_recognized += len(boxes)
+
+    def _box_changed(self, changed, box):
+        region = box.region(changed)
+        return region.size > 0 and np.count_nonzero(region) / region.size > self.change_threshold
+
+    def _has_new_text(self, changed):
+        """Whether pixels changed outside the cached boxes, where new text may have appeared."""
+        outside = changed.copy()
+        for box in self.boxes:
+            outside[max(box.y_min - BOX_MARGIN, 0):box.y_max + BOX_MARGIN,
+                    max(box.x_min - BOX_MARGIN, 0):box.x_max + BOX_MARGIN] = False
+        return np.count_nonzero(outside) > NEW_TEXT_PIXELS
+
+def group_lines(boxes):
+    """Group boxes into lines of boxes sorted left to right, top to bottom."""
+    lines = []
+    for box in sorted(boxes, key=lambda box: (box.y_min + box.y_max) / 2):
+        center = (box.y_min + box.y_max) / 2
+        line = lines[-1] if lines else None
+        if line is not None and line[0].y_min <= center <= line[0].y_max:
+            line.append(box)
+        else:
+            lines.append([box])
+    return [sorted(line, key=lambda box: box.x_min) for line in lines]
+
+def indent_levels(offsets, tolerance):
+    """Indentation level of each x offset: the rank of its column among all distinct columns.
+
+    Offsets within tolerance pixels of each other are the same column. Ranks
+    do not depend on the font's character width, which OCR boxes only
+    roughly reveal.
+    """
+    columns = []
+    for offset in sorted(set(offsets)):
+        if not columns or offset - columns[-1] > tolerance:
+            columns.append(offset)
+    return [sum(1 for column in columns[1:] if offset - column >= -tolerance) for offset in offsets]
+
+def boxes_to_text(boxes, indent_width=INDENT_WIDTH):
+    """Join boxes into text, indenting each line by the column its first box starts in."""
+    lines = group_lines(boxes)
+    if not lines:
+        return ""
+    heights = [box.y_max - box.y_min for box in boxes]
+    # Characters are roughly half as wide as a line is high
+    char_width = float(np.median(heights)) / 2
+    levels = indent_levels([line[0].x_min for line in lines], char_width)
+
+    text_lines = []
+    for line, level in zip(lines, levels):
+        parts = [line[0].text]
+        for previous, box in zip(line, line[1:]):
+            # Boxes far apart were separated by spaces in the source
+            gap = (box.x_min - previous.x_max) / char_width
+            parts.append(" " * max(1, round(gap)) + box.text)
+        text_lines.append(" " * (level * indent_width) + "".join(parts))
+    return "\n".join(text_lines)
@@ -1,99 +1,160 @@
 import sys
 import os
+import time
+import threading
 import json  # Add this import
-from datetime import datetime
+import functools
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget,
                             QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
                             QFileDialog, QProgressBar, QSplitter, QTreeWidget,
                             QTreeWidgetItem, QTextEdit, QComboBox, QCheckBox,
                             QMessageBox, QDialog, QLineEdit, QDialogButtonBox,
-                            QStatusBar, QMenu, QToolBar, QFrame, QGridLayout)
-from PyQt6.QtGui import QAction, QFont, QIcon, QColor, QSyntaxHighlighter, QTextCharFormat
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QRegularExpression
+                            QStatusBar, QMenu, QToolBar, QFrame, QGridLayout,
+                            QDockWidget, QTableWidget, QTableWidgetItem, QSpinBox,
+                            QHeaderView, QAbstractItemView, QProgressDialog, QScrollArea)
+from PyQt6.QtGui import QAction, QFont, QIcon, QColor, QSyntaxHighlighter, QTextCharFormat, QPixmap, QImage
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, QSize, QRegularExpression
 
 # Import the database model
-from database import CodeSnippet, session, Base, engine
-from ocr_extractor import extract_code_from_video
+from database import (session, Base, engine, iter_filtered_summaries, get_statistics,
+                      get_snippet_code, has_legacy_code_column)
+from extraction_jobs import JobQueue, ExtractionJob, extract_in_process
+from exporter import export_snippets as run_export, ARCHIVE_ZIP, ARCHIVE_TAR_GZ
+from thumbnails import get_thumbnail_cache, seek_frame
+import ocr_service
+
+# Keywords highlighted per language
+HIGHLIGHT_KEYWORDS = {
+    "python": [
+        "and", "as", "assert", "break", "class", "continue", "def",
+        "del", "elif", "else", "except", "False", "finally", "for",
+        "from", "global", "if", "import", "in", "is", "lambda", "None",
+        "nonlocal", "not", "or", "pass", "raise", "return", "True",
+        "try", "while", "with", "yield"
+    ],
+    "javascript": [
+        "break", "case", "catch", "class", "const", "continue", "debugger",
+        "default", "delete", "do", "else", "export", "extends", "false",
+        "finally", "for", "function", "if", "import", "in", "instanceof",
+        "new", "null", "return", "super", "switch", "this", "throw", "true",
+        "try", "typeof", "var", "void", "while", "with", "yield", "let"
+    ],
+}
+
+# Compiled rules per language, built on first use and shared by all highlighters
+_highlighting_rules = {}
+
+def _compiled(pattern):
+    expression = QRegularExpression(pattern)
+    expression.optimize()
+    return expression
+
+def _build_highlighting_rules(language):
+    keyword_format = QTextCharFormat()
+    keyword_format.setForeground(QColor("#569CD6"))
+    keyword_format.setFontWeight(QFont.Weight.Bold)
+    
+    string_format = QTextCharFormat()
+    string_format.setForeground(QColor("#CE9178"))
+    
+    comment_format = QTextCharFormat()
+    comment_format.setForeground(QColor("#6A9955"))
+    
+    function_format = QTextCharFormat()
+    function_format.setForeground(QColor("#DCDCAA"))
+    
+    rules = []
+    keywords = HIGHLIGHT_KEYWORDS.get(language)
+    if keywords:
+        # One alternation for all keywords instead of one pattern per keyword
+        rules.append((_compiled("\\b(?:" + "|".join(keywords) + ")\\b"), keyword_format))
+        
+        # String patterns
+        rules.append((_compiled("\".*\""), string_format))
+        rules.append((_compiled("\'.*\'"), string_format))
+    
+    # Python specific
+    if language == "python":
+        # Comments
+        rules.append((_compiled("#[^\n]*"), comment_format))
+        
+        # Function definitions
+        rules.append((_compiled("\\bdef\\s+\\w+\\s*\\("), function_format))
+        
+    # JavaScript specific
+    elif language == "javascript":
+        # Comments
+        rules.append((_compiled("//[^\n]*"), comment_format))
+        
+        # Function definitions
+        rules.append((_compiled("\\bfunction\\s+\\w+\\s*\\("), function_format))
+    
+    # Add more languages as needed...
+    return rules
+
+def get_highlighting_rules(language):
+    """Compiled (pattern, format) rules for a language, shared across editors"""
+    key = language.lower()
+    if key not in _highlighting_rules:
+        _highlighting_rules[key] = _build_highlighting_rules(key)
+    return _highlighting_rules[key]
 
 class SyntaxHighlighter(QSyntaxHighlighter):
-    """Syntax highlighter for code snippets"""
+    """Syntax highlighter for code snippets
+
+    Documents longer than CHUNKED_THRESHOLD blocks are highlighted
+    CHUNK_SIZE blocks at a time from the event loop, so large snippets
+    never stall the UI thread.
+    """
+    CHUNKED_THRESHOLD = 1000
+    CHUNK_SIZE = 200
+
     def __init__(self, parent=None, language="python"):
         super().__init__(parent)
         self.language = language
-        self.highlighting_rules = []
-        
-        self.setup_highlighting_rules()
-        
-    def setup_highlighting_rules(self):
-        # Clear existing rules
-        self.highlighting_rules = []
-        
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#569CD6"))
-        keyword_format.setFontWeight(QFont.Weight.Bold)
-        
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#CE9178"))
-        
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#6A9955"))
-        
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor("#DCDCAA"))
-        
-        # Python specific
-        if self.language.lower() == "python":
-            keywords = [
-                "and", "as", "assert", "break", "class", "continue", "def",
-                "del", "elif", "else", "except", "False", "finally", "for",
-                "from", "global", "if", "import", "in", "is", "lambda", "None",
-                "nonlocal", "not", "or", "pass", "raise", "return", "True",
-                "try", "while", "with", "yield"
-            ]
-            
-            # Add keyword rules
-            for word in keywords:
-                pattern = QRegularExpression(f"\\b{word}\\b")
-                self.highlighting_rules.append((pattern, keyword_format))
-            
-            # String patterns
-            self.highlighting_rules.append((QRegularExpression("\".*\""), string_format))
-            self.highlighting_rules.append((QRegularExpression("\'.*\'"), string_format))
-            
-            # Comments
-            self.highlighting_rules.append((QRegularExpression("#[^\n]*"), comment_format))
-            
-            # Function definitions
-            self.highlighting_rules.append((QRegularExpression("\\bdef\\s+\\w+\\s*\\("), function_format))
-            
-        # JavaScript specific
-        elif self.language.lower() == "javascript":
-            keywords = [
-                "break", "case", "catch", "class", "const", "continue", "debugger",
-                "default", "delete", "do", "else", "export", "extends", "false",
-                "finally", "for", "function", "if", "import", "in", "instanceof",
-                "new", "null", "return", "super", "switch", "this", "throw", "true",
-                "try", "typeof", "var", "void", "while", "with", "yield", "let"
-            ]
-            
-            # Add keyword rules
-            for word in keywords:
-                pattern = QRegularExpression(f"\\b{word}\\b")
-                self.highlighting_rules.append((pattern, keyword_format))
-            
-            # String patterns
-            self.highlighting_rules.append((QRegularExpression("\".*\""), string_format))
-            self.highlighting_rules.append((QRegularExpression("\'.*\'"), string_format))
-            
-            # Comments
-            self.highlighting_rules.append((QRegularExpression("//[^\n]*"), comment_format))
-            
-            # Function definitions
-            self.highlighting_rules.append((QRegularExpression("\\bfunction\\s+\\w+\\s*\\("), function_format))
-        
-        # Add more languages as needed...
+        self.highlighting_rules = get_highlighting_rules(language)
+        # Blocks from this number on are not highlighted yet; None once all are
+        self.highlighted_blocks = None
+        self.chunk_timer = QTimer(self)
+        self.chunk_timer.timeout.connect(self.highlight_next_chunk)
+        self.start_highlighting()
+    
+    def set_language(self, language):
+        self.language = language
+        self.highlighting_rules = get_highlighting_rules(language)
+        self.start_highlighting()
+    
+    def suspend(self):
+        """Skip highlighting until the next start_highlighting, e.g. while replacing the text"""
+        self.chunk_timer.stop()
+        self.highlighted_blocks = 0
+    
+    def start_highlighting(self):
+        document = self.document()
+        if document is not None and document.blockCount() > self.CHUNKED_THRESHOLD:
+            self.suspend()
+            self.rehighlight()  # Cheap pass that only clears stale formats
+            self.chunk_timer.start(0)
+        else:
+            self.chunk_timer.stop()
+            self.highlighted_blocks = None
+            self.rehighlight()
+    
+    def highlight_next_chunk(self):
+        block = self.document().findBlockByNumber(self.highlighted_blocks)
+        self.highlighted_blocks += self.CHUNK_SIZE
+        while block.isValid() and block.blockNumber() < self.highlighted_blocks:
+            self.rehighlightBlock(block)
+            block = block.next()
+        if not block.isValid():
+            self.highlighted_blocks = None
+            self.chunk_timer.stop()
     
     def highlightBlock(self, text):
+        if self.highlighted_blocks is not None and self.currentBlock().blockNumber() >= self.highlighted_blocks:
+            return
         for pattern, format in self.highlighting_rules:
             match_iterator = pattern.globalMatch(text)
             while match_iterator.hasNext():
@@ -114,81 +175,458 @@ class CodeEditor(QTextEdit):
             }
         """)
         self.highlighter = None
+        self.snippet_id = None  # Snippet shown, used by the main window's editor pool
         self.setAcceptRichText(False)
         
     def set_language(self, language):
-        self.highlighter = SyntaxHighlighter(self.document(), language)
+        if self.highlighter is None:
+            self.highlighter = SyntaxHighlighter(self.document(), language)
+        else:
+            self.highlighter.set_language(language)
+    
+    def set_code(self, code, language):
+        """Replace the text and highlight it, in chunks if it is large"""
+        if self.highlighter is not None:
+            self.highlighter.suspend()
+        self.setPlainText(code)
+        self.set_language(language)
 
 class ExtractorThread(QThread):
     """Thread for running code extraction in the background"""
     progress_signal = pyqtSignal(int)
+    snippets_signal = pyqtSignal(list)  # Batches of newly stored snippet summaries
     completed_signal = pyqtSignal()
+    failed_signal = pyqtSignal(str)
+    
+    # Minimum seconds between two snippet batches, so the view updates a few times per second at most
+    BATCH_INTERVAL = 0.25
 
-    def __init__(self, video_path):
+    def __init__(self, video_path, control=None, extract=extract_in_process):
         super().__init__()
         self.video_path = video_path
+        self.control = control
+        # extract_in_process, or an OCR service client's extract_video; this thread only waits on it
+        self.extract = extract
+        self.pending_snippets = []
+        self.last_batch_time = 0.0
 
     def run(self):
         try:
-            extract_code_from_video(self.video_path, progress_callback=self.progress_signal.emit)
+            self.extract(
+                self.video_path,
+                progress_callback=self.report_progress,
+                snippet_callback=self.queue_snippet,
+                control=self.control
+            )
+            self.flush_snippets(force=True)
             self.completed_signal.emit()
         except Exception as e:
+            self.flush_snippets(force=True)
             print(f"Error: {e}")
+            self.failed_signal.emit(str(e))
+        finally:
+            session.remove()  # Release this thread's session
+    
+    def report_progress(self, value):
+        self.progress_signal.emit(value)
+        self.flush_snippets()
+    
+    def queue_snippet(self, snippet):
+        self.pending_snippets.append(snippet)
+        self.flush_snippets()
+    
+    def flush_snippets(self, force=False):
+        """Emit the queued snippets if the batch interval has passed."""
+        if not self.pending_snippets:
+            return
+        now = time.monotonic()
+        if force or now - self.last_batch_time >= self.BATCH_INTERVAL:
+            batch, self.pending_snippets = self.pending_snippets, []
+            self.last_batch_time = now
+            self.snippets_signal.emit(batch)
+
+class ServiceConnectThread(QThread):
+    """Thread connecting to the OCR service, starting it if needed"""
+    connected_signal = pyqtSignal(object)
+    failed_signal = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.connected_signal.emit(ocr_service.connect(start=True))
+        except Exception as e:
+            self.failed_signal.emit(str(e))
+
+class ExportThread(QThread):
+    """Thread for streaming an export to disk in the background"""
+    progress_signal = pyqtSignal(int, int)
+    completed_signal = pyqtSignal(str)  # Path written to, empty if cancelled
+    failed_signal = pyqtSignal(str)
+
+    def __init__(self, export_path, export_format, options):
+        super().__init__()
+        self.export_path = export_path
+        self.export_format = export_format
+        self.options = options
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            path = run_export(
+                self.export_path, self.export_format,
+                progress_callback=self.progress_signal.emit,
+                cancel_event=self.cancel_event,
+                **self.options
+            )
+            self.completed_signal.emit(path or "")
+        except Exception as e:
+            self.failed_signal.emit(str(e))
+        finally:
+            session.remove()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+class JobQueuePanel(QWidget):
+    """Queue of videos, each extracted in its own process, a few at a time"""
+    snippets_found = pyqtSignal(list)
+    queue_finished = pyqtSignal()
+    
+    COLUMNS = ["Video", "Status", "Progress", "Frames/s", "ETA"]
+    DEFAULT_CONCURRENCY = max(1, min(4, (os.cpu_count() or 2) // 2))
 
-class SnippetFilterDialog(QDialog):
-    """Dialog for filtering code snippets"""
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Filter Code Snippets")
-        self.setMinimumWidth(400)
+        self.queue = JobQueue(self.start_job, self.DEFAULT_CONCURRENCY)
         
-        layout = QVBoxLayout()
+        layout = QVBoxLayout(self)
+        
+        # Job table
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        # Controls
+        controls = QHBoxLayout()
+        self.pause_button = QPushButton("Pause/Resume")
+        self.pause_button.clicked.connect(self.toggle_pause_selected)
+        controls.addWidget(self.pause_button)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        controls.addWidget(self.cancel_button)
+        self.clear_button = QPushButton("Clear Finished")
+        self.clear_button.clicked.connect(self.clear_finished)
+        controls.addWidget(self.clear_button)
+        controls.addStretch()
+        controls.addWidget(QLabel("Concurrent jobs:"))
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.concurrency_spin.setValue(self.DEFAULT_CONCURRENCY)
+        self.concurrency_spin.valueChanged.connect(self.queue.set_concurrency)
+        controls.addWidget(self.concurrency_spin)
+        # Run OCR in the shared service process instead of in the GUI
+        self.service_check = QCheckBox("Use OCR service")
+        self.service_check.toggled.connect(self.toggle_service)
+        controls.addWidget(self.service_check)
+        # Recognize only the lines that changed between sampled frames
+        self.line_ocr_check = QCheckBox("Line-level OCR")
+        controls.addWidget(self.line_ocr_check)
+        # Read several frames per sample at native resolution and fuse them
+        self.fusion_check = QCheckBox("Fuse frames")
+        controls.addWidget(self.fusion_check)
+        # Detect text on a downscaled frame, for 1440p and 4K videos
+        self.split_check = QCheckBox("Split-resolution OCR")
+        controls.addWidget(self.split_check)
+        # Read only newly revealed rows while the editor scrolls, one snippet per scroll
+        self.scroll_check = QCheckBox("Stitch scrolling")
+        controls.addWidget(self.scroll_check)
+        layout.addLayout(controls)
+        self.ocr_client = None
+        self.connect_thread = None
+        
+        # Throughput and ETA are refreshed from the jobs' counters
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_rows)
+        self.refresh_timer.start(500)
+    
+    @property
+    def jobs(self):
+        return self.queue.jobs
+    
+    @property
+    def idle(self):
+        return self.queue.idle
+    
+    def add_jobs(self, video_paths):
+        """Queue videos and start as many as the concurrency allows"""
+        for video_path in video_paths:
+            self.queue.add(video_path)
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(os.path.basename(video_path)))
+            progress_bar = QProgressBar()
+            progress_bar.setRange(0, 100)
+            self.table.setCellWidget(row, 2, progress_bar)
+            for column in (1, 3, 4):
+                self.table.setItem(row, column, QTableWidgetItem(""))
+        self.queue.start_pending()
+        self.refresh_rows()
+    
+    def start_job(self, job):
+        """Start a job's extraction process, called by the queue when there is room"""
+        extract = self.ocr_client.extract_video if self.ocr_client else extract_in_process
+        options = {}
+        if self.line_ocr_check.isChecked():
+            options["incremental_ocr"] = True
+        if self.fusion_check.isChecked():
+            options["fusion"] = True
+        if self.split_check.isChecked():
+            options["split_resolution"] = True
+        if self.scroll_check.isChecked():
+            options["scroll_stitch"] = True
+        if options:
+            extract = functools.partial(extract, **options)
+        job.thread = ExtractorThread(job.video_path, job.control, extract)
+        job.thread.progress_signal.connect(lambda value, job=job: self.job_progress(job, value))
+        job.thread.snippets_signal.connect(self.snippets_found)
+        job.thread.completed_signal.connect(lambda job=job: self.job_finished(job))
+        job.thread.failed_signal.connect(lambda message, job=job: self.job_finished(job, message))
+        job.thread.start()
+    
+    def job_progress(self, job, value):
+        job.progress = value
+    
+    def job_finished(self, job, error=None):
+        self.queue.job_finished(job, error)
+        self.refresh_rows()
+        if self.idle:
+            self.queue_finished.emit()
+    
+    def selected_jobs(self):
+        rows = {index.row() for index in self.table.selectionModel().selectedRows()}
+        return [self.jobs[row] for row in sorted(rows)]
+    
+    def toggle_pause_selected(self):
+        for job in self.selected_jobs():
+            self.queue.toggle_pause(job)
+        self.refresh_rows()
+    
+    def cancel_selected(self):
+        for job in self.selected_jobs():
+            self.queue.cancel(job)
+        self.refresh_rows()
+        if self.idle:
+            self.queue_finished.emit()
+    
+    def clear_finished(self):
+        for row in self.queue.clear_finished():
+            self.table.removeRow(row)
+    
+    def toggle_service(self, enabled):
+        """Connect to the OCR service for jobs started from now on, or stop using it"""
+        if not enabled:
+            self.ocr_client = None  # Running jobs keep their connection until they finish
+            return
+        self.service_check.setEnabled(False)
+        self.service_check.setText("Connecting...")
+        self.connect_thread = ServiceConnectThread()
+        self.connect_thread.connected_signal.connect(self.service_connected)
+        self.connect_thread.failed_signal.connect(self.service_failed)
+        self.connect_thread.start()
+    
+    def service_connected(self, client):
+        self.ocr_client = client
+        self.service_check.setText("Use OCR service")
+        self.service_check.setEnabled(True)
+    
+    def service_failed(self, error):
+        self.service_check.setText("Use OCR service")
+        self.service_check.setEnabled(True)
+        self.service_check.setChecked(False)
+        QMessageBox.warning(self, "OCR Service", f"Could not connect to the OCR service: {error}")
+    
+    def shutdown(self):
+        """Cancel all jobs and wait for their threads"""
+        self.queue.cancel_all()
+        for job in self.jobs:
+            if job.thread is not None:
+                job.thread.wait()
+        if self.connect_thread is not None:
+            self.connect_thread.wait()
+    
+    def refresh_rows(self):
+        for row, job in enumerate(self.jobs):
+            self.table.item(row, 1).setText(job.status)
+            self.table.cellWidget(row, 2).setValue(job.progress)
+            if job.status in (ExtractionJob.RUNNING, ExtractionJob.PAUSED):
+                self.table.item(row, 3).setText(f"{job.throughput():.1f}")
+                eta = job.eta()
+                self.table.item(row, 4).setText(
+                    time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "")
+            elif job.finished:
+                self.table.item(row, 4).setText("")
+
+class FilterThread(QThread):
+    """Thread running a database filter query and streaming the matching snippets"""
+    batch_signal = pyqtSignal(int, list)  # generation, snippet summaries
+    finished_signal = pyqtSignal(int, int)  # generation, number of matches
+
+    def __init__(self, generation, options):
+        super().__init__()
+        self.generation = generation
+        self.options = options
+        self.cancelled = False
+
+    def run(self):
+        count = 0
+        try:
+            for batch in iter_filtered_summaries(**self.options):
+                if self.cancelled:
+                    return
+                count += len(batch)
+                self.batch_signal.emit(self.generation, batch)
+        except Exception as e:
+            print(f"Error filtering snippets: {e}")
+        finally:
+            session.remove()  # Release this thread's session
+        if not self.cancelled:
+            self.finished_signal.emit(self.generation, count)
+
+class FilterBar(QWidget):
+    """Live filter controls; emits the options once typing pauses"""
+    filters_changed = pyqtSignal(dict)
+    
+    # Milliseconds without input before a filter runs; short enough to feel
+    # instant, long enough to skip the intermediate states of fast typing
+    DEBOUNCE_MS = 80
+    TIME_PATTERN = QRegularExpression("^\\d{2}:\\d{2}:\\d{2}$")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        
+        # Content search
+        self.content_search = QLineEdit()
+        self.content_search.setPlaceholderText("Filter by content...")
+        self.content_search.setClearButtonEnabled(True)
+        layout.addWidget(self.content_search, 3)
         
         # Language filter
         self.language_combo = QComboBox()
         self.language_combo.addItem("All Languages")
-        self.language_combo.addItems(["Python", "JavaScript", "Java", "C++", "HTML", "CSS"])
-        layout.addWidget(QLabel("Language:"))
+        self.language_combo.addItems(["Python", "JavaScript", "Java", "C++", "HTML", "CSS", "SQL"])
         layout.addWidget(self.language_combo)
         
         # Time range filter
-        time_layout = QHBoxLayout()
         self.start_time = QLineEdit("00:00:00")
         self.end_time = QLineEdit("23:59:59")
-        time_layout.addWidget(QLabel("From:"))
-        time_layout.addWidget(self.start_time)
-        time_layout.addWidget(QLabel("To:"))
-        time_layout.addWidget(self.end_time)
-        layout.addLayout(time_layout)
+        for time_edit in (self.start_time, self.end_time):
+            time_edit.setMaximumWidth(80)
+        layout.addWidget(QLabel("From:"))
+        layout.addWidget(self.start_time)
+        layout.addWidget(QLabel("To:"))
+        layout.addWidget(self.end_time)
         
-        # Content search
-        self.content_search = QLineEdit()
-        layout.addWidget(QLabel("Content contains:"))
-        layout.addWidget(self.content_search)
-        
-        # Remove duplicates option
-        self.remove_duplicates = QCheckBox("Remove duplicate snippets")
+        # Matching options
+        self.fuzzy_search = QCheckBox("Tolerate OCR errors")
+        layout.addWidget(self.fuzzy_search)
+        self.remove_duplicates = QCheckBox("Hide duplicates")
         self.remove_duplicates.setChecked(True)
         layout.addWidget(self.remove_duplicates)
+        self.final_only = QCheckBox("Latest versions only")
+        layout.addWidget(self.final_only)
         
-        # Buttons
-        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | 
-                                       QDialogButtonBox.StandardButton.Cancel)
-        button_box.accepted.connect(self.accept)
-        button_box.rejected.connect(self.reject)
-        layout.addWidget(button_box)
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(lambda: self.filters_changed.emit(self.get_filter_options()))
         
-        self.setLayout(layout)
+        for line_edit in (self.content_search, self.start_time, self.end_time):
+            line_edit.textChanged.connect(self.debounce_timer.start)
+        self.language_combo.currentIndexChanged.connect(self.debounce_timer.start)
+        for check_box in (self.fuzzy_search, self.remove_duplicates, self.final_only):
+            check_box.toggled.connect(self.debounce_timer.start)
+    
+    def time_bound(self, line_edit):
+        """A complete HH:MM:SS value, or None while the field is empty or being edited"""
+        value = line_edit.text().strip()
+        return value if self.TIME_PATTERN.match(value).hasMatch() else None
     
     def get_filter_options(self):
         return {
             "language": self.language_combo.currentText() if self.language_combo.currentText() != "All Languages" else None,
-            "start_time": self.start_time.text(),
-            "end_time": self.end_time.text(),
+            "start_time": self.time_bound(self.start_time),
+            "end_time": self.time_bound(self.end_time),
             "content": self.content_search.text() if self.content_search.text() else None,
-            "remove_duplicates": self.remove_duplicates.isChecked()
+            "fuzzy": self.fuzzy_search.isChecked(),
+            "remove_duplicates": self.remove_duplicates.isChecked(),
+            "final_only": self.final_only.isChecked()
         }
 
+class StatisticsDialog(QDialog):
+    """Dialog showing the database statistics counters"""
+    PERIODS = {
+        "All time": None,
+        "Last hour": timedelta(hours=1),
+        "Last 24 hours": timedelta(days=1),
+        "Last 7 days": timedelta(days=7),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Database Statistics")
+        self.setMinimumWidth(400)
+        
+        layout = QVBoxLayout()
+        
+        # Source and time window filters
+        filter_layout = QHBoxLayout()
+        self.source_combo = QComboBox()
+        self.source_combo.addItem("All Sources")
+        self.source_combo.addItems(sorted(get_statistics()["sources"]))
+        self.source_combo.currentIndexChanged.connect(self.refresh)
+        self.period_combo = QComboBox()
+        self.period_combo.addItems(list(self.PERIODS))
+        self.period_combo.currentIndexChanged.connect(self.refresh)
+        filter_layout.addWidget(QLabel("Source:"))
+        filter_layout.addWidget(self.source_combo)
+        filter_layout.addWidget(QLabel("Period:"))
+        filter_layout.addWidget(self.period_combo)
+        layout.addLayout(filter_layout)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        self.language_tree = QTreeWidget()
+        self.language_tree.setHeaderLabels(["Language", "Snippets"])
+        layout.addWidget(self.language_tree)
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        
+        self.setLayout(layout)
+        self.refresh()
+    
+    def refresh(self):
+        """Reload the counters for the selected source and period"""
+        source = self.source_combo.currentText() if self.source_combo.currentIndex() > 0 else None
+        period = self.PERIODS[self.period_combo.currentText()]
+        start = datetime.utcnow() - period if period else None
+        stats = get_statistics(source_file=source, start=start)
+        
+        summary = f"{stats['total_snippets']} snippets, {stats['total_code_bytes']} bytes of code"
+        if stats["first_seen"]:
+            summary += f"\nFirst: {stats['first_seen']:%Y-%m-%d %H:%M}  Last: {stats['last_seen']:%Y-%m-%d %H:%M}"
+        self.summary_label.setText(summary)
+        
+        self.language_tree.clear()
+        for language, count in sorted(stats["languages"].items()):
+            QTreeWidgetItem(self.language_tree, [language, str(count)])
+
 class ExportDialog(QDialog):
     """Dialog for exporting code snippets"""
     def __init__(self, parent=None):
@@ -200,7 +638,11 @@ class ExportDialog(QDialog):
         
         # Export format
         self.format_combo = QComboBox()
-        self.format_combo.addItems(["Python Files (.py)", "HTML (.html)", "Markdown (.md)", "Text Files (.txt)", "JSON (.json)", "PDF (.pdf)"])
+        for label, export_format in [("Python Files (.py)", "python"), ("HTML (.html)", "html"),
+                                     ("Markdown (.md)", "markdown"), ("Text Files (.txt)", "text"),
+                                     ("JSON (.json)", "json")]:
+            self.format_combo.addItem(label, export_format)
+        self.format_combo.currentIndexChanged.connect(self.format_changed)
         layout.addWidget(QLabel("Export Format:"))
         layout.addWidget(self.format_combo)
         
@@ -213,9 +655,18 @@ class ExportDialog(QDialog):
         self.include_language.setChecked(True)
         layout.addWidget(self.include_language)
         
-        self.separate_files = QCheckBox("Export snippets as separate files")
+        # Only Python snippets are exported one file each; the other formats are documents
+        self.separate_files = QCheckBox("Export Python snippets as separate files")
         layout.addWidget(self.separate_files)
         
+        # Optionally pack the export into a single archive
+        self.archive_combo = QComboBox()
+        self.archive_combo.addItem("None", None)
+        self.archive_combo.addItem("ZIP (.zip)", ARCHIVE_ZIP)
+        self.archive_combo.addItem("Tar (.tar.gz)", ARCHIVE_TAR_GZ)
+        layout.addWidget(QLabel("Archive:"))
+        layout.addWidget(self.archive_combo)
+        
         # Button to select directory
         dir_layout = QHBoxLayout()
         self.export_path = QLineEdit()
@@ -237,6 +688,9 @@ class ExportDialog(QDialog):
         
         self.setLayout(layout)
     
+    def format_changed(self):
+        self.separate_files.setEnabled(self.format_combo.currentData() == "python")
+    
     def browse_directory(self):
         directory = QFileDialog.getExistingDirectory(self, "Select Export Directory")
         if directory:
@@ -244,24 +698,64 @@ class ExportDialog(QDialog):
     
     def get_export_options(self):
         return {
-            "format": self.format_combo.currentText(),
+            "format": self.format_combo.currentData(),
             "include_timestamps": self.include_timestamps.isChecked(),
             "include_language": self.include_language.isChecked(),
-            "separate_files": self.separate_files.isChecked(),
+            "separate_files": self.separate_files.isEnabled() and self.separate_files.isChecked(),
+            "archive": self.archive_combo.currentData(),
             "export_path": self.export_path.text()
         }
 
+class FramePreviewDialog(QDialog):
+    """Shows the full-resolution video frame a snippet was read from"""
+    def __init__(self, frame, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(1000, 700)
+        
+        height, width = frame.shape[:2]
+        image = QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_BGR888)
+        label = QLabel()
+        label.setPixmap(QPixmap.fromImage(image))  # fromImage copies, so the frame can be freed
+        scroll_area = QScrollArea()
+        scroll_area.setWidget(label)
+        
+        layout = QVBoxLayout(self)
+        layout.addWidget(scroll_area)
+
 class VideoCodeExtractorApp(QMainWindow):
     """Main application window"""
+    # Default number of snippet editors kept open; more recycle the least recently used
+    MAX_OPEN_EDITORS = 10
+    # Thumbnail pixmaps kept in memory; the rest are reloaded from the disk cache
+    MAX_CACHED_THUMBNAILS = 100
+    # Milliseconds between re-runs of the active filter while extraction adds snippets
+    STREAM_REFRESH_MS = 1000
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Professional Code Extractor")
         self.setMinimumSize(1200, 800)
+        self.open_editors = OrderedDict()  # snippet id -> CodeEditor, least recently used first
+        self.filter_thread = None
+        self.filter_threads = set()  # Kept alive until they finish, including superseded ones
+        self.filter_generation = 0  # Results of older filter runs are dropped
+        self.export_thread = None
+        self.thumbnail_pixmaps = OrderedDict()  # (video key, frame) -> QPixmap, least recently used first
+        self.filter_results = 0
         self.setup_ui()
-        self.current_snippets = []
+        self.current_snippets = []  # Summaries of the rows in the tree, in order
         self.current_file = None
+        self.current_sources = None  # Source files the results are limited to; None for the whole database
+        self.filter_options = None  # Last options from the filter bar; None until it is used
         self.export_service = None
         
+        # Snippets streamed in while a filter is active are shown by running the filter again
+        self.stream_refresh_timer = QTimer(self)
+        self.stream_refresh_timer.setSingleShot(True)
+        self.stream_refresh_timer.setInterval(self.STREAM_REFRESH_MS)
+        self.stream_refresh_timer.timeout.connect(lambda: self.apply_filters(self.filter_options))
+        
         # Initialize database
         Base.metadata.create_all(engine)
     
@@ -292,7 +786,7 @@ class VideoCodeExtractorApp(QMainWindow):
         self.filter_button = QPushButton("Filter Snippets")
         self.filter_button.setIcon(QIcon.fromTheme("edit-find"))
         self.filter_button.setMinimumHeight(40)
-        self.filter_button.clicked.connect(self.open_filter_dialog)
+        self.filter_button.clicked.connect(self.show_filter_bar)
         top_controls.addWidget(self.filter_button)
         
         # Export Button
@@ -302,15 +796,20 @@ class VideoCodeExtractorApp(QMainWindow):
         self.export_button.clicked.connect(self.open_export_dialog)
         top_controls.addWidget(self.export_button)
         
-        # Progress bar
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 100)
-        self.progress_bar.setValue(0)
-        self.progress_bar.setTextVisible(True)
-        self.progress_bar.setVisible(False)
-        
         main_layout.addLayout(top_controls)
-        main_layout.addWidget(self.progress_bar)
+        
+        # Live filter bar, queried in the background
+        self.filter_bar = FilterBar()
+        self.filter_bar.filters_changed.connect(self.apply_filters)
+        main_layout.addWidget(self.filter_bar)
+        
+        # Job queue, docked below the snippets
+        self.job_panel = JobQueuePanel()
+        self.job_panel.snippets_found.connect(self.append_snippets)
+        self.job_panel.queue_finished.connect(self.processing_finished)
+        job_dock = QDockWidget("Extraction Jobs", self)
+        job_dock.setWidget(self.job_panel)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, job_dock)
         
         # Create splitter for tree view and code view
         splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -320,12 +819,32 @@ class VideoCodeExtractorApp(QMainWindow):
         self.tree_widget.setHeaderLabels(["Time", "Language", "Size"])
         self.tree_widget.setMinimumWidth(300)
         self.tree_widget.itemClicked.connect(self.show_snippet)
-        splitter.addWidget(self.tree_widget)
+        self.tree_widget.currentItemChanged.connect(self.show_thumbnail)
+        
+        # Thumbnail of the selected snippet's source frame
+        preview_widget = QWidget()
+        preview_layout = QVBoxLayout(preview_widget)
+        preview_layout.setContentsMargins(0, 0, 0, 0)
+        self.thumbnail_label = QLabel("No preview")
+        self.thumbnail_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.thumbnail_label.setMinimumHeight(120)
+        self.full_frame_button = QPushButton("View Full Frame")
+        self.full_frame_button.setEnabled(False)
+        self.full_frame_button.clicked.connect(self.show_full_frame)
+        preview_layout.addWidget(self.thumbnail_label)
+        preview_layout.addWidget(self.full_frame_button)
+        
+        left_splitter = QSplitter(Qt.Orientation.Vertical)
+        left_splitter.addWidget(self.tree_widget)
+        left_splitter.addWidget(preview_widget)
+        left_splitter.setSizes([600, 200])
+        splitter.addWidget(left_splitter)
         
         # Code content area (tabbed)
         self.tab_widget = QTabWidget()
         self.tab_widget.setTabsClosable(True)
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
+        self.tab_widget.currentChanged.connect(self.touch_editor)
         
         # Add a welcome tab
         welcome_widget = QWidget()
@@ -338,10 +857,10 @@ class VideoCodeExtractorApp(QMainWindow):
         <p>This application extracts code snippets from video tutorials and lectures.</p>
         <p>To get started:</p>
         <ol>
-            <li>Click <b>Process Video</b> to select and analyze a video file</li>
+            <li>Click <b>Process Video</b> to queue one or more video files for analysis</li>
             <li>View extracted code snippets in the panel on the left</li>
             <li>Click on any snippet to view its code</li>
-            <li>Use the <b>Filter</b> button to find specific snippets</li>
+            <li>Type in the filter bar to find specific snippets</li>
             <li>Export your snippets in various formats using the <b>Export</b> button</li>
         </ol>
         </html>
@@ -372,11 +891,16 @@ class VideoCodeExtractorApp(QMainWindow):
         db_action.triggered.connect(self.view_database)
         toolbar.addAction(db_action)
         
+        # Statistics action
+        stats_action = QAction(QIcon.fromTheme("document-properties"), "Statistics", self)
+        stats_action.triggered.connect(self.show_statistics)
+        toolbar.addAction(stats_action)
+        
         toolbar.addSeparator()
         
         # Filter action
         filter_action = QAction(QIcon.fromTheme("edit-find"), "Filter", self)
-        filter_action.triggered.connect(self.open_filter_dialog)
+        filter_action.triggered.connect(self.show_filter_bar)
         toolbar.addAction(filter_action)
         
         # Export action
@@ -390,63 +914,70 @@ class VideoCodeExtractorApp(QMainWindow):
         about_action = QAction(QIcon.fromTheme("help-about"), "About", self)
         about_action.triggered.connect(self.show_about)
         toolbar.addAction(about_action)
+        
+        toolbar.addSeparator()
+        
+        # Cap on open snippet tabs
+        toolbar.addWidget(QLabel("Max open tabs: "))
+        self.max_editors_spin = QSpinBox()
+        self.max_editors_spin.setRange(1, 100)
+        self.max_editors_spin.setValue(self.MAX_OPEN_EDITORS)
+        self.max_editors_spin.valueChanged.connect(self.trim_editors)
+        toolbar.addWidget(self.max_editors_spin)
     
     def process_video(self):
-        """Select and process a video file"""
-        video_path, _ = QFileDialog.getOpenFileName(
+        """Select video files and add them to the job queue"""
+        video_paths, _ = QFileDialog.getOpenFileNames(
             self, 
-            "Select Video File",
+            "Select Video Files",
             "",
             "Video Files (*.mp4 *.avi *.mov *.mkv)"
         )
         
-        if not video_path:
+        if not video_paths:
             return
         
-        self.current_file = os.path.basename(video_path)
-        self.status_bar.showMessage(f"Processing video: {self.current_file}")
-        self.progress_bar.setValue(0)
-        self.progress_bar.setVisible(True)
-        
-        # Clear previous results
-        self.tree_widget.clear()
+        # Clear previous results unless other jobs are still adding to them
+        sources = {os.path.basename(video_path) for video_path in video_paths}
+        if self.job_panel.idle:
+            self.tree_widget.clear()
+            self.current_snippets = []
+            self.current_file = os.path.basename(video_paths[0]) if len(video_paths) == 1 else None
+            self.current_sources = sources
+        else:
+            self.current_file = None
+            if self.current_sources is not None:
+                self.current_sources |= sources
         
-        # Start processing thread
-        self.extract_thread = ExtractorThread(video_path)
-        self.extract_thread.progress_signal.connect(self.update_progress)
-        self.extract_thread.completed_signal.connect(self.processing_finished)
-        self.extract_thread.start()
-    
-    def update_progress(self, value):
-        self.progress_bar.setValue(value)
-    
-    def display_results(self):
-        """Fetch and display extracted snippets from the database."""
-        try:
-            snippets = session.query(CodeSnippet).all()  # Fetch all snippets from the database
-            self.current_snippets = [
-                {"timestamp": snippet.timestamp, "language": snippet.language, "code": snippet.code}
-                for snippet in snippets
-            ]
-            self.update_tree_view(self.current_snippets)  # Update the tree view with the snippets
-
-            if not self.current_snippets:
-                self.status_bar.showMessage("No code snippets were found in the video.")
-            else:
-                self.status_bar.showMessage(f"Found {len(self.current_snippets)} code snippets.")
-        except Exception as e:
-            print(f"Error displaying results: {str(e)}")
-            self.status_bar.showMessage(f"Error displaying results: {str(e)}")
+        self.status_bar.showMessage(f"Queued {len(video_paths)} video(s)")
+        self.job_panel.add_jobs(video_paths)
     
     def update_tree_view(self, snippets):
         """Update the tree widget with snippet data."""
         self.tree_widget.clear()
+        self.add_tree_items(snippets)
+    
+    def append_snippets(self, snippets):
+        """Append a batch of snippets streamed from the extraction thread."""
+        if self.filter_options is not None:
+            # Only the filter knows which of them to show; rerun it at most once per interval
+            if not self.stream_refresh_timer.isActive():
+                self.stream_refresh_timer.start()
+            return
+        self.current_snippets.extend(snippets)
+        self.add_tree_items(snippets)
+        self.status_bar.showMessage(f"Processing videos - {len(self.current_snippets)} snippets found")
+    
+    def add_tree_items(self, snippets):
+        """Add rows for snippets to the end of the tree widget."""
+        self.tree_widget.setUpdatesEnabled(False)
         for snippet in snippets:
             snippet_item = QTreeWidgetItem(self.tree_widget)
             snippet_item.setText(0, snippet["timestamp"])
             snippet_item.setText(1, snippet["language"])
-            snippet_item.setText(2, f"{len(snippet['code'])} chars")
+            snippet_item.setText(2, f"{snippet['size']} chars")
             snippet_item.setData(0, Qt.ItemDataRole.UserRole, snippet)
+        self.tree_widget.setUpdatesEnabled(True)
     
     def show_snippet(self, item, column):
         """Display the selected code snippet in the code editor"""
@@ -455,63 +986,134 @@ class VideoCodeExtractorApp(QMainWindow):
         if not snippet_data:
             return
         
-        # Create a new tab for this snippet
-        code_editor = CodeEditor()
-        code_editor.setPlainText(snippet_data["code"])
-        code_editor.set_language(snippet_data["language"])
+        # Focus the tab if this snippet is already open
+        snippet_id = snippet_data["id"]
+        code_editor = self.open_editors.get(snippet_id)
+        if code_editor is None:
+            if len(self.open_editors) >= self.max_editors_spin.value():
+                # Recycle the widget and document of the least recently used editor
+                _, code_editor = self.open_editors.popitem(last=False)
+            else:
+                code_editor = CodeEditor()
+                self.tab_widget.addTab(code_editor, "")
+            code_editor.snippet_id = snippet_id
+            code_editor.set_code(get_snippet_code(snippet_id), snippet_data["language"])
+            self.open_editors[snippet_id] = code_editor
+            tab_title = f"{snippet_data['language']} - {snippet_data['timestamp']}"
+            self.tab_widget.setTabText(self.tab_widget.indexOf(code_editor), tab_title)
+        
+        self.tab_widget.setCurrentWidget(code_editor)
+        self.touch_editor(self.tab_widget.currentIndex())
+    
+    def show_thumbnail(self, item, previous=None):
+        """Show the source frame thumbnail of the selected snippet, loading it on demand"""
+        snippet_data = item.data(0, Qt.ItemDataRole.UserRole) if item else None
+        if not snippet_data or snippet_data.get("frame_number") is None:
+            self.thumbnail_label.setText("No preview")
+            self.full_frame_button.setEnabled(False)
+            return
+        
+        key = (snippet_data.get("video_key"), snippet_data["frame_number"])
+        pixmap = self.thumbnail_pixmaps.get(key)
+        if pixmap is None:
+            path = get_thumbnail_cache().get(*key)
+            pixmap = QPixmap(path) if path else None
+            if pixmap is not None and not pixmap.isNull():
+                self.thumbnail_pixmaps[key] = pixmap
+                if len(self.thumbnail_pixmaps) > self.MAX_CACHED_THUMBNAILS:
+                    self.thumbnail_pixmaps.popitem(last=False)
+        else:
+            self.thumbnail_pixmaps.move_to_end(key)
         
-        # Add tab with close button
-        tab_title = f"{snippet_data['language']} - {snippet_data['timestamp']}"
-        self.tab_widget.addTab(code_editor, tab_title)
-        self.tab_widget.setCurrentIndex(self.tab_widget.count() - 1)
+        if pixmap is None or pixmap.isNull():
+            self.thumbnail_label.setText("No preview")
+        else:
+            self.thumbnail_label.setPixmap(pixmap)
+        self.full_frame_button.setEnabled(True)
+    
+    def show_full_frame(self):
+        """Seek to the selected snippet's frame and show it at full resolution"""
+        item = self.tree_widget.currentItem()
+        snippet_data = item.data(0, Qt.ItemDataRole.UserRole) if item else None
+        if not snippet_data or snippet_data.get("frame_number") is None:
+            return
+        
+        frame = seek_frame(snippet_data.get("video_key"), snippet_data["frame_number"])
+        if frame is None:
+            QMessageBox.warning(self, "Preview Error",
+                                "The source video of this snippet could not be found, has changed or was never indexed.")
+            return
+        title = f"{snippet_data['source_file']} - {snippet_data['timestamp']}"
+        FramePreviewDialog(frame, title, self).exec()
+    
+    def touch_editor(self, index):
+        """Mark the editor in a tab as most recently used"""
+        widget = self.tab_widget.widget(index)
+        if isinstance(widget, CodeEditor) and widget.snippet_id in self.open_editors:
+            self.open_editors.move_to_end(widget.snippet_id)
+    
+    def trim_editors(self, limit):
+        """Close least recently used editors beyond the limit"""
+        while len(self.open_editors) > limit:
+            _, code_editor = self.open_editors.popitem(last=False)
+            self.close_tab(self.tab_widget.indexOf(code_editor))
     
     def close_tab(self, index):
         """Close a tab when the close button is clicked"""
         if index != 0:  # Don't close the welcome tab
+            widget = self.tab_widget.widget(index)
+            if isinstance(widget, CodeEditor):
+                self.open_editors.pop(widget.snippet_id, None)
             self.tab_widget.removeTab(index)
+            widget.deleteLater()
     
-    def open_filter_dialog(self):
-        """Open dialog to filter snippets"""
-        if not self.current_snippets:
-            QMessageBox.information(self, "No Data", "No code snippets to filter. Process a video first.")
-            return
-        
-        dialog = SnippetFilterDialog(self)
-        if dialog.exec():
-            filter_options = dialog.get_filter_options()
-            self.apply_filters(filter_options)
+    def show_filter_bar(self):
+        """Focus the content field of the filter bar"""
+        self.filter_bar.content_search.setFocus()
+        self.filter_bar.content_search.selectAll()
     
     def apply_filters(self, options):
-        """Apply filters to the snippets"""
-        filtered_snippets = []
-        unique_codes = set() if options["remove_duplicates"] else None
-        
-        for snippet in self.current_snippets:
-            # Apply language filter
-            if options["language"] and snippet["language"] != options["language"]:
-                continue
-            
-            # Apply content filter
-            if options["content"] and options["content"].lower() not in snippet["code"].lower():
-                continue
-            
-            # Apply time filter
-            # This is a simplified check - you may want a more sophisticated time comparison
-            if snippet["timestamp"] < options["start_time"] or snippet["timestamp"] > options["end_time"]:
-                continue
-            
-            # Apply duplicate filter
-            if options["remove_duplicates"]:
-                code_hash = hash(snippet["code"])
-                if code_hash in unique_codes:
-                    continue
-                unique_codes.add(code_hash)
-            
-            filtered_snippets.append(snippet)
-        
-        # Update the tree with filtered results
-        self.update_tree_view(filtered_snippets)
-        self.status_bar.showMessage(f"Showing {len(filtered_snippets)} of {len(self.current_snippets)} snippets")
+        """Filter the snippets of the current sources on a worker thread"""
+        self.filter_options = options
+        self._start_filter(options)
+    
+    def _start_filter(self, options):
+        """Stream the summaries of the current sources' snippets matching options into the tree"""
+        if self.filter_thread is not None:
+            self.filter_thread.cancelled = True
+        self.filter_generation += 1
+        self.filter_results = 0
+        self.stream_refresh_timer.stop()
+        
+        # Filtering and duplicate removal run inside the database
+        sources = sorted(self.current_sources) if self.current_sources is not None else None
+        self.filter_thread = FilterThread(self.filter_generation, dict(options, source_files=sources))
+        self.filter_thread.batch_signal.connect(self.show_filter_batch)
+        self.filter_thread.finished_signal.connect(self.filter_finished)
+        self.filter_threads.add(self.filter_thread)
+        self.filter_thread.finished.connect(
+            lambda thread=self.filter_thread: self.filter_threads.discard(thread))
+        self.filter_thread.start()
+        self.status_bar.showMessage("Filtering...")
+    
+    def show_filter_batch(self, generation, snippets):
+        """Stream a batch of filter results into the tree"""
+        if generation != self.filter_generation:
+            return
+        if self.filter_results == 0:
+            self.tree_widget.clear()
+            self.current_snippets = []
+        self.filter_results += len(snippets)
+        self.current_snippets.extend(snippets)
+        self.add_tree_items(snippets)
+    
+    def filter_finished(self, generation, count):
+        if generation != self.filter_generation:
+            return
+        if count == 0:
+            self.tree_widget.clear()
+            self.current_snippets = []
+        self.status_bar.showMessage(f"Showing {count} matching snippets")
     
     def open_export_dialog(self):
         """Open dialog to export snippets"""
@@ -525,158 +1127,64 @@ class VideoCodeExtractorApp(QMainWindow):
             self.export_snippets(export_options)
     
     def export_snippets(self, options):
-        """Export snippets according to options."""
-        try:
-            export_path = options["export_path"]
-            if not export_path:
-                QMessageBox.warning(self, "Export Error", "Please select an export directory")
-                return
-
-            base_filename = self.current_file.split('.')[0] if self.current_file else f"code_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            if "Python Files" in options["format"]:
-                self.export_as_python_files(export_path, base_filename, options)
-            elif "HTML" in options["format"]:
-                self.export_as_html(export_path, base_filename, options)
-            elif "Markdown" in options["format"]:
-                self.export_as_markdown(export_path, base_filename, options)
-            elif "Text Files" in options["format"]:
-                self.export_as_text(export_path, base_filename, options)
-            elif "JSON" in options["format"]:
-                self.export_as_json(export_path, base_filename, options)
-
-            QMessageBox.information(self, "Export Successful", f"Snippets exported to {export_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Export Error", f"Failed to export snippets: {str(e)}")
-    
-    def export_as_python_files(self, export_path, base_filename, options):
-        """Export snippets as Python files"""
-        if options["separate_files"]:
-            for i, snippet in enumerate(self.current_snippets):
-                if snippet["language"].lower() == "python":
-                    filename = f"{base_filename}_{i+1}.py"
-                    with open(os.path.join(export_path, filename), 'w') as f:
-                        if options["include_timestamps"]:
-                            f.write(f"# Timestamp: {snippet['timestamp']}\n")
-                        if options["include_language"]:
-                            f.write(f"# Language: {snippet['language']}\n")
-                        f.write("\n")
-                        f.write(snippet["code"])
+        """Export snippets according to options, streaming them on a worker thread."""
+        export_path = options["export_path"]
+        if not export_path:
+            QMessageBox.warning(self, "Export Error", "Please select an export directory")
+            return
+        
+        base_filename = self.current_file.split('.')[0] if self.current_file else f"code_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.export_thread = ExportThread(export_path, options["format"], {
+            "snippet_ids": [snippet["id"] for snippet in self.current_snippets],
+            "base_filename": base_filename,
+            "include_timestamps": options["include_timestamps"],
+            "include_language": options["include_language"],
+            "separate_files": options["separate_files"],
+            "archive": options["archive"],
+            "source_label": self.current_file or "video"
+        })
+        
+        self.export_progress = QProgressDialog("Exporting snippets...", "Cancel", 0, len(self.current_snippets), self)
+        self.export_progress.setWindowTitle("Export")
+        self.export_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.export_progress.setMinimumDuration(500)
+        self.export_progress.canceled.connect(self.export_thread.cancel)
+        
+        self.export_thread.progress_signal.connect(self.update_export_progress)
+        self.export_thread.completed_signal.connect(self.export_finished)
+        self.export_thread.failed_signal.connect(self.export_failed)
+        self.export_thread.start()
+    
+    def update_export_progress(self, done, total):
+        self.export_progress.setMaximum(total)
+        self.export_progress.setValue(done)
+    
+    def export_finished(self, path):
+        self.export_progress.reset()
+        if path:
+            QMessageBox.information(self, "Export Successful", f"Snippets exported to {path}")
         else:
-            # Group by language and write Python snippets to a single file
-            with open(os.path.join(export_path, f"{base_filename}.py"), 'w') as f:
-                for i, snippet in enumerate(self.current_snippets):
-                    if snippet["language"].lower() == "python":
-                        f.write(f"# Snippet {i+1}\n")
-                        if options["include_timestamps"]:
-                            f.write(f"# Timestamp: {snippet['timestamp']}\n")
-                        if options["include_language"]:
-                            f.write(f"# Language: {snippet['language']}\n")
-                        f.write("\n")
-                        f.write(snippet["code"])
-                        f.write("\n\n" + "#" * 80 + "\n\n")
-    
-    def export_as_html(self, export_path, base_filename, options):
-        """Export snippets as HTML"""
-        with open(os.path.join(export_path, f"{base_filename}.html"), 'w') as f:
-            f.write("""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Extracted Code Snippets</title>
-    <style>
-        body { font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; }
-        .snippet { margin-bottom: 30px; border: 1px solid #ddd; padding: 15px; border-radius: 5px; }
-        .snippet-header { margin-bottom: 10px; color: #555; }
-        pre { background-color: #f5f5f5; padding: 10px; border-radius: 3px; overflow-x: auto; }
-        .divider { margin: 40px 0; border-top: 1px solid #eee; }
-    </style>
-</head>
-<body>
-    <h1>Extracted Code Snippets</h1>
-    <p>Extracted from: """ + (self.current_file or "video") + """</p>
-""")
-            
-            for i, snippet in enumerate(self.current_snippets):
-                f.write(f'<div class="snippet">\n')
-                f.write(f'<div class="snippet-header">\n')
-                f.write(f'<h2>Snippet {i+1}</h2>\n')
-                
-                if options["include_timestamps"]:
-                    f.write(f'<p><strong>Timestamp:</strong> {snippet["timestamp"]}</p>\n')
-                if options["include_language"]:
-                    f.write(f'<p><strong>Language:</strong> {snippet["language"]}</p>\n')
-                
-                f.write('</div>\n')
-                f.write(f'<pre><code>{snippet["code"]}</code></pre>\n')
-                f.write('</div>\n')
-                
-                if i < len(self.current_snippets) - 1:
-                    f.write('<div class="divider"></div>\n')
-            
-            f.write("""</body>
-</html>""")
-    
-    def export_as_markdown(self, export_path, base_filename, options):
-        """Export snippets as Markdown"""
-        with open(os.path.join(export_path, f"{base_filename}.md"), 'w') as f:
-            f.write("# Extracted Code Snippets\n\n")
-            f.write(f"Extracted from: {self.current_file or 'video'}\n\n")
-            
-            for i, snippet in enumerate(self.current_snippets):
-                f.write(f"## Snippet {i+1}\n\n")
-                
-                if options["include_timestamps"]:
-                    f.write(f"**Timestamp:** {snippet['timestamp']}\n\n")
-                if options["include_language"]:
-                    f.write(f"**Language:** {snippet['language']}\n\n")
-                
-                f.write(f"```{snippet['language'].lower()}\n")
-                f.write(snippet["code"])
-                f.write("\n```\n\n")
-                
-                if i < len(self.current_snippets) - 1:
-                    f.write("---\n\n")
-    
-    def export_as_text(self, export_path, base_filename, options):
-        """Export snippets as plain text"""
-        with open(os.path.join(export_path, f"{base_filename}.txt"), 'w') as f:
-            f.write("EXTRACTED CODE SNIPPETS\n")
-            f.write("=" * 80 + "\n\n")
-            f.write(f"Extracted from: {self.current_file or 'video'}\n\n")
-            
-            for i, snippet in enumerate(self.current_snippets):
-                f.write(f"SNIPPET {i+1}\n")
-                f.write("-" * 80 + "\n")
-                if options["include_timestamps"]:
-                    f.write(f"Timestamp: {snippet['timestamp']}\n")
-                if options["include_language"]:
-                    f.write(f"Language: {snippet['language']}\n")
-                f.write("\n")
-                f.write(snippet["code"])
-                f.write("\n\n")
-    
-    def export_as_json(self, export_path, base_filename, options):
-        """Export snippets as JSON"""
-        with open(os.path.join(export_path, f"{base_filename}.json"), 'w') as f:
-            json_data = []
-            for snippet in self.current_snippets:
-                snippet_data = {
-                    "timestamp": snippet["timestamp"],
-                    "language": snippet["language"],
-                    "code": snippet["code"]
-                }
-                if options["include_timestamps"]:
-                    snippet_data["timestamp"] = snippet["timestamp"]
-                if options["include_language"]:
-                    snippet_data["language"] = snippet["language"]
-                json_data.append(snippet_data)
-            json.dump(json_data, f, indent=4)
+            self.status_bar.showMessage("Export cancelled")
+    
+    def export_failed(self, error):
+        self.export_progress.reset()
+        QMessageBox.critical(self, "Export Error", f"Failed to export snippets: {error}")
 
     def processing_finished(self):
-        """Handle completion of video processing"""
-        self.progress_bar.setVisible(False)
-        self.status_bar.showMessage("Processing completed")
-        self.display_results()
+        """Handle completion of all queued video processing"""
+        # Rows were streamed in while processing, so there is nothing to reload
+        if not self.current_snippets:
+            self.status_bar.showMessage("Processing completed. No code snippets were found.")
+        else:
+            self.status_bar.showMessage(f"Processing completed. Found {len(self.current_snippets)} code snippets.")
+
+    def closeEvent(self, event):
+        """Stop running extractions and exports before closing"""
+        self.job_panel.shutdown()
+        if self.export_thread is not None and self.export_thread.isRunning():
+            self.export_thread.cancel()
+            self.export_thread.wait()
+        super().closeEvent(event)
 
     def show_error(self, error_message):
         """Display an error message"""
@@ -684,16 +1192,15 @@ class VideoCodeExtractorApp(QMainWindow):
 
     def view_database(self):
         """View all stored snippets in the database"""
-        snippets = session.query(CodeSnippet).all()
-        if not snippets:
-            QMessageBox.information(self, "No Data", "No snippets found in the database.")
-            return
+        self.current_sources = None
+        self.current_file = None
+        # Summaries are read on a worker thread, the whole table may be large
+        self._start_filter(self.filter_options or {})
 
-        self.current_snippets = [
-            {"timestamp": snippet.timestamp, "language": snippet.language, "code": snippet.code}
-            for snippet in snippets
-        ]
-        self.update_tree_view(self.current_snippets)
+    def show_statistics(self):
+        """Display the database statistics"""
+        dialog = StatisticsDialog(self)
+        dialog.exec()
 
     def show_about(self):
         """Display an About dialog"""
@@ -708,6 +1215,11 @@ class VideoCodeExtractorApp(QMainWindow):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    if has_legacy_code_column():
+        QMessageBox.critical(None, "Database Upgrade Needed",
+                             "code_snippets.db was created by an older version.\n\n"
+                             "Upgrade it with: python database.py migrate")
+        sys.exit(1)
     window = VideoCodeExtractorApp()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""Correction of common OCR misreads in extracted code.
+
+Corrections run in two linear passes over the text:
+
+1. Substitutions (misread characters and known misread words) are compiled
+   into a single regular expression shaped like a trie of the table's
+   keys, so every position is matched against all entries at once and the
+   cost does not grow with the number of entries.
+2. Once the language is known, words that are neither in that language's
+   vocabulary of keywords and common identifiers nor in the list of known
+   words (KNOWN_WORDS_FILE) are repaired with a symmetric-delete spelling
+   corrector: the deletes of every vocabulary word are precomputed, so a
+   lookup only generates the deletes of the misread word instead of
+   comparing it with the whole vocabulary. Words shorter than
+   MIN_FREE_EDIT_LENGTH are only corrected when the edit is a typical OCR
+   confusion (see CONFUSIONS); "white" stays "white", "whlle" becomes "while".
+
+The built-in tables can be extended with a JSON file (see CORRECTIONS_FILE):
+
+    {"substitutions": {"misread": "fix"}, "vocabulary": {"python": ["word"]}}
+
+The known words are the words of the Python standard library's sources and
+documentation, so real identifiers and English words are never corrected
+into a keyword. The list is generated by build_known_words.py.
+"""
+import json
+import os
+import re
+import threading
+
+from text_distance import edit_distance
+
+# Extra substitutions and vocabulary, merged into the built-in tables if the file exists
+CORRECTIONS_FILE = os.environ.get("OCR_CORRECTIONS_FILE", "ocr_corrections.json")
+# Lowercase words, one per line, that are never corrected
+KNOWN_WORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "known_words.txt")
+
+DEFAULT_SUBSTITUTIONS = {
+    # Look-alike characters
+    "О": "O", "о": "o", "І": "I", "і": "i", "—": "-", "–": "-",
+    "''": "\"", "``": "\"", "ˋ": "`",
+    # Misreads seen in Django tutorials
+    "Revense": "reverse", "modells": "models", "tinezens": "timezone", "CHES": "class",
+    "Foraignikay": "ForeignKey", "CharRicila": "CharField", "TaxtRicla": "TextField",
+    "DatelinePicld": "DateTimeField", "BriodoltsmDatelrine": "DateField", "pubblliisin": "publish",
+}
+
+DEFAULT_VOCABULARY = {
+    "python": [
+        "and", "as", "assert", "async", "await", "break", "class", "continue", "def", "del", "elif",
+        "else", "except", "False", "finally", "for", "from", "global", "if", "import", "in", "is",
+        "lambda", "None", "nonlocal", "not", "or", "pass", "raise", "return", "True", "try", "while",
+        "with", "yield", "self", "print", "range", "len", "str", "int", "float", "list", "dict",
+        "tuple", "set", "open", "super", "isinstance", "enumerate", "append", "extend", "items",
+        "keys", "values", "format", "join", "split", "strip", "replace", "Exception", "ValueError",
+        "TypeError", "KeyError", "__init__", "__name__", "__main__", "property", "staticmethod",
+        "classmethod", "models", "Model", "CharField", "TextField", "DateField", "DateTimeField",
+        "ForeignKey", "IntegerField", "BooleanField", "timezone", "reverse", "objects", "filter",
+        "render", "request", "response", "publish",
+        # Common identifiers, so they are not "corrected" into a nearby keyword
+        "value", "name", "data", "result", "node", "item", "index", "count", "text", "path", "file",
+        "line", "user", "kwargs", "args", "config", "status", "message", "error", "output", "input",
+    ],
+    "javascript": [
+        "break", "case", "catch", "class", "const", "continue", "debugger", "default", "delete", "do",
+        "else", "export", "extends", "false", "finally", "for", "function", "if", "import", "in",
+        "instanceof", "new", "null", "return", "super", "switch", "this", "throw", "true", "try",
+        "typeof", "var", "void", "while", "with", "yield", "let", "async", "await", "console", "log",
+        "document", "window", "undefined", "length", "push", "addEventListener", "querySelector",
+        "getElementById", "JSON", "parse", "stringify", "Promise", "then", "require", "module",
+        "exports",
+    ],
+    "java": [
+        "abstract", "boolean", "byte", "char", "double", "extends", "final", "float", "implements",
+        "import", "instanceof", "interface", "long", "native", "package", "private", "protected",
+        "public", "short", "static", "synchronized", "throws", "transient", "volatile", "String",
+        "System", "println", "Override", "void", "main", "args", "ArrayList", "HashMap",
+    ],
+    "html": [
+        "html", "head", "body", "title", "div", "span", "script", "style", "link", "meta", "href",
+        "class", "table", "form", "input", "button", "label", "select", "option", "section", "header",
+        "footer", "charset", "content", "viewport", "stylesheet",
+    ],
+    "css": [
+        "color", "background", "margin", "padding", "border", "display", "position", "width",
+        "height", "font", "family", "size", "weight", "flex", "grid", "absolute", "relative",
+        "block", "inline", "none", "solid", "transparent", "important", "hover",
+    ],
+    "sql": [
+        "SELECT", "FROM", "WHERE", "INSERT", "INTO", "VALUES", "UPDATE", "DELETE", "CREATE", "TABLE",
+        "DROP", "ALTER", "JOIN", "INNER", "LEFT", "RIGHT", "OUTER", "GROUP", "ORDER", "HAVING",
+        "LIMIT", "DISTINCT", "PRIMARY", "FOREIGN", "REFERENCES", "NULL", "COUNT", "INDEX",
+    ],
+}
+
+# Words shorter than this are too ambiguous to correct
+MIN_CORRECTED_LENGTH = 5
+# Longer words are left alone; they are almost always identifiers
+MAX_CORRECTED_LENGTH = 24
+# Misreads repeated this often in one text are taken to be intentional identifiers
+MIN_REPEATS_KEPT = 2
+# Shorter words are only corrected by a single OCR confusion, not by any one edit
+MIN_FREE_EDIT_LENGTH = 7
+# Character sequences OCR reads as each other, in either direction
+CONFUSIONS = [
+    ("i", "l"), ("i", "1"), ("l", "1"), ("i", "j"), ("o", "0"), ("o", "c"), ("o", "a"), ("e", "c"),
+    ("a", "e"), ("u", "v"), ("n", "h"), ("s", "5"), ("b", "6"), ("g", "9"), ("z", "2"), ("t", "f"),
+    ("rn", "m"), ("cl", "d"), ("vv", "w"), ("ri", "n"), ("in", "m"), ("li", "h"),
+]
+
+def build_trie_pattern(words):
+    """Regular expression matching any of words, shaped like a trie so shared prefixes are tried once.
+
+    Longer words are preferred where one word is a prefix of another.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return _trie_to_pattern(trie)
+
+def _trie_to_pattern(node):
+    alternatives = []
+    ends_here = "" in node
+    for char in sorted(key for key in node if key):
+        alternatives.append(re.escape(char) + _trie_to_pattern(node[char]))
+    if not alternatives:
+        return ""
+    pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if ends_here:
+        # Greedy optional group: try the longer words first, fall back to the word ending here
+        pattern = "(?:" + pattern + ")?"
+    return pattern
+
+class SubstitutionTable:
+    """Applies all substitutions in one pass, leftmost-longest match first"""
+    def __init__(self, substitutions):
+        self.substitutions = dict(substitutions)
+        self.pattern = re.compile(build_trie_pattern(self.substitutions)) if self.substitutions else None
+
+    def apply(self, text):
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(lambda match: self.substitutions[match.group(0)], text)
+
+def _deletes(word, max_distance):
+    """All strings made by deleting up to max_distance characters of word."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for candidate in frontier:
+            for i in range(len(candidate)):
+                next_frontier.add(candidate[:i] + candidate[i + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+def max_distance_for(word):
+    """Edits allowed when correcting word; short words only get one."""
+    return 1 if len(word) < 8 else 2
+
+def is_confusion(word, candidate):
+    """Whether candidate is word with one sequence replaced by its OCR confusion (see CONFUSIONS)."""
+    word, candidate = word.lower(), candidate.lower()
+    for a, b in CONFUSIONS:
+        for source, target in ((a, b), (b, a)):
+            if len(word) - len(source) + len(target) != len(candidate):
+                continue
+            start = word.find(source)
+            while start != -1:
+                if word[:start] + target + word[start + len(source):] == candidate:
+                    return True
+                start = word.find(source, start + 1)
+    return False
+
+def _match_case(word, correction):
+    """Give correction the capitalization of the misread word where the vocabulary has none."""
+    if word.isupper():
+        return correction.upper()
+    if correction.islower():
+        return correction.capitalize() if word[0].isupper() else correction
+    return correction
+
+class SymSpellCorrector:
+    """Symmetric-delete spelling corrector over a fixed vocabulary.
+
+    Lookups are case-insensitive; corrections take the vocabulary's
+    spelling. Among equally close words the one listed first wins.
+    """
+    def __init__(self, vocabulary, max_distance=2):
+        self.max_distance = max_distance
+        self.words = {}  # Lowercase word -> spelling, in priority order
+        self.deletes = {}  # Delete of a lowercase word -> words it was made from
+        for word in vocabulary:
+            key = word.lower()
+            if key in self.words or len(key) < MIN_CORRECTED_LENGTH - self.max_distance:
+                continue
+            self.words[key] = word
+            for delete in _deletes(key, max_distance):
+                self.deletes.setdefault(delete, []).append(key)
+        self.ranks = {key: rank for rank, key in enumerate(self.words)}
+        self.cache = {}
+
+    def __contains__(self, word):
+        return word.lower() in self.words
+
+    def correct(self, word):
+        """The closest vocabulary word to word, or word itself if none is close enough."""
+        key = word.lower()
+        if key in self.words:
+            return word
+        if key not in self.cache:
+            self.cache[key] = self._lookup(key)
+        correction = self.cache[key]
+        return _match_case(word, correction) if correction else word
+
+    def _lookup(self, key):
+        """Closest vocabulary word to a lowercase key, or None."""
+        max_distance = min(self.max_distance, max_distance_for(key))
+        best, best_distance = None, max_distance + 1
+        seen = set()
+        for delete in _deletes(key, max_distance):
+            for candidate in self.deletes.get(delete, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if candidate.rstrip("s") == key.rstrip("s"):
+                    continue  # Singular and plural are usually both valid names
+                if is_confusion(key, candidate):
+                    distance = 1  # Also for "rn" read as "m" and the like
+                elif len(key) < MIN_FREE_EDIT_LENGTH:
+                    continue  # One arbitrary edit turns too many short words into each other
+                else:
+                    distance = edit_distance(key, candidate, max_distance)
+                if distance < best_distance or (
+                    distance == best_distance and best is not None
+                    and self.ranks[candidate] < self.ranks[best]
+                ):
+                    best, best_distance = candidate, distance
+        return self.words[best] if best is not None else None
+
+WORD_PATTERN = re.compile(r"\b[A-Za-z]{%d,%d}\b" % (MIN_CORRECTED_LENGTH, MAX_CORRECTED_LENGTH))
+INDENTED_LINE_PATTERN = re.compile(r"^    [^\n]*", re.MULTILINE)
+
+class CorrectionEngine:
+    """Substitution table plus one spelling corrector per language, applied in linear passes"""
+    def __init__(self, substitutions, vocabulary, known_words=()):
+        self.substitutions = SubstitutionTable(substitutions)
+        # vocabulary maps lowercase language names to their words
+        self.correctors = {language: SymSpellCorrector(words) for language, words in vocabulary.items()}
+        # A word valid in any language is not a misread, whatever the snippet's language
+        self.known_words = set(known_words)
+        for words in vocabulary.values():
+            self.known_words.update(word.lower() for word in words)
+
+    def correct(self, text, language=None):
+        """Text with substitutions applied, and misspelled words repaired if language is given."""
+        text = self.substitutions.apply(text)
+        if language:
+            text = self.correct_spelling(text, language)
+        if "\t" in text:
+            text = INDENTED_LINE_PATTERN.sub(lambda match: match.group(0).replace("\t", "    "), text)
+        return text
+
+    def correct_spelling(self, text, language):
+        """Repair words against the vocabulary of language; languages without one are left alone."""
+        corrector = self.correctors.get(language.lower())
+        if corrector is None:
+            return text
+
+        counts = {}
+        for word in WORD_PATTERN.findall(text):
+            counts[word] = counts.get(word, 0) + 1
+
+        def correct_word(match):
+            word = match.group(0)
+            if counts[word] >= MIN_REPEATS_KEPT or word.lower() in self.known_words:
+                return word
+            return corrector.correct(word)
+
+        return WORD_PATTERN.sub(correct_word, text)
+
+def load_tables(path=CORRECTIONS_FILE):
+    """Built-in substitutions and vocabulary, extended by the JSON file at path if there is one."""
+    substitutions = dict(DEFAULT_SUBSTITUTIONS)
+    vocabulary = {language: list(words) for language, words in DEFAULT_VOCABULARY.items()}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+        substitutions.update(extra.get("substitutions", {}))
+        for language, words in extra.get("vocabulary", {}).items():
+            vocabulary.setdefault(language.lower(), []).extend(words)
+    return substitutions, vocabulary
+
+def load_known_words(path=KNOWN_WORDS_FILE):
+    """The known words at path, or an empty set if the list was not built; # lines are comments."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip() and not line.startswith("#")}
+    except FileNotFoundError:
+        return set()
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_correction_engine():
+    """The shared correction engine with every language's vocabulary, built on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            substitutions, vocabulary = load_tables()
+            _engine = CorrectionEngine(substitutions, vocabulary, load_known_words())
+        return _engine
@@ -5,23 +5,52 @@ import re
 import os
 import time
 import json
+import threading
 import numpy as np
 from datetime import datetime
-from database import CodeSnippet, session
+from database import CodeSnippet, session, add_snippet
+from thumbnails import FrameIndex, get_thumbnail_cache, seek_to_frame, video_key
+from ocr_corrections import get_correction_engine
+import code_formatter
+from code_classifier import get_classifier
+from line_ocr import IncrementalLineOCR, boxes_to_text
+from temporal_fusion import FUSION_FRAMES, FUSION_SCALE, FUSION_SPACING_SECONDS, reading_from_results, read_fused
+from split_ocr import split_readtext
+from text_stage_memo import get_text_stage_memo
+from scroll_stitch import CHECK_SECONDS, ScrollStitcher
+from extraction_jobs import ExtractionControl
 import easyocr  # Import EasyOCR
 
 # Set this if using Windows
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-# Initialize EasyOCR reader
-reader = easyocr.Reader(['en'], gpu=False)  # Set `gpu=True` if you have a GPU and want to use it
+# EasyOCR reader, loaded on first use since loading the models takes seconds
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """The shared EasyOCR reader, created on first use."""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = easyocr.Reader(['en'], gpu=False)  # Set `gpu=True` if you have a GPU and want to use it
+        return _reader
+
+# Minimum line similarity for a capture to be stored as an edit of a recent snippet
+EDIT_SIMILARITY_THRESHOLD = 0.6
+# Number of recently stored snippets considered as parents of a new capture
+RECENT_SNIPPETS_TRACKED = 5
 
 def get_timestamp(frame_num, fps):
     seconds = int(frame_num / fps)
     return f"{seconds//3600:02d}:{(seconds%3600)//60:02d}:{seconds%60:02d}"
 
-def preprocess_frame(frame):
-    """Apply advanced preprocessing to optimize frame for code OCR."""
+def preprocess_frame(frame, scale=2.0):
+    """Apply advanced preprocessing to optimize frame for code OCR.
+
+    scale is the upscaling factor; single-frame OCR needs 2x, fused
+    readings of several frames (see temporal_fusion) do with less.
+    """
     # Convert to grayscale
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     
@@ -32,8 +61,10 @@ def preprocess_frame(frame):
     cropped = gray[margin_y:height-margin_y, margin_x:width-margin_x]
     
     # Scale up the cropped region for better OCR
-    scale_factor = 2.0
-    scaled = cv2.resize(cropped, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_CUBIC)
+    if scale != 1.0:
+        scaled = cv2.resize(cropped, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    else:
+        scaled = cropped
     
     # Apply sharpening filter
     kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
@@ -124,276 +155,283 @@ def detect_language(code):
     
     return "Unknown"
 
-def format_python_code(code):
-    """Reformat Python code to ensure proper indentation."""
-    lines = code.splitlines()
-    formatted_lines = []
-    indent_level = 0
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:  # Skip empty lines
-            formatted_lines.append("")
-            continue
-
-        # Adjust indentation based on Python block keywords
-        if stripped.endswith(":"):
-            formatted_lines.append("    " * indent_level + stripped)
-            indent_level += 1
-        elif stripped.startswith(("elif ", "else:", "except ", "finally:")):
-            indent_level = max(indent_level - 1, 0)
-            formatted_lines.append("    " * indent_level + stripped)
-            indent_level += 1
-        elif stripped.startswith(("return", "pass", "break", "continue")):
-            formatted_lines.append("    " * indent_level + stripped)
-        elif stripped.startswith(("}", ")")):  # Handle closing brackets
-            indent_level = max(indent_level - 1, 0)
-            formatted_lines.append("    " * indent_level + stripped)
-        else:
-            formatted_lines.append("    " * indent_level + stripped)
-
-    return "\n".join(formatted_lines)
-
-def format_javascript_code(code):
-    """Reformat JavaScript code to ensure proper indentation."""
-    lines = code.splitlines()
-    formatted_lines = []
-    indent_level = 0
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:  # Skip empty lines
-            formatted_lines.append("")
-            continue
-
-        # Adjust indentation based on brackets
-        if stripped.endswith("{"):
-            formatted_lines.append("    " * indent_level + stripped)
-            indent_level += 1
-        elif stripped.startswith("}"):
-            indent_level = max(indent_level - 1, 0)
-            formatted_lines.append("    " * indent_level + stripped)
-        else:
-            formatted_lines.append("    " * indent_level + stripped)
-
-    return "\n".join(formatted_lines)
-
-def format_html_code(code):
-    """Reformat HTML code with proper indentation."""
-    lines = code.splitlines()
-    formatted_lines = []
-    indent_level = 0
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:  # Skip empty lines
-            formatted_lines.append("")
-            continue
-
-        # Adjust indentation based on opening and closing tags
-        if stripped.startswith("</"):
-            indent_level = max(indent_level - 1, 0)
-        formatted_lines.append("    " * indent_level + stripped)
-        if stripped.endswith(">") and not stripped.startswith("</") and not stripped.endswith("/>"):
-            indent_level += 1
-
-    return "\n".join(formatted_lines)
-
-def format_css_code(code):
-    """Reformat CSS code with proper indentation."""
-    lines = code.splitlines()
-    formatted_lines = []
-    in_block = False
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:  # Skip empty lines
-            formatted_lines.append("")
-            continue
-
-        if "{" in stripped and "}" not in stripped:
-            # Start of CSS block
-            formatted_lines.append(stripped)
-            in_block = True
-        elif "}" in stripped and "{" not in stripped:
-            # End of CSS block
-            if in_block:
-                formatted_lines.append("    " + stripped)
-            else:
-                formatted_lines.append(stripped)
-            in_block = False
-        elif in_block:
-            # Inside CSS block
-            formatted_lines.append("    " + stripped)
-        else:
-            # Outside any block
-            formatted_lines.append(stripped)
-
-    return "\n".join(formatted_lines)
-
-def format_sql_code(code):
-    """Reformat SQL code with proper indentation and capitalization."""
-    keywords = [
-        "SELECT", "FROM", "WHERE", "GROUP BY", "ORDER BY", "HAVING", 
-        "JOIN", "LEFT JOIN", "RIGHT JOIN", "INNER JOIN", "OUTER JOIN",
-        "ON", "AND", "OR", "NOT", "IN", "BETWEEN", "LIKE", "IS NULL", 
-        "IS NOT NULL", "AS", "INSERT INTO", "VALUES", "UPDATE", "SET",
-        "DELETE FROM", "CREATE TABLE", "ALTER TABLE", "DROP TABLE"
-    ]
-    lines = code.splitlines()
-    formatted_lines = []
-
-    for line in lines:
-        formatted_line = line.strip()
-        for keyword in keywords:
-            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-            formatted_line = re.sub(pattern, keyword, formatted_line, flags=re.IGNORECASE)
-        formatted_lines.append(formatted_line)
-
-    return "\n".join(formatted_lines)
-
-def format_generic_code(code):
-    """Basic formatting for generic code."""
-    lines = code.splitlines()
-    formatted_lines = []
-
-    for line in lines:
-        formatted_lines.append(line.strip())
-
-    return "\n".join(formatted_lines)
-
-def format_code(code, language):
-    """Format code based on detected language."""
-    if language == "Python":
-        code = cleanup_extracted_text(code)
-        return format_python_code(code)
-    elif language == "JavaScript":
-        return format_javascript_code(code)
-    elif language == "HTML":
-        return format_html_code(code)
-    elif language == "CSS":
-        return format_css_code(code)
-    elif language == "SQL":
-        return format_sql_code(code)
-    return format_generic_code(code)
-
-def cleanup_extracted_text(text):
-    """Advanced cleanup of OCR errors in code extraction."""
-    replacements = {
-        "О": "O", "о": "o", "І": "I", "і": "i", "—": "-", "–": "-",
-        "''": "\"", "``": "\"", "ˋ": "`", "Revense": "reverse", "modells": "models",
-        "tinezens": "timezone", "CHES": "class", "Foraignikay": "ForeignKey",
-        "CharRicila": "CharField", "TaxtRicla": "TextField", "DatelinePicld": "DateTimeField",
-        "BriodoltsmDatelrine": "DateField", "pubblliisin": "publish"
-    }
-    
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
-    lines = text.splitlines()
-    for i in range(len(lines)):
-        if lines[i].startswith("    "):
-            lines[i] = lines[i].replace("\t", "    ")
-    
-    return "\n".join(lines)
-
-def is_code_snippet(text):
-    """Determine if the extracted text is likely code rather than natural language."""
-    if len(text) < 20:
-        return False
-        
-    lines = text.splitlines()
-    if len(lines) < 2:
-        return False
-        
-    code_indicators = [
-        r"def\s+\w+\s*\(", r"class\s+\w+", r"function\s+\w+",
-        r"import\s+\w+", r"from\s+\w+\s+import", r"var\s+\w+\s*=",
-        r"let\s+\w+\s*=", r"const\s+\w+\s*=", r"if\s*\(", r"for\s*\(",
-        r"while\s*\(", r"{\s*\n", r"}\s*\n", r"<\w+>.*</\w+>",
-        r"#include", r"public\s+class", r"private\s+\w+\s+\w+\(",
-        r"@Override", r"int\s+\w+\s*\(", r"void\s+\w+\s*\(",
-        r"print\(", r"return\s", r"==", r"!=", r"->", r"=>",
-        r"//", r"#", r"/\*", r"\*/", r"'''", r'"""'
-    ]
-    
-    indentation_pattern = r"^\s{2,}.*$"
-    indented_lines = sum(1 for line in lines if re.match(indentation_pattern, line))
-    
-    code_symbols = ["{", "}", "[", "]", "(", ")", ";", "=", "==", "!=", ">=", "<=", "+=", "-=", "*=", "/="]
-    symbol_count = sum(text.count(symbol) for symbol in code_symbols)
-    
-    avg_line_length = sum(len(line) for line in lines) / len(lines) if lines else 0
-    
-    if indented_lines >= 2 or symbol_count > 5:
-        return True
-    
-    for pattern in code_indicators:
-        if re.search(pattern, text):
-            return True
-            
-    if 10 <= avg_line_length <= 80:
-        return True
-    
-    return False
-
-def extract_code_from_video(video_path, progress_callback=None):
-    """Extract code snippets from the video and save them to the database."""
+def format_code(code, language, reindent=True):
+    """Format code based on detected language, see code_formatter."""
+    return code_formatter.format_code(code, language, reindent)
+
+def cleanup_extracted_text(text, language=None):
+    """Advanced cleanup of OCR errors in code extraction, see ocr_corrections.
+
+    Misspelled words are only repaired once the language is known, against
+    that language's vocabulary.
+    """
+    return get_correction_engine().correct(text, language)
+
+def _classifiable(text):
+    """Whether text is long enough for the classifier to judge; shorter texts are not code."""
+    return len(text) >= 20 and len(text.splitlines()) >= 2
+
+def is_code_snippet(text, threshold=None):
+    """Determine if the extracted text is likely code rather than natural language.
+
+    Uses the trained classifier in code_classifier; threshold overrides the
+    probability cutoff shipped with its weights.
+    """
+    return _classifiable(text) and get_classifier().is_code(text, threshold)
+
+def _finish_text_stages(cleaned_text, reindent):
+    language = detect_language(cleaned_text)
+    if language == "Unknown":
+        return None
+    corrected_text = get_correction_engine().correct_spelling(cleaned_text, language)
+    return language, format_code(corrected_text, language, reindent)
+
+def run_text_stages(text, reindent=True):
+    """Clean up, classify, detect and format OCR text; None if it is not code, else (language, code).
+
+    Called through text_stage_memo, which skips texts already decided.
+    """
+    cleaned_text = cleanup_extracted_text(text)
+    if not cleaned_text or not is_code_snippet(cleaned_text):
+        return None
+    return _finish_text_stages(cleaned_text, reindent)
+
+def run_text_stages_batch(texts, reindents):
+    """run_text_stages for many texts, with reindents[i] for texts[i].
+
+    The classifier scores all texts with one matrix product, which costs a
+    fraction of classifying them one by one.
+    """
+    cleaned_texts = [cleanup_extracted_text(text) for text in texts]
+    candidates = [index for index, text in enumerate(cleaned_texts) if text and _classifiable(text)]
+    decisions = [None] * len(texts)
+    if candidates:
+        flags = get_classifier().are_code([cleaned_texts[index] for index in candidates])
+        for index, is_code in zip(candidates, flags):
+            if is_code:
+                decisions[index] = _finish_text_stages(cleaned_texts[index], reindents[index])
+    return decisions
+
+def extract_code_from_video(video_path, progress_callback=None, snippet_callback=None, control=None,
+                            thumbnail_cache=None, incremental_ocr=False, fusion=False, split_resolution=False,
+                            start_frame=0, end_frame=None, store=None, frame_index=None, scroll_stitch=False):
+    """Extract code snippets from the video and save them to the database.
+
+    progress_callback receives the progress in percent, snippet_callback the
+    summary (see CodeSnippet.to_summary) of every newly stored snippet.
+    An ExtractionControl passed as control can pause or cancel the run.
+    A thumbnail of the source frame of every new snippet is stored in
+    thumbnail_cache (the shared cache by default), and the sampled frames
+    are indexed for seeking.
+
+    With incremental_ocr only the text lines that changed since the previous
+    sampled frame are recognized again (see line_ocr), and indentation is
+    taken from the lines' positions instead of being guessed by the formatter.
+    With fusion every sample is read from FUSION_FRAMES frames at native
+    resolution whose readings are merged (see temporal_fusion), instead of
+    from one upscaled frame; it is ignored together with incremental_ocr.
+    With split_resolution text is detected on a downscaled frame and only
+    the detected lines are recognized at full resolution (see split_ocr),
+    which keeps high-resolution videos about as fast as low-resolution ones.
+    With scroll_stitch the view is followed between samples; while it
+    scrolls, only newly revealed rows are read and the whole scroll
+    sequence is stored as one snippet (see scroll_stitch).
+
+    start_frame and end_frame limit the run to a range of frames; samples
+    stay on the grid of a full run. If store is given, captures are passed
+    to it as dicts (frame_number, timestamp, language, code) instead of
+    being saved to the database, see save_capture. A frame_index passed in
+    is filled but not saved.
+    """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError("Could not open video file.")
     
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frame_num = 0
-    recent_codes = []
-    sampling_rate = max(1, int(fps * 2))  # Process 1 frame every 2 seconds
+    end_frame = total_frames if end_frame is None else min(end_frame, total_frames)
+    frame_num = seek_to_frame(cap, start_frame) if start_frame else 0
+    key = video_key(video_path)
+    recent_snippets = []  # (snippet id, language, code) of the latest stored snippets
+    stored_codes = set()  # Codes passed to store, so each gets one thumbnail
+    sampling_rate = sampling_interval(fps)
+    thumbnail_cache = thumbnail_cache or get_thumbnail_cache()
+    save_index = frame_index is None
+    frame_index = frame_index or FrameIndex(video_path)
+    line_reader = IncrementalLineOCR(get_reader()) if incremental_ocr else None
+    fusion_spacing = max(1, int(fps * FUSION_SPACING_SECONDS))
+    # The fused frames must fit between two samples
+    fusion_frames = min(FUSION_FRAMES, (sampling_rate - 1) // fusion_spacing + 1)
+    fusion = fusion and not line_reader and fusion_frames > 1
+    text_memo = get_text_stage_memo()
+    memo_hits, memo_misses = text_memo.hits, text_memo.misses
+    scroll_check_interval = max(1, int(fps * CHECK_SECONDS))
+    stitcher = ScrollStitcher(get_reader(), fps, scroll_check_interval) if scroll_stitch else None
+
+    def capture(sample_num, frame, decision, confidence=None, reindent=True):
+        """Store or save a capture the text stages accepted, formatted with or without reindent."""
+        language, formatted_code = decision
+        timestamp = get_timestamp(sample_num, fps)
+        if store:
+            snippet = None
+            store({"frame_number": sample_num, "timestamp": timestamp,
+                   "language": language, "code": formatted_code, "reindent": reindent})
+            if formatted_code not in stored_codes:
+                stored_codes.add(formatted_code)
+                thumbnail_cache.put(key, sample_num, frame)
+        else:
+            snippet = save_capture(os.path.basename(video_path), sample_num, timestamp,
+                                   language, formatted_code, recent_snippets, reindent, key)
+            if snippet is not None and snippet.occurrences == 1:
+                thumbnail_cache.put(key, sample_num, frame)
+                if snippet_callback:
+                    snippet_callback(snippet.to_summary())
+        if store or snippet is not None:
+            if confidence is None:
+                print(f"Extracted {language} code at {timestamp}")
+            else:
+                print(f"Extracted {language} code at {timestamp} (fused confidence {confidence:.2f})")
+
+    def capture_sequence(sequence):
+        # Boxes of a stitched sequence carry their indentation, as with line OCR
+        text, sequence_start, sequence_frame = sequence
+        decision = text_memo.process(text, reindent=False) if text.strip() else None
+        if decision is not None:
+            capture(sequence_start, sequence_frame, decision, reindent=False)
+
+    def read_fusion_pass(image):
+        if split_resolution:
+            return reading_from_results(split_readtext(get_reader(), image))
+        return reading_from_results(get_reader().readtext(preprocess_frame(image, FUSION_SCALE), detail=1))
+
+    def follow_scrolling(frame, frame_num):
+        if frame_num % scroll_check_interval:
+            return
+        try:
+            sequence = stitcher.track(frame, frame_num)
+            if sequence:
+                capture_sequence(sequence)
+        except Exception as e:
+            print(f"Error following scrolling at frame {frame_num}: {str(e)}")
+
+    span = max(end_frame - start_frame, 1)
+    if control:
+        control.total_frames = end_frame - start_frame
     
-    while cap.isOpened():
+    while cap.isOpened() and frame_num < end_frame:
+        if control:
+            control.frames_done = frame_num - start_frame
+            if not control.checkpoint():
+                break
+        
         ret, frame = cap.read()
         if not ret:
             break
 
+        if stitcher:
+            follow_scrolling(frame, frame_num)
+
         if frame_num % sampling_rate == 0:
             if progress_callback:
-                progress = int((frame_num / total_frames) * 100)
+                progress = int(((frame_num - start_frame) / span) * 100)
                 progress_callback(progress)
+            # Position of the frame just read
+            frame_index.add(frame_num, cap.get(cv2.CAP_PROP_POS_MSEC))
 
-            processed = preprocess_frame(frame)
+            sample_num = frame_num
+            confidence = None
 
             try:
-                # Use EasyOCR for text extraction
-                extracted_text = reader.readtext(processed, detail=0)  # Extract text without bounding box details
-                extracted_text = "\n".join(extracted_text).strip()  # Combine lines into a single string
+                if stitcher and stitcher.scrolling:
+                    extracted_text = None  # Covered by the scroll sequence
+                elif fusion:
+                    # The frames read past the sample still go through the scroll checks
+                    extracted_text, confidence, consumed = read_fused(
+                        cap, frame, read_fusion_pass, fusion_frames, fusion_spacing,
+                        on_frame=(lambda offset, read_frame: follow_scrolling(read_frame, sample_num + offset))
+                        if stitcher else None
+                    )
+                    frame_num += consumed
+                elif line_reader:
+                    extracted_text = boxes_to_text(line_reader.read(preprocess_frame(frame))).rstrip()
+                elif split_resolution:
+                    results = split_readtext(get_reader(), frame)
+                    extracted_text = "\n".join(text for text, _ in reading_from_results(results)).strip()
+                else:
+                    # Use EasyOCR for text extraction
+                    extracted_text = get_reader().readtext(preprocess_frame(frame), detail=0)  # Extract text without bounding box details
+                    extracted_text = "\n".join(extracted_text).strip()  # Combine lines into a single string
                 
-                if extracted_text:
-                    cleaned_text = cleanup_extracted_text(extracted_text)
-                    if cleaned_text and is_code_snippet(cleaned_text):
-                        language = detect_language(cleaned_text)
-                        if language != "Unknown":
-                            formatted_code = format_code(cleaned_text, language)
-                            timestamp = get_timestamp(frame_num, fps)
-                            snippet = CodeSnippet(
-                                timestamp=timestamp,
-                                language=language,
-                                code=formatted_code,
-                                source_file=os.path.basename(video_path)
-                            )
-                            session.add(snippet)
-                            session.commit()
-                            recent_codes.append(cleaned_text)
-                            if len(recent_codes) > 5:
-                                recent_codes.pop(0)
-                            print(f"Extracted {language} code at {timestamp}")
+                # Static scenes repeat the same text; the memo decides it once
+                decision = text_memo.process(extracted_text, reindent=not line_reader) if extracted_text else None
+                if decision is not None:
+                    capture(sample_num, frame, decision, confidence, reindent=not line_reader)
             except Exception as e:
-                print(f"Error processing frame {frame_num}: {str(e)}")
+                print(f"Error processing frame {sample_num}: {str(e)}")
 
         frame_num += 1
 
+    if stitcher and not (control and control.cancelled):
+        sequence = stitcher.finish()
+        if sequence:
+            capture_sequence(sequence)
     cap.release()
+    if save_index:
+        frame_index.save(thumbnail_cache.directory)
+    if line_reader:
+        print(f"Line OCR: recognized {line_reader.lines_recognized} lines, reused {line_reader.lines_reused}")
+    if stitcher:
+        print(f"Scroll stitching: {stitcher.sequences} sequences, {stitcher.pixels_read / 1e6:.1f} Mpx read")
+    # The memo is shared by concurrent runs, so these counts are approximate then
+    hits, misses = text_memo.hits - memo_hits, text_memo.misses - memo_misses
+    if hits + misses:
+        print(f"Text stages: {hits} of {hits + misses} texts answered from the memo")
+    if control and control.cancelled:
+        return
+    if control:
+        control.frames_done = end_frame - start_frame
     if progress_callback:
         progress_callback(100)
 
+def sampling_interval(fps):
+    """Frames between two sampled frames: 1 frame every 2 seconds."""
+    return max(1, int(fps * 2))
+
+def save_capture(source_file, frame_number, timestamp, language, code, recent_snippets, reindent=True,
+                 video_key=None):
+    """Store a capture with add_snippet, linked to the recent snippet it is an edit of.
+
+    add_snippet applies the source's duplicate policy. recent_snippets holds
+    (snippet id, language, code) of the latest stored chain heads and is
+    updated in place: a snippet that gets an edit leaves it, so captures
+    are only ever linked to the current head of a chain. video_key
+    identifies the video for thumbnails (see thumbnails.video_key).
+    Returns add_snippet's result.
+    """
+    parent_id = find_edited_snippet(code, language, recent_snippets)
+    snippet = add_snippet(
+        timestamp,
+        language,
+        code,
+        source_file=source_file,
+        parent_id=parent_id,
+        frame_number=frame_number,
+        reindent=reindent,
+        video_key=video_key
+    )
+    if snippet is None:
+        return None
+    superseded = {snippet.id}
+    if snippet.parent_id is not None:
+        superseded.add(snippet.parent_id)
+    recent_snippets[:] = [entry for entry in recent_snippets if entry[0] not in superseded]
+    # A duplicate merged into an older version of a chain is no head to link to
+    if snippet.is_head:
+        recent_snippets.append((snippet.id, language, code))
+        if len(recent_snippets) > RECENT_SNIPPETS_TRACKED:
+            recent_snippets.pop(0)
+    return snippet
+
 def similarity_ratio(str1, str2):
     """Calculate similarity ratio between two strings using difflib."""
     import difflib
@@ -418,6 +456,28 @@ def is_duplicate_code(new_code, existing_code, threshold=0.85):
     similarity = similarity_ratio(new_normalized, existing_normalized)
     return similarity > threshold
 
+def find_edited_snippet(code, language, recent_snippets, threshold=EDIT_SIMILARITY_THRESHOLD):
+    """Find the recent snippet that new code is most likely an edit of.
+
+    recent_snippets holds (snippet id, language, code) tuples. Returns the ID of
+    the most similar snippet of the same language whose lines match at least
+    threshold, or None.
+    """
+    import difflib
+    
+    lines = code.splitlines()
+    best_id, best_ratio = None, threshold
+    for snippet_id, snippet_language, snippet_code in recent_snippets:
+        if snippet_language != language:
+            continue
+        matcher = difflib.SequenceMatcher(None, snippet_code.splitlines(), lines, autojunk=False)
+        if matcher.quick_ratio() < best_ratio:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= best_ratio:
+            best_id, best_ratio = snippet_id, ratio
+    return best_id
+
 def save_snippets_to_file(snippets, output_path):
     """Save extracted snippets to a JSON file."""
     with open(output_path, 'w') as f:
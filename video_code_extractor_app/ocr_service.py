@@ -0,0 +1,365 @@
+"""Long-lived OCR worker service with warm EasyOCR models.
+
+Loading the EasyOCR models takes seconds and hundreds of MB per process.
+The service loads them once and serves any number of local clients (the
+GUI, scripts, tests) over a multiprocessing manager listening on a Unix
+socket, or on localhost where Unix sockets are unavailable.
+
+Start it with:
+
+    python ocr_service.py serve
+
+Clients submit single frames or whole videos through OCRClient and get
+concurrent.futures.Future objects back. Videos are extracted inside the
+service, which stores the snippets in the shared database, so a client's
+process does no OCR work at all.
+
+The manager protocol unpickles what clients send, so only the user running
+the service may connect: the socket lives in a per-user runtime directory
+only that user can enter (see runtime_dir), and every start of the service
+writes a new random authkey to AUTHKEY_FILE in that directory, readable by
+that user only. Clients read the key from there, or from the
+OCR_SERVICE_AUTHKEY environment variable, which then replaces the file.
+"""
+import itertools
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+
+SOCKET_NAME = "ocr.sock"
+# Used where Unix sockets are unavailable; the authkey keeps other users out
+TCP_ADDRESS = ("127.0.0.1", 50713)
+# File in the runtime directory holding the running service's authkey
+AUTHKEY_FILE = "ocr_service.key"
+AUTHKEY_BYTES = 32
+# Videos extracted at the same time; more wait for a free slot
+MAX_CONCURRENT_VIDEOS = 2
+# Seconds between two status polls of a client waiting on a video
+POLL_INTERVAL = 0.2
+# Seconds a finished job's results are kept for clients that have not collected them
+FINISHED_JOB_TTL = 600
+
+def runtime_dir():
+    """Directory for the service's socket and key, created accessible to the current user only.
+
+    $XDG_RUNTIME_DIR/video_code_extractor if set, else a directory named
+    after the user ID in the temporary directory. A directory another user
+    created or opened up is refused, since it could hold a planted socket.
+    """
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        path = os.path.join(os.environ["XDG_RUNTIME_DIR"], "video_code_extractor")
+    elif hasattr(os, "getuid"):
+        path = os.path.join(tempfile.gettempdir(), f"video_code_extractor-{os.getuid()}")
+    else:
+        # Windows: the temporary directory already belongs to the user
+        path = os.path.join(tempfile.gettempdir(), "video_code_extractor")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if hasattr(os, "getuid"):
+        stat = os.lstat(path)
+        if not os.path.isdir(path) or os.path.islink(path) or stat.st_uid != os.getuid():
+            raise PermissionError(f"{path} does not belong to the current user")
+        if stat.st_mode & 0o077:
+            raise PermissionError(f"{path} is accessible to other users; remove it or chmod 700 it")
+    return path
+
+def default_address():
+    """The service's socket path, or TCP_ADDRESS where Unix sockets are unavailable."""
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(runtime_dir(), SOCKET_NAME)
+    return TCP_ADDRESS
+
+def _authkey_path():
+    return os.path.join(runtime_dir(), AUTHKEY_FILE)
+
+def create_authkey():
+    """A new random authkey, written to AUTHKEY_FILE with owner-only permissions.
+
+    Returns OCR_SERVICE_AUTHKEY instead, without writing anything, if it is set.
+    """
+    if os.environ.get("OCR_SERVICE_AUTHKEY"):
+        return os.environ["OCR_SERVICE_AUTHKEY"].encode("utf-8")
+    authkey = secrets.token_hex(AUTHKEY_BYTES).encode("ascii")
+    path = _authkey_path()
+    temporary = f"{path}.{os.getpid()}.tmp"
+    # Created with mode 0600 rather than chmodded later, so the key is never readable by others
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+    os.replace(temporary, path)
+    return authkey
+
+def read_authkey():
+    """The running service's authkey; raises FileNotFoundError if no service wrote one."""
+    if os.environ.get("OCR_SERVICE_AUTHKEY"):
+        return os.environ["OCR_SERVICE_AUTHKEY"].encode("utf-8")
+    with open(_authkey_path(), "rb") as f:
+        return f.read().strip()
+
+class OCRService:
+    """The object shared by the service; runs in the service process only"""
+    def __init__(self, max_concurrent_videos=MAX_CONCURRENT_VIDEOS):
+        from ocr_extractor import get_reader
+        self.reader = get_reader()  # Load the models before accepting work
+        self.video_slots = threading.Semaphore(max_concurrent_videos)
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def ping(self):
+        return True
+
+    def read_frame(self, frame, detail=0):
+        """OCR one preprocessed frame, like EasyOCR's readtext."""
+        results = self.reader.readtext(frame, detail=detail)
+        if detail == 0:
+            return list(results)
+        # Plain Python types, so the results pickle without NumPy on the client side
+        return [([[int(x), int(y)] for x, y in box], text, float(confidence)) for box, text, confidence in results]
+
+    def start_video(self, video_path, options=None):
+        """Queue a video for extraction and return its job ID.
+
+        options are passed on to extract_code_from_video, e.g. incremental_ocr.
+        """
+        from ocr_extractor import ExtractionControl
+
+        job = {
+            "control": ExtractionControl(),
+            "progress": 0,
+            "snippets": [],
+            "done": False,
+            "error": None,
+            "finished_at": None
+        }
+        with self.lock:
+            self._forget_finished_jobs()
+            job_id = next(self.job_ids)
+            self.jobs[job_id] = job
+        threading.Thread(target=self._run_video, args=(job, os.path.abspath(video_path), options or {}), daemon=True).start()
+        return job_id
+
+    def _run_video(self, job, video_path, options):
+        from database import session
+        from ocr_extractor import extract_code_from_video
+
+        try:
+            with self.video_slots:
+                if job["control"].checkpoint():
+                    extract_code_from_video(
+                        video_path,
+                        progress_callback=lambda value: job.update(progress=value),
+                        snippet_callback=job["snippets"].append,
+                        control=job["control"],
+                        **options
+                    )
+        except Exception as e:
+            job["error"] = str(e)
+        finally:
+            session.remove()
+            job["finished_at"] = time.monotonic()
+            job["done"] = True
+
+    def job_status(self, job_id, snippets_seen=0):
+        """Progress of a job, with the snippets stored since the first snippets_seen."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"progress": 0, "snippets": [], "done": True, "error": f"Unknown job {job_id}"}
+        status = {
+            "progress": job["progress"],
+            "frames_done": job["control"].frames_done,
+            "total_frames": job["control"].total_frames,
+            "snippets": job["snippets"][snippets_seen:],
+            "done": job["done"],
+            "error": job["error"]
+        }
+        if job["done"] and not status["snippets"]:
+            with self.lock:
+                self.jobs.pop(job_id, None)
+        return status
+
+    def cancel_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job["control"].cancel()
+
+    def pause_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job["control"].pause()
+
+    def resume_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job["control"].resume()
+
+    def _forget_finished_jobs(self):
+        """Drop finished jobs whose client never collected the results."""
+        now = time.monotonic()
+        for job_id, job in list(self.jobs.items()):
+            if job["done"] and now - job["finished_at"] > FINISHED_JOB_TTL:
+                del self.jobs[job_id]
+
+class OCRServiceManager(BaseManager):
+    pass
+
+def serve(address=None, authkey=None):
+    """Load the models and serve clients until interrupted.
+
+    By default on the socket in the runtime directory, with a new authkey.
+    """
+    address = address or default_address()
+    authkey = authkey or create_authkey()
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)  # Stale socket of a service that did not shut down cleanly
+    service = OCRService()
+    OCRServiceManager.register("get_service", callable=lambda: service)
+    manager = OCRServiceManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    print(f"OCR service listening on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
+
+class OCRClient:
+    """Connection to a running OCR service; results come back as futures"""
+    def __init__(self, address=None, authkey=None, max_pending=4):
+        OCRServiceManager.register("get_service")
+        address = address or default_address()
+        authkey = authkey or read_authkey()
+        self.address = address
+        self.authkey = authkey
+        self.manager = OCRServiceManager(address=address, authkey=authkey)
+        self.manager.connect()
+        self.executor = ThreadPoolExecutor(max_workers=max_pending)
+        self.local = threading.local()
+
+    def _service(self):
+        # Proxies must not be shared between threads, so each thread gets its own
+        service = getattr(self.local, "service", None)
+        if service is None:
+            service = self.local.service = self.manager.get_service()
+        return service
+
+    def submit_frame(self, frame, detail=0):
+        """OCR a preprocessed frame in the service; returns a Future of readtext's result."""
+        return self.executor.submit(lambda: self._service().read_frame(frame, detail))
+
+    def submit_video(self, video_path, progress_callback=None, snippet_callback=None, control=None, **options):
+        """Extract a video in the service; returns a Future that completes with the run.
+
+        The callbacks and control work as for extract_code_from_video, but
+        are driven from a client thread.
+        """
+        return self.executor.submit(
+            self.extract_video, video_path, progress_callback, snippet_callback, control, **options
+        )
+
+    def extract_video(self, video_path, progress_callback=None, snippet_callback=None, control=None, **options):
+        """Blocking counterpart of submit_video, with extract_code_from_video's signature."""
+        service = self._service()
+        job_id = service.start_video(os.path.abspath(video_path), options)
+        snippets_seen = 0
+        paused = False
+        last_progress = None
+        while True:
+            if control is not None:
+                if control.cancelled:
+                    service.cancel_job(job_id)
+                elif control.paused != paused:
+                    paused = control.paused
+                    if paused:
+                        service.pause_job(job_id)
+                    else:
+                        service.resume_job(job_id)
+
+            status = service.job_status(job_id, snippets_seen)
+            snippets_seen += len(status["snippets"])
+            if control is not None and "total_frames" in status:
+                # Mirrored so the caller can show throughput as for local runs
+                control.frames_done = status["frames_done"]
+                control.total_frames = status["total_frames"]
+            if snippet_callback:
+                for snippet in status["snippets"]:
+                    snippet_callback(snippet)
+            if progress_callback and status["progress"] != last_progress:
+                last_progress = status["progress"]
+                progress_callback(last_progress)
+            if status["done"]:
+                if status["error"]:
+                    raise RuntimeError(status["error"])
+                return
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def connect(address=None, authkey=None, start=False, timeout=120):
+    """Connect to the OCR service, optionally starting it if it is not running.
+
+    Returns an OCRClient, or None if no service is running and start is False.
+    Starting includes loading the models, hence the generous timeout.
+    """
+    try:
+        return OCRClient(address, authkey)
+    except (OSError, EOFError):
+        if not start:
+            return None
+
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve"],
+        cwd=os.getcwd(),  # The service opens the same database file
+        start_new_session=True
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        try:
+            return OCRClient(address, authkey)
+        except (OSError, EOFError):
+            continue
+    raise TimeoutError("The OCR service did not start in time")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OCR worker service with warm models")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("serve", help="Run the service in the foreground")
+    extract_parser = subparsers.add_parser("extract", help="Extract videos through the running service")
+    extract_parser.add_argument("videos", nargs="+")
+    extract_parser.add_argument("--line-ocr", action="store_true", help="Only recognize lines that changed between frames")
+    extract_parser.add_argument("--fusion", action="store_true", help="Fuse several native-resolution frames per sample")
+    extract_parser.add_argument("--split-resolution", action="store_true",
+                                help="Detect text on a downscaled frame, recognize full-resolution crops")
+    extract_parser.add_argument("--scroll-stitch", action="store_true",
+                                help="Read only newly revealed rows while scrolling, one snippet per scroll")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve()
+    else:
+        client = connect(start=True)
+        futures = [
+            client.submit_video(
+                video,
+                progress_callback=lambda value, video=video: print(f"{video}: {value}%"),
+                snippet_callback=lambda snippet, video=video: print(f"{video}: {snippet['language']} at {snippet['timestamp']}"),
+                incremental_ocr=args.line_ocr,
+                fusion=args.fusion,
+                split_resolution=args.split_resolution,
+                scroll_stitch=args.scroll_stitch
+            )
+            for video in args.videos
+        ]
+        for future in futures:
+            future.result()
+        client.close()
@@ -0,0 +1,200 @@
+"""Scroll detection and stitching of scrolling editor captures into one file.
+
+While an instructor scrolls through a long file, every sampled frame shows
+a shifted window of the same text; read one by one they become dozens of
+overlapping snippets, and most of every frame is read again. ScrollStitcher
+follows the code region between frames instead: the vertical displacement
+of two consecutive checked frames is estimated by phase correlation on
+downscaled grayscale copies, and accumulated into the view's offset in the
+file. Only the rows the view has not shown before are cut from the frame
+and OCR'd (see split_ocr); their text boxes are placed at their position in
+the file, and when the scroll sequence ends all boxes are joined into one
+text (see line_ocr.boxes_to_text).
+
+A sequence starts when the view moves vertically and ends when it stays
+still for SETTLE_SECONDS, or when the frames stop matching as shifted
+copies of each other (another scene, an edit, a horizontal scroll).
+Text edited during a sequence keeps the reading taken when it first came
+into view.
+"""
+import cv2
+import numpy as np
+
+from line_ocr import TextBox, boxes_to_text
+from split_ocr import MARGIN, detect_boxes, recognize_boxes
+
+# Width of the grayscale copies the displacement is estimated on
+ANALYSIS_WIDTH = 960
+# Seconds between two checked frames; scrolling must not move the view by
+# more than about half its height in that time
+CHECK_SECONDS = 0.2
+# Vertical displacement in pixels (of the frame) that counts as scrolling
+MIN_SCROLL_PIXELS = 2.0
+# Horizontal displacement above which frames are not a vertical scroll
+MAX_HORIZONTAL_PIXELS = 2.0
+# Phase correlation peak below which the frames are not shifted copies
+MIN_RESPONSE = 0.1
+# Mean absolute grayscale difference of the overlapping rows above which frames differ
+OVERLAP_DIFFERENCE = 6.0
+# Seconds without movement that end a scroll sequence
+SETTLE_SECONDS = 1.0
+# Line height assumed until the first reading shows the real one
+DEFAULT_LINE_HEIGHT = 32
+# Unread share of the view that triggers reading a strip while the view keeps moving;
+# larger strips read fewer context lines twice
+READ_MIN_FRACTION = 0.3
+# Fraction of a line height at the view's top and bottom where lines may be cut off
+EDGE_LINES = 0.75
+
+def code_region(frame):
+    """Grayscale code region of a frame, with the margins split_ocr cuts off."""
+    height, width = frame.shape[:2]
+    margin_x, margin_y = int(width * MARGIN), int(height * MARGIN)
+    region = frame[margin_y:height - margin_y, margin_x:width - margin_x]
+    return cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+
+def _shift_difference(previous, current, dy):
+    """Mean absolute difference of the rows previous and current share when current is previous moved by dy rows."""
+    shift = int(round(dy))
+    height = previous.shape[0]
+    if abs(shift) >= height:
+        return float("inf")
+    if shift >= 0:
+        return float(np.mean(np.abs(previous[:height - shift] - current[shift:])))
+    return float(np.mean(np.abs(previous[-shift:] - current[:height + shift])))
+
+class ScrollStitcher:
+    """Follows scroll sequences in a series of frames and stitches each into one text
+
+    Call track() with frames CHECK_SECONDS apart (check_interval frames);
+    it returns a finished sequence as (text, frame number of its first
+    frame, that frame), and None otherwise. While scrolling is True the
+    frames are covered by the current sequence. Call finish() at the end of
+    the video.
+    """
+    def __init__(self, reader, fps, check_interval):
+        self.reader = reader
+        self.settle_checks = max(1, round(SETTLE_SECONDS * fps / check_interval))
+        self.previous = None  # (code region, analysis copy, frame, frame number) of the last checked frame
+        self.window = None  # Hanning window against the frame edges' influence on the correlation
+        self.scrolling = False
+        self.sequences = 0
+        self.pixels_read = 0
+        self._reset_sequence()
+
+    def _reset_sequence(self):
+        self.boxes = []  # (x_min, x_max, y_min, y_max, text, confidence) in rows of the file
+        self.offset = 0.0  # Row of the file shown at the top of the view
+        self.seen_top = self.seen_bottom = None  # Rows of the file read so far
+        self.line_height = DEFAULT_LINE_HEIGHT
+        self.still_checks = 0
+        self.direction = None  # Whether content last moved down (the view up the file)
+        self.start = None  # (frame number, frame) the sequence started at
+
+    def _analysis_copy(self, region):
+        scale = min(1.0, ANALYSIS_WIDTH / region.shape[1])
+        if scale < 1.0:
+            region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return region.astype(np.float32), scale
+
+    def _displacement(self, previous, current, scale):
+        """(vertical displacement in frame pixels, whether current is previous shifted vertically)."""
+        if previous.shape != current.shape:
+            return 0.0, False
+        if self.window is None or self.window.shape != current.shape:
+            self.window = cv2.createHanningWindow((current.shape[1], current.shape[0]), cv2.CV_32F)
+        # phaseCorrelate applies the window to its inputs in place
+        (dx, dy), response = cv2.phaseCorrelate(previous.copy(), current.copy(), self.window)
+        if abs(dx) / scale > MAX_HORIZONTAL_PIXELS or (response < MIN_RESPONSE and abs(dy) / scale >= MIN_SCROLL_PIXELS):
+            return 0.0, False
+        # Compared at the measured shift; a drift below MIN_SCROLL_PIXELS still leaves the rows misaligned
+        shifted = _shift_difference(previous, current, dy) <= OVERLAP_DIFFERENCE
+        if abs(dy) / scale < MIN_SCROLL_PIXELS:
+            dy = 0.0
+        return dy / scale, shifted
+
+    def track(self, frame, frame_number):
+        """Follow the view to frame; returns a finished sequence or None."""
+        region = code_region(frame)
+        small, scale = self._analysis_copy(region)
+        previous = self.previous
+        self.previous = (region, small, frame, frame_number)
+        if previous is None:
+            return None
+        dy, shifted = self._displacement(previous[1], small, scale)
+
+        if not self.scrolling:
+            if shifted and dy:
+                # The frame before the movement holds the start of the sequence
+                self.scrolling = True
+                self.start = (previous[3], previous[2])
+                self._read(previous[0])
+                self.offset -= dy  # Content moving up means the view moved down the file
+                self.direction = dy > 0
+                self._read(region, READ_MIN_FRACTION)
+            return None
+
+        if not shifted:
+            # Not a continuation of the scroll; the new frame belongs to whatever comes next
+            return self._end_sequence(previous[0])
+        if dy:
+            if (dy > 0) != self.direction:
+                # Rows not read yet at the leading edge would leave the view on the way back
+                self.direction = dy > 0
+                self._read(previous[0])
+            self.offset -= dy
+            self.still_checks = 0
+            self._read(region, READ_MIN_FRACTION)
+            return None
+        self.still_checks += 1
+        if self.still_checks >= self.settle_checks:
+            return self._end_sequence(region)
+        return None
+
+    def finish(self):
+        """End the current sequence at the end of the video; returns it or None."""
+        return self._end_sequence(self.previous[0]) if self.scrolling else None
+
+    def _end_sequence(self, last_region):
+        """Read what the sequence's last frame still adds and stitch all lines into one text."""
+        self._read(last_region)
+        # TextBox needs non-negative coordinates; the view may have moved above its start
+        top = min((box[2] for box in self.boxes), default=0)
+        text = boxes_to_text([
+            TextBox(x_min, x_max, y_min - top, y_max - top, text, confidence)
+            for x_min, x_max, y_min, y_max, text, confidence in self.boxes
+        ])
+        start_frame_number, start_frame = self.start
+        self.scrolling = False
+        self.sequences += 1
+        self._reset_sequence()
+        return text, start_frame_number, start_frame
+
+    def _read(self, region, min_fraction=0.0):
+        """OCR the rows of region the sequence has not read yet, if at least min_fraction of its height."""
+        height = region.shape[0]
+        edge = self.line_height * EDGE_LINES
+        view_top, view_bottom = self.offset + edge, self.offset + height - edge
+        if self.seen_top is None:
+            ranges = [(view_top, view_bottom)]
+        else:
+            ranges = [(max(view_top, self.seen_bottom), view_bottom), (view_top, min(view_bottom, self.seen_top))]
+        for top, bottom in ranges:
+            if bottom - top <= 0 or bottom - top < min_fraction * height:
+                continue
+            # A line of context on each side, so lines crossing the range's ends are read whole
+            strip_top = max(int(top - self.offset - self.line_height), 0)
+            strip_bottom = min(int(np.ceil(bottom - self.offset + self.line_height)), height)
+            strip = region[strip_top:strip_bottom]
+            self.pixels_read += strip.size
+            for points, text, confidence in recognize_boxes(self.reader, strip, detect_boxes(self.reader, strip)):
+                x_min, y_min = points[0]
+                x_max, y_max = points[2]
+                y_min, y_max = y_min + strip_top + self.offset, y_max + strip_top + self.offset
+                # Lines centred outside the range were read before or are cut off at the view's edge
+                if top <= (y_min + y_max) / 2 < bottom and text:
+                    self.boxes.append((x_min, x_max, y_min, y_max, text, confidence))
+            self.seen_top = top if self.seen_top is None else min(self.seen_top, top)
+            self.seen_bottom = bottom if self.seen_bottom is None else max(self.seen_bottom, bottom)
+            if self.boxes:
+                self.line_height = float(np.median([box[3] - box[2] for box in self.boxes]))
@@ -0,0 +1,316 @@
+"""Time-sharded extraction of one long video over several processes or machines.
+
+The video is split into frame ranges (shards) aligned to the sampling grid,
+so every sampled frame belongs to exactly one shard and the shards together
+sample the same frames as a single run. Each shard is a JSON file in a work
+queue directory:
+
+    QUEUE_DIR/pending/<job>_<shard>.json   waiting for a worker
+    QUEUE_DIR/claimed/<job>_<shard>.json   being processed
+    QUEUE_DIR/results/<job>_<shard>.json   captures of a finished shard
+
+Workers claim a shard by renaming it from pending/ to claimed/, which is
+atomic, so two workers never take the same shard. Workers on other
+machines only need the queue directory and the video on a shared file
+system at the same path:
+
+    python sharded_extraction.py worker --queue /shared/shard_queue
+
+Workers seek their own decoder to the shard start and do not touch the
+database; they write their captures to results/. While a shard is being
+processed, a thread of its worker touches the claim file every
+HEARTBEAT_INTERVAL seconds, however long a single frame takes. The
+coordinator then
+replays all captures in frame order through save_capture, exactly as a
+single run would store them, so captures of the same code on both sides
+of a shard boundary are merged or linked as edits by the source's
+duplicate policy and the edit detection. Claims whose worker stopped
+updating them for CLAIM_TIMEOUT seconds are put back into pending/.
+
+    python sharded_extraction.py run VIDEO [--shards N] [--workers N]
+"""
+import glob
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+QUEUE_DIR = os.environ.get("SHARD_QUEUE_DIR", "shard_queue")
+# Seconds without a heartbeat after which a claimed shard is handed to another worker
+CLAIM_TIMEOUT = 300
+# Seconds between two heartbeats of a worker on the shard it claimed
+HEARTBEAT_INTERVAL = CLAIM_TIMEOUT / 10
+# Seconds between two checks of the queue by the coordinator and idle workers
+POLL_INTERVAL = 1.0
+
+def _queue_dirs(queue_dir):
+    dirs = {name: os.path.join(queue_dir, name) for name in ("pending", "claimed", "results")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    return dirs
+
+def _write_json(path, data):
+    # Write under a temporary name so other processes never see a partial file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+def plan_shards(total_frames, sampling_rate, shards):
+    """(start frame, end frame) of up to shards ranges, starting on sampled frames."""
+    samples = max(1, -(-total_frames // sampling_rate))
+    shards = max(1, min(shards, samples))
+    bounds = [round(samples * index / shards) * sampling_rate for index in range(shards)] + [total_frames]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def enqueue_video(video_path, shards, queue_dir=QUEUE_DIR, options=None):
+    """Split a video into shards and queue them; returns (job ID, number of shards)."""
+    import cv2
+    from ocr_extractor import sampling_interval
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video file.")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    dirs = _queue_dirs(queue_dir)
+    job_id = uuid.uuid4().hex[:12]
+    ranges = plan_shards(total_frames, sampling_interval(fps), shards)
+    for index, (start_frame, end_frame) in enumerate(ranges):
+        _write_json(os.path.join(dirs["pending"], f"{job_id}_{index:04d}.json"), {
+            "job": job_id,
+            "index": index,
+            "video_path": os.path.abspath(video_path),
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "options": options or {}
+        })
+    return job_id, len(ranges)
+
+def claim_shard(queue_dir=QUEUE_DIR, job_id=None):
+    """Claim the next pending shard (of job_id only, if given); returns (claim path, shard) or None."""
+    dirs = _queue_dirs(queue_dir)
+    for name in sorted(os.listdir(dirs["pending"])):
+        if not name.endswith(".json") or (job_id and not name.startswith(job_id + "_")):
+            continue
+        claimed = os.path.join(dirs["claimed"], name)
+        try:
+            os.rename(os.path.join(dirs["pending"], name), claimed)
+        except FileNotFoundError:
+            continue  # Another worker was faster
+        os.utime(claimed)  # Renaming keeps the mtime of the pending file, which is the heartbeat
+        with open(claimed) as f:
+            return claimed, json.load(f)
+    return None
+
+def _touch_claim(claim_path):
+    try:
+        os.utime(claim_path)
+    except FileNotFoundError:
+        pass  # Requeued after a stall; the result is still valid
+
+def _heartbeat(claim_path, stop, interval):
+    while not stop.wait(interval):
+        _touch_claim(claim_path)
+
+def process_shard(claim_path, shard, queue_dir=QUEUE_DIR, heartbeat_interval=HEARTBEAT_INTERVAL):
+    """Extract a claimed shard and write its captures to results/."""
+    from ocr_extractor import extract_code_from_video
+    from thumbnails import FrameIndex
+
+    captures = []
+    frame_index = FrameIndex(shard["video_path"])
+    result = {"job": shard["job"], "index": shard["index"], "error": None}
+    # A thread of its own, so a slow frame or a stalled decoder never makes the claim look abandoned
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(claim_path, stop_heartbeat, heartbeat_interval),
+                                 daemon=True)
+    heartbeat.start()
+    try:
+        extract_code_from_video(
+            shard["video_path"],
+            start_frame=shard["start_frame"],
+            end_frame=shard["end_frame"],
+            store=captures.append,
+            frame_index=frame_index,
+            **shard["options"]
+        )
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        stop_heartbeat.set()
+        heartbeat.join()
+    result.update(
+        captures=captures,
+        frame_numbers=frame_index.frame_numbers,
+        positions_msec=frame_index.positions_msec
+    )
+    dirs = _queue_dirs(queue_dir)
+    _write_json(os.path.join(dirs["results"], os.path.basename(claim_path)), result)
+    try:
+        os.remove(claim_path)
+    except FileNotFoundError:
+        pass
+
+def run_worker(queue_dir=QUEUE_DIR, job_id=None, exit_when_idle=True):
+    """Process shards until the queue is empty, or forever unless exit_when_idle."""
+    while True:
+        claimed = claim_shard(queue_dir, job_id)
+        if claimed is None:
+            if exit_when_idle:
+                return
+            time.sleep(POLL_INTERVAL)
+            continue
+        process_shard(*claimed, queue_dir=queue_dir)
+
+def requeue_stale_claims(queue_dir=QUEUE_DIR, timeout=CLAIM_TIMEOUT):
+    """Move claims without a recent heartbeat back to pending/; returns how many were moved."""
+    dirs = _queue_dirs(queue_dir)
+    moved = 0
+    now = time.time()
+    for path in glob.glob(os.path.join(dirs["claimed"], "*.json")):
+        try:
+            if now - os.path.getmtime(path) > timeout:
+                os.rename(path, os.path.join(dirs["pending"], os.path.basename(path)))
+                moved += 1
+        except FileNotFoundError:
+            continue
+    return moved
+
+def merge_results(video_path, job_id, queue_dir=QUEUE_DIR, snippet_callback=None):
+    """Store the captures of all shards of a job in frame order; returns the number of new snippets.
+
+    The shards' frame indexes are combined into the video's index, and the
+    job's result files are removed.
+    """
+    from ocr_extractor import save_capture
+    from thumbnails import FrameIndex, get_thumbnail_cache, video_key
+
+    dirs = _queue_dirs(queue_dir)
+    paths = sorted(glob.glob(os.path.join(dirs["results"], f"{job_id}_*.json")))
+    results = []
+    for path in paths:
+        with open(path) as f:
+            results.append(json.load(f))
+    errors = [f"shard {result['index']}: {result['error']}" for result in results if result["error"]]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+    captures = sorted(
+        (capture for result in results for capture in result["captures"]),
+        key=lambda capture: capture["frame_number"]
+    )
+    source_file = os.path.basename(video_path)
+    key = video_key(video_path)
+    recent_snippets = []
+    new_snippets = 0
+    for capture in captures:
+        snippet = save_capture(source_file, capture["frame_number"], capture["timestamp"],
+                               capture["language"], capture["code"], recent_snippets,
+                               capture.get("reindent", True), key)
+        if snippet is not None and snippet.occurrences == 1:
+            new_snippets += 1
+            if snippet_callback:
+                snippet_callback(snippet.to_summary())
+
+    frame_index = FrameIndex(video_path)
+    for result in sorted(results, key=lambda result: result["index"]):
+        for frame_number, position_msec in zip(result["frame_numbers"], result["positions_msec"]):
+            frame_index.add(frame_number, position_msec)
+    frame_index.save(get_thumbnail_cache().directory)
+
+    for path in paths:
+        os.remove(path)
+    return new_snippets
+
+def _remove_job_files(directory, job_id):
+    for path in glob.glob(os.path.join(directory, f"{job_id}_*.json")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def extract_sharded(video_path, shards=None, workers=None, queue_dir=QUEUE_DIR, progress_callback=None,
+                    snippet_callback=None, control=None, **options):
+    """Extract a video in shards processed in parallel, then merge the results.
+
+    workers local worker processes are started (one per shard by default,
+    at most one per CPU); with workers=0 the shards are left to workers on
+    other machines. options are passed on to extract_code_from_video.
+    progress_callback receives the percentage of finished shards. Returns
+    the number of new snippets, or None if control cancelled the run.
+    """
+    cpus = os.cpu_count() or 1
+    shards = shards or cpus
+    workers = min(shards, cpus) if workers is None else workers
+    job_id, shard_count = enqueue_video(video_path, shards, queue_dir, options)
+    dirs = _queue_dirs(queue_dir)
+
+    # Spawned, so workers do not inherit the database connections of this process
+    context = multiprocessing.get_context("spawn")
+    processes = []
+
+    def start_workers():
+        for _ in range(workers - sum(1 for process in processes if process.is_alive())):
+            process = context.Process(target=run_worker, args=(queue_dir, job_id), daemon=True)
+            process.start()
+            processes.append(process)
+
+    start_workers()
+    last_progress = None
+    try:
+        while True:
+            if control is not None and not control.checkpoint():
+                _remove_job_files(dirs["pending"], job_id)
+                for process in processes:
+                    process.terminate()
+                _remove_job_files(dirs["claimed"], job_id)
+                _remove_job_files(dirs["results"], job_id)
+                return None
+
+            done = len(glob.glob(os.path.join(dirs["results"], f"{job_id}_*.json")))
+            if progress_callback and done != last_progress:
+                last_progress = done
+                progress_callback(int(done / shard_count * 100))
+            if done == shard_count:
+                break
+            if requeue_stale_claims(queue_dir) or (
+                workers and glob.glob(os.path.join(dirs["pending"], f"{job_id}_*.json"))
+            ):
+                start_workers()  # Replaces local workers that exited or died
+            time.sleep(POLL_INTERVAL)
+    finally:
+        for process in processes:
+            process.join(timeout=1)
+
+    # A shard requeued after a stall may be pending again although its first worker finished it
+    _remove_job_files(dirs["pending"], job_id)
+    return merge_results(video_path, job_id, queue_dir, snippet_callback)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract a long video in parallel time shards")
+    parser.add_argument("--queue", default=QUEUE_DIR, help="Work queue directory, shared between machines")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Shard a video, process it and merge the results")
+    run_parser.add_argument("video")
+    run_parser.add_argument("--shards", type=int, help="Number of shards (default: CPU count)")
+    run_parser.add_argument("--workers", type=int, help="Local worker processes; 0 leaves the shards to other machines")
+    worker_parser = subparsers.add_parser("worker", help="Process queued shards")
+    worker_parser.add_argument("--forever", action="store_true", help="Keep waiting for shards when the queue is empty")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        start = time.monotonic()
+        count = extract_sharded(
+            args.video, args.shards, args.workers, args.queue,
+            progress_callback=lambda value: print(f"{value}% of shards done")
+        )
+        print(f"Stored {count} new snippets in {time.monotonic() - start:.1f}s")
+    else:
+        run_worker(args.queue, exit_when_idle=not args.forever)
@@ -0,0 +1,106 @@
+"""Split-resolution OCR: detection on a downscaled frame, recognition on full-resolution crops.
+
+EasyOCR's detection network costs grow with the number of pixels, so on
+1440p and 4K screencasts running it on the 2x upscaled frame dominates.
+Here text is detected on a copy of the frame scaled down to at most
+DETECTION_MAX_SIDE pixels, the boxes are mapped back to the frame, and only
+the boxes are cut from the full-resolution frame. Each crop is scaled to
+the recognizer's line height and preprocessed on its own; all crops are
+stacked into one strip so they are recognized in a single batched call.
+The per-frame cost thus depends on the amount of text, not on the
+resolution.
+"""
+import cv2
+import numpy as np
+
+# Longest side of the image text detection runs on
+DETECTION_MAX_SIDE = 1600
+# Height crops are scaled to, the height EasyOCR's recognizer works at
+LINE_HEIGHT = 64
+# Empty rows between two crops in the recognition strip
+CROP_GAP = 16
+# Fraction of the frame cut off at each side, as in preprocess_frame
+MARGIN = 0.1
+
+def detection_image(gray, max_side=DETECTION_MAX_SIDE):
+    """(image, scale) with gray scaled down so its longest side is at most max_side."""
+    scale = min(1.0, max_side / max(gray.shape))
+    if scale == 1.0:
+        return gray, scale
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+
+def preprocess_crop(crop):
+    """Scale a grayscale line crop to LINE_HEIGHT and sharpen, equalize and binarize it."""
+    scale = LINE_HEIGHT / crop.shape[0]
+    interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+    scaled = cv2.resize(crop, (max(1, round(crop.shape[1] * scale)), LINE_HEIGHT), interpolation=interpolation)
+    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+    sharpened = cv2.filter2D(scaled, -1, kernel)
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(2, 8))
+    enhanced = clahe.apply(sharpened)
+    return cv2.adaptiveThreshold(enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+
+def detect_boxes(reader, gray, max_side=DETECTION_MAX_SIDE):
+    """Text boxes (x_min, x_max, y_min, y_max) in gray's coordinates, detected on a downscaled copy."""
+    small, scale = detection_image(gray, max_side)
+    horizontal_list, free_list = reader.detect(small)
+    boxes = [tuple(box) for box in horizontal_list[0]]
+    # Slanted boxes are recognized through their bounding rectangle
+    for points in free_list[0]:
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        boxes.append((min(xs), max(xs), min(ys), max(ys)))
+
+    height, width = gray.shape
+    mapped = []
+    for x_min, x_max, y_min, y_max in boxes:
+        # Detection boxes are tight at low resolution; pad by a fraction of the line height
+        pad = max(2, int((y_max - y_min) / scale * 0.1))
+        box = (
+            max(int(x_min / scale) - pad, 0), min(int(np.ceil(x_max / scale)) + pad, width),
+            max(int(y_min / scale) - pad, 0), min(int(np.ceil(y_max / scale)) + pad, height),
+        )
+        if box[1] > box[0] and box[3] > box[2]:
+            mapped.append(box)
+    return mapped
+
+def recognize_boxes(reader, gray, boxes):
+    """readtext(detail=1)-style results for boxes cut from gray, recognized in one call."""
+    if not boxes:
+        return []
+    crops = [preprocess_crop(gray[y_min:y_max, x_min:x_max]) for x_min, x_max, y_min, y_max in boxes]
+    strip = np.full(
+        (len(crops) * (LINE_HEIGHT + CROP_GAP), max(crop.shape[1] for crop in crops)), 255, dtype=np.uint8
+    )
+    positions = {}  # Top of a crop in the strip -> its box
+    strip_boxes = []
+    for index, (crop, box) in enumerate(zip(crops, boxes)):
+        top = index * (LINE_HEIGHT + CROP_GAP)
+        strip[top:top + LINE_HEIGHT, :crop.shape[1]] = crop
+        positions[top] = box
+        strip_boxes.append([0, crop.shape[1], top, top + LINE_HEIGHT])
+
+    results = []
+    for points, text, confidence in reader.recognize(strip, horizontal_list=strip_boxes, free_list=[], detail=1):
+        box = positions.get(int(points[0][1]))
+        if box is None:
+            continue
+        x_min, x_max, y_min, y_max = box
+        results.append(([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]], text, float(confidence)))
+    return results
+
+def split_readtext(reader, frame, max_side=DETECTION_MAX_SIDE):
+    """OCR of a BGR or grayscale frame's code region, like reader.readtext(detail=1).
+
+    Boxes are in the coordinates of the frame.
+    """
+    height, width = frame.shape[:2]
+    margin_x, margin_y = int(width * MARGIN), int(height * MARGIN)
+    region = frame[margin_y:height - margin_y, margin_x:width - margin_x]
+    if region.ndim == 3:
+        region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+    results = recognize_boxes(reader, region, detect_boxes(reader, region, max_side))
+    return [
+        ([[x + margin_x, y + margin_y] for x, y in points], text, confidence)
+        for points, text, confidence in results
+    ]
@@ -0,0 +1,257 @@
+"""Temporal fusion of OCR readings of a stable scene.
+
+A single OCR pass is only reliable on a 2x upscaled frame, which costs
+about four times the pixels of the native frame. Instead, several frames a
+moment apart are read at native resolution and their readings are merged:
+lines are matched across readings, the characters of each matched line
+are aligned with the line of the best reading, and every character
+position (and every gap between positions) is decided by a vote weighted
+by the readings' confidences. Misreads that differ from frame to frame are
+outvoted by the frames that read the character correctly.
+
+    python temporal_fusion.py benchmark CORPUS_DIR
+
+benchmarks fusion against the single upscaled pass on a corpus of short
+clips of static code, each NAME.mp4 (or .avi, .mkv, .mov) next to a NAME.txt
+with the code it shows.
+"""
+import difflib
+
+import cv2
+import numpy as np
+
+from line_ocr import TextBox, group_lines
+
+# Frames read and fused per sample
+FUSION_FRAMES = 3
+# Seconds between two fused frames
+FUSION_SPACING_SECONDS = 0.2
+# preprocess_frame scale of the fused passes; the single pass uses 2x
+FUSION_SCALE = 1.0
+# Mean absolute grayscale difference of two frames' thumbnails above which the scene changed
+SCENE_CHANGE_THRESHOLD = 8.0
+# Minimum similarity for a line to be fused with a line of the reference reading
+LINE_MATCH_THRESHOLD = 0.5
+# Lines after the last matched one searched for a line's counterpart
+LINE_MATCH_WINDOW = 3
+
+def reading_from_results(results):
+    """Lines of readtext(detail=1) results as (text, confidence) pairs, top to bottom."""
+    boxes = []
+    for points, text, confidence in results:
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        boxes.append(TextBox(min(xs), max(xs), min(ys), max(ys), text, float(confidence)))
+    reading = []
+    for line in group_lines(boxes):
+        text = " ".join(box.text for box in line)
+        characters = sum(len(box.text) for box in line)
+        confidence = sum(box.confidence * len(box.text) for box in line) / max(characters, 1)
+        reading.append((text, confidence))
+    return reading
+
+def scene_signature(frame):
+    """Small grayscale thumbnail of a frame for detecting scene changes."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def fuse_lines(candidates):
+    """Fuse (text, confidence) readings of one line into (text, fused confidence).
+
+    Every other reading is aligned with the most confident one. Each
+    character position of the reference, and each gap before a position,
+    gets the text with the highest summed confidence among the readings.
+    The fused confidence is the mean winning weight per position divided by
+    the number of readings, so unanimous readings keep their confidence and
+    disagreement lowers it.
+    """
+    reference, _ = max(candidates, key=lambda candidate: candidate[1])
+    positions = [{} for _ in reference]  # Position -> {text: weight}, "" for a dropped character
+    gaps = [{} for _ in range(len(reference) + 1)]  # Gap before a position -> {inserted text: weight}
+    total = 0.0
+
+    for text, confidence in candidates:
+        weight = max(confidence, 0.01)
+        total += weight
+        matcher = difflib.SequenceMatcher(None, reference, text, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal" or (tag == "replace" and i2 - i1 == j2 - j1):
+                for offset in range(i2 - i1):
+                    _vote(positions[i1 + offset], text[j1 + offset], weight)
+            elif tag == "replace":
+                _vote(positions[i1], text[j1:j2], weight)
+                for position in range(i1 + 1, i2):
+                    _vote(positions[position], "", weight)
+            elif tag == "delete":
+                for position in range(i1, i2):
+                    _vote(positions[position], "", weight)
+            else:  # insert
+                _vote(gaps[i1], text[j1:j2], weight)
+
+    parts = []
+    winning_weight = 0.0
+    for position in range(len(reference) + 1):
+        gap = gaps[position]
+        if gap:
+            inserted, weight = max(gap.items(), key=lambda item: item[1])
+            # Readings without an insertion here vote for nothing
+            if weight > total - sum(gap.values()):
+                parts.append(inserted)
+        if position < len(reference):
+            text, weight = max(positions[position].items(), key=lambda item: item[1])
+            parts.append(text)
+            winning_weight += weight
+    confidence = winning_weight / (max(len(reference), 1) * len(candidates)) if reference else 0.0
+    return "".join(parts), confidence
+
+def _vote(votes, text, weight):
+    votes[text] = votes.get(text, 0.0) + weight
+
+def _similarity(a, b):
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.ratio() if matcher.quick_ratio() >= LINE_MATCH_THRESHOLD else 0.0
+
+def fuse_readings(readings):
+    """Fuse readings (lists of (text, confidence) lines) of the same scene.
+
+    The reading with the most lines, then the highest mean confidence, is
+    the reference; lines of other readings are matched to its lines in
+    order, and unmatched lines are dropped as noise. Returns a list of
+    (text, fused confidence) lines.
+    """
+    readings = [reading for reading in readings if reading]
+    if not readings:
+        return []
+    reference = max(readings, key=lambda reading: (len(reading), sum(c for _, c in reading) / len(reading)))
+    candidates = [[line] for line in reference]
+    for reading in readings:
+        if reading is reference:
+            continue
+        next_line = 0
+        for text, confidence in reading:
+            window = range(next_line, min(next_line + LINE_MATCH_WINDOW, len(reference)))
+            scores = [(_similarity(reference[index][0], text), index) for index in window]
+            score, index = max(scores, default=(0.0, None))
+            if index is not None and score >= LINE_MATCH_THRESHOLD:
+                candidates[index].append((text, confidence))
+                next_line = index + 1
+    return [fuse_lines(line_candidates) for line_candidates in candidates]
+
+class TemporalFusion:
+    """Collects the readings of one stable scene and fuses them
+
+    Frames that differ too much from the scene's first frame show something
+    else; check them with same_scene before reading them.
+    """
+    def __init__(self, scene_change_threshold=SCENE_CHANGE_THRESHOLD):
+        self.scene_change_threshold = scene_change_threshold
+        self.signature = None
+        self.readings = []
+
+    def start(self, frame, reading):
+        """Begin a new scene with its first frame's reading."""
+        self.signature = scene_signature(frame)
+        self.readings = [reading]
+
+    def same_scene(self, frame):
+        """Whether frame still shows the scene, judged against the scene's first frame."""
+        if self.signature is None:
+            return True
+        difference = float(np.mean(np.abs(scene_signature(frame) - self.signature)))
+        return difference <= self.scene_change_threshold
+
+    def add(self, reading):
+        self.readings.append(reading)
+
+    def result(self):
+        """(fused text, fused confidence) of the scene's readings."""
+        lines = fuse_readings(self.readings)
+        text = "\n".join(text for text, _ in lines if text.strip())
+        characters = sum(len(text) for text, _ in lines)
+        confidence = sum(c * len(text) for text, c in lines) / characters if characters else 0.0
+        return text, confidence
+
+def read_fused(cap, frame, read, frames=FUSION_FRAMES, spacing=1, on_frame=None):
+    """Read frame and the next frames - 1 frames every spacing frames of cap, and fuse them.
+
+    read(frame) returns a frame's reading. on_frame(offset, frame) is called
+    for every frame taken from cap, fused or not, with its offset from frame,
+    so the caller sees each frame as if it had read them itself. Returns
+    (text, confidence, frames consumed from cap).
+    """
+    fusion = TemporalFusion()
+    fusion.start(frame, read(frame))
+    consumed = 0
+    for _ in range(frames - 1):
+        next_frame = None
+        for _ in range(spacing):
+            ret, next_frame = cap.read()
+            if not ret:
+                next_frame = None
+                break
+            consumed += 1
+            if on_frame:
+                on_frame(consumed, next_frame)
+        if next_frame is None or not fusion.same_scene(next_frame):
+            break
+        fusion.add(read(next_frame))
+    text, confidence = fusion.result()
+    return text, confidence, consumed
+
+def character_accuracy(text, truth):
+    """Similarity of OCR text to the true text, ignoring whitespace differences."""
+    return difflib.SequenceMatcher(None, " ".join(text.split()), " ".join(truth.split()), autojunk=False).ratio()
+
+def benchmark(corpus_dir):
+    """Print accuracy and pixel volume of the single upscaled pass and of fusion per clip."""
+    import os
+    from ocr_extractor import get_reader, preprocess_frame
+
+    reader = get_reader()
+    totals = {"single": [0.0, 0], "fused": [0.0, 0]}  # method -> [accuracy sum, pixels]
+    scored = 0
+    clips = sorted(name for name in os.listdir(corpus_dir) if name.lower().endswith((".mp4", ".avi", ".mkv", ".mov")))
+    print(f"{'clip':30}{'single':>10}{'fused':>10}{'confidence':>12}")
+    for name in clips:
+        truth_path = os.path.join(corpus_dir, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(truth_path):
+            continue
+        with open(truth_path, encoding="utf-8") as f:
+            truth = f.read()
+        cap = cv2.VideoCapture(os.path.join(corpus_dir, name))
+        ret, frame = cap.read()
+        if not ret:
+            cap.release()
+            continue
+        spacing = max(1, int(cap.get(cv2.CAP_PROP_FPS) * FUSION_SPACING_SECONDS))
+
+        processed = preprocess_frame(frame)
+        single = "\n".join(text for text, _ in reading_from_results(reader.readtext(processed, detail=1)))
+        totals["single"][1] += processed.size
+
+        def read(image):
+            processed = preprocess_frame(image, FUSION_SCALE)
+            totals["fused"][1] += processed.size
+            return reading_from_results(reader.readtext(processed, detail=1))
+
+        fused, confidence, _ = read_fused(cap, frame, read, spacing=spacing)
+        cap.release()
+        single_accuracy, fused_accuracy = character_accuracy(single, truth), character_accuracy(fused, truth)
+        totals["single"][0] += single_accuracy
+        totals["fused"][0] += fused_accuracy
+        scored += 1
+        print(f"{name[:30]:30}{single_accuracy:10.3f}{fused_accuracy:10.3f}{confidence:12.3f}")
+
+    count = max(scored, 1)
+    print(f"{'mean':30}{totals['single'][0] / count:10.3f}{totals['fused'][0] / count:10.3f}")
+    if totals["single"][1]:
+        print(f"Fused pixel volume: {totals['fused'][1] / totals['single'][1]:.0%} of the single pass")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark temporal fusion against the single upscaled OCR pass")
+    parser.add_argument("command", choices=["benchmark"])
+    parser.add_argument("corpus_dir")
+    args = parser.parse_args()
+    benchmark(args.corpus_dir)
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# The modules import each other by their plain names, as when run from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# database creates code_snippets.db in the working directory on import
+os.chdir(tempfile.mkdtemp(prefix="video_code_extractor_tests_"))
@@ -0,0 +1,37 @@
+import pytest
+
+import numpy as np
+
+from code_classifier import extract_batch, extract_features, get_classifier
+
+@pytest.mark.parametrize("text", [
+    "SELECT c.name, COUNT(o.id) AS orders\nFROM customers c\nJOIN orders o ON o.customer_id = c.id\nGROUP BY c.name",
+    '<ul>\n<li><a href="/home">Home</a></li>\n<li><a href="/about">About us</a></li>\n</ul>',
+    '<div class="intro">\n<p>Welcome to the course</p>\n</div>',
+    ".navbar {\nbackground: #333;\ncolor: white;\n}",
+    "def total(items):\n    return sum(item.price for item in items)",
+])
+def test_code_is_recognized(text):
+    assert get_classifier().is_code(text)
+
+@pytest.mark.parametrize("text", [
+    "Lesson 4: Querying Data\n• Filtering rows with WHERE\n• Joining two tables\n• Grouping and aggregates",
+    "In this lesson we will learn how to build\nthe models for our blog application.",
+    "File  Edit  Selection  View  Go  Run  Terminal  Help\nOPEN EDITORS\nLike and subscribe for more tutorials",
+])
+def test_prose_is_rejected(text):
+    assert not get_classifier().is_code(text)
+
+@pytest.mark.parametrize("text", [
+    "", "a", "ab", "x\n", "\n\n", "héllo wörld\nΩ ≠ 1",
+    "def total(items):\n    return sum(item.price for item in items)\n",
+    "  camelCase snake_case\n\tindented;\n{\n}\n",
+])
+def test_single_text_features_match_the_batch(text):
+    assert np.allclose(extract_features(text), extract_batch([text])[0], atol=1e-6)
+    assert get_classifier().probability(text) == pytest.approx(get_classifier().probabilities([text])[0], abs=1e-5)
+
+def test_batch_decisions_match_single_ones():
+    texts = ["def f(x):\n    return x * 2", "We will now look at\nthe next example.", "int main() {\n    return 0;\n}"]
+    classifier = get_classifier()
+    assert classifier.are_code(texts) == [classifier.is_code(text) for text in texts]
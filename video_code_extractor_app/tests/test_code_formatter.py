@@ -0,0 +1,88 @@
+import pytest
+
+from code_formatter import format_code, format_many
+
+# (language, OCR text with its indentation lost, expected output)
+GOLDEN = [
+    ("Python",
+     'def greet(names):\nfor name in names:\nif name:\nprint("{" + name)\nelif name is None:\npass\n'
+     'else:\nreturn [\n1,\n2]\nRETURN None',
+     'def greet(names):\n'
+     '    for name in names:\n'
+     '        if name:\n'
+     '            print("{" + name)\n'
+     '        elif name is None:\n'
+     '            pass\n'
+     '        else:\n'
+     '            return [\n'
+     '                1,\n'
+     '                2]\n'
+     '            return None'),
+    ("JavaScript",
+     'function add(a, b) {\nif (a) {\nreturn "}" + b; // }\n}\n}',
+     'function add(a, b) {\n'
+     '    if (a) {\n'
+     '        return "}" + b; // }\n'
+     '    }\n'
+     '}'),
+    ("Java",
+     'PUBLIC class Main {\npublic static void main(String[] args) {\nSystem.out.println("{");\n}\n}',
+     'public class Main {\n'
+     '    public static void main(String[] args) {\n'
+     '        System.out.println("{");\n'
+     '    }\n'
+     '}'),
+    ("C++",
+     'int main() {\n/* { */\nfor (int i = 0; i < 3; i++) {\nRETURN i;\n}\n}',
+     'int main() {\n'
+     '    /* { */\n'
+     '    for (int i = 0; i < 3; i++) {\n'
+     '        return i;\n'
+     '    }\n'
+     '}'),
+    ("HTML",
+     '<ul>\n<li>One</li>\n<li>\n<br>\n<img src="a.png"/>\n</li>\n<!-- <div> -->\n</ul>',
+     '<ul>\n'
+     '    <li>One</li>\n'
+     '    <li>\n'
+     '        <br>\n'
+     '        <img src="a.png"/>\n'
+     '    </li>\n'
+     '    <!-- <div> -->\n'
+     '</ul>'),
+    ("CSS",
+     '@media screen {\n.a {\ncolor: red;\n}\n}\n.b { content: "}"; }',
+     '@media screen {\n'
+     '    .a {\n'
+     '        color: red;\n'
+     '    }\n'
+     '}\n'
+     '.b { content: "}"; }'),
+    ("SQL",
+     "select name, count(*) as total\nfrom users left join orders on users.id = orders.user_id\n"
+     "where name like 'select%' and group_id is not null\ngroup by name order by total",
+     "SELECT name, count(*) AS total\n"
+     "FROM users LEFT JOIN orders ON users.id = orders.user_id\n"
+     "WHERE name LIKE 'select%' AND group_id IS NOT NULL\n"
+     "GROUP BY name ORDER BY total"),
+    ("Ruby",
+     "  def x\n    1   \n  end",
+     "def x\n1\nend"),
+]
+
+@pytest.mark.parametrize("language, code, expected", GOLDEN, ids=[language for language, _, _ in GOLDEN])
+def test_golden_output(language, code, expected):
+    assert format_code(code, language) == expected
+    # Formatting is idempotent
+    assert format_code(expected, language) == expected
+
+@pytest.mark.parametrize("language, code, expected", GOLDEN, ids=[language for language, _, _ in GOLDEN])
+def test_kept_indentation_only_fixes_keywords(language, code, expected):
+    indented = "  " + code.replace("\n", "\n  ")
+    kept = format_code(indented, language, reindent=False).split("\n")
+    assert [line.strip() for line in kept] == [line.strip() for line in expected.split("\n")]
+    assert all(line.startswith("  ") for line in kept if line)
+
+def test_format_many_matches_format_code():
+    items = [(code, language) for language, code, _ in GOLDEN]
+    assert list(format_many(items)) == [expected for _, _, expected in GOLDEN]
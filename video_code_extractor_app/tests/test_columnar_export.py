@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import columnar_export
+from columnar_export import STATE_FILE, export_columnar, read_export, timestamp_seconds
+from database import CodeSnippet, add_snippet, session
+
+@pytest.fixture
+def source(request):
+    # A space and a slash, to be quoted in the partition directory name
+    name = f"talks/{request.node.name} 1.mp4"
+    yield name
+    for snippet in session.query(CodeSnippet).filter(CodeSnippet.source_file == name):
+        session.delete(snippet)
+    session.commit()
+
+def rows_of(table, source):
+    return sorted((row for row in table.to_pylist() if row["source_file"] == source), key=lambda row: row["id"])
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_round_trip(tmp_path, source, file_format):
+    first = add_snippet("00:01:05", "Python", "def first():\n    return 1", source, frame_number=1950)
+    second = add_snippet("00:01:07", "SQL", "SELECT * FROM users", source, reindent=False)
+    output_dir = str(tmp_path / "export")
+    assert export_columnar(output_dir, "source", file_format) >= 2
+
+    rows = rows_of(read_export(output_dir), source)
+    assert [row["id"] for row in rows] == [first.id, second.id]
+    assert [row["code"] for row in rows] == [first.code, second.code]
+    assert [row["language"] for row in rows] == ["Python", "SQL"]
+    assert [row["time_seconds"] for row in rows] == [65, 67]
+    assert [row["reindent"] for row in rows] == [True, False]
+    assert rows[0]["frame_number"] == 1950 and rows[0]["content_hash"] == first.content_hash
+    assert set(rows[0]) == set(columnar_export.snippet_schema(columnar_export._pyarrow()).names)
+
+def test_incremental_export_appends_new_snippets(tmp_path, source):
+    output_dir = tmp_path / "export"
+    add_snippet("00:00:01", "Python", "first = 1", source)
+    export_columnar(str(output_dir), "language", chunk_rows=2)
+    state = json.loads((output_dir / STATE_FILE).read_text())
+    assert state["runs"] == 1
+    files = {path.name for path in output_dir.glob("language=*/part-*")}
+
+    # Nothing new; no files and no run are added
+    assert export_columnar(str(output_dir), "language") == 0
+    assert {path.name for path in output_dir.glob("language=*/part-*")} == files
+
+    added = [add_snippet("00:00:02", "Python", "second = 2", source),
+             add_snippet("00:00:03", "Rust", "let third = 3;", source)]
+    assert export_columnar(str(output_dir), "language", chunk_rows=2) == 2
+    state = json.loads((output_dir / STATE_FILE).read_text())
+    assert (state["runs"], state["last_id"]) == (2, added[-1].id)
+    new_files = {path.relative_to(output_dir).as_posix() for path in output_dir.glob("language=*/part-00001-*")}
+    assert new_files == {"language=Python/part-00001-0000.parquet", "language=Rust/part-00001-0001.parquet"}
+    rows = rows_of(read_export(str(output_dir)), source)
+    assert [(row["language"], row["code"]) for row in rows] == [
+        ("Python", "first = 1"), ("Python", "second = 2"), ("Rust", "let third = 3;")]
+
+def test_full_export_replaces_an_export_with_other_settings(tmp_path, source):
+    output_dir = tmp_path / "export"
+    add_snippet("00:00:01", "Python", "first = 1", source)
+    export_columnar(str(output_dir), "language")
+    with pytest.raises(ValueError, match="partitioned by language"):
+        export_columnar(str(output_dir), "source")
+    export_columnar(str(output_dir), "source", full=True)
+    assert not list(output_dir.glob("language=*"))
+    assert [row["code"] for row in rows_of(read_export(str(output_dir)), source)] == ["first = 1"]
+
+def test_timestamp_seconds():
+    assert timestamp_seconds("01:02:03") == 3723
+    assert timestamp_seconds("") is None
+    assert timestamp_seconds("00:0x:01") is None
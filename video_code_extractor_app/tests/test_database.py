@@ -0,0 +1,242 @@
+import json
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import (CodeSnippet, SnippetStatistic, SourcePolicy, add_snippet, delete_snippet, filter_snippets,
+                      fuzzy_search_snippets, get_duplicate_policy, rebuild_statistics, session,
+                      set_duplicate_policy)
+
+@pytest.fixture
+def source(request):
+    # Each test stores its snippets under its own source, and removes them afterwards
+    name = f"{request.node.name}.mp4"
+    yield name
+    for snippet in session.query(CodeSnippet).filter(CodeSnippet.source_file == name):
+        session.delete(snippet)
+    set_duplicate_policy(name, database.DEFAULT_DUPLICATE_POLICY)
+    session.query(SourcePolicy).filter(SourcePolicy.source_file == name).delete()
+    session.commit()
+
+def test_fuzzy_search_scores_words_not_pooled_trigrams(source):
+    misread = add_snippet("00:00:01", "Python", "name = models.CharRicila(max_length=200)", source)
+    unrelated = add_snippet("00:00:02", "Python", "def chart_build(world):\n    return field", source)
+    exact = add_snippet("00:00:03", "Python", "title = models.CharField(max_length=100)", source)
+
+    results = [(snippet.id, score) for snippet, score in fuzzy_search_snippets("CharField")
+               if snippet.source_file == source]
+    ranked_ids = [snippet_id for snippet_id, _ in results]
+    assert ranked_ids[:2] == [exact.id, misread.id]
+    assert dict(results)[exact.id] == 1.0
+    assert unrelated.id not in ranked_ids or dict(results)[unrelated.id] < dict(results)[misread.id]
+
+def test_fuzzy_filter_uses_word_scores(source):
+    misread = add_snippet("00:00:01", "Python", "name = models.CharRicila(max_length=200)", source)
+    add_snippet("00:00:02", "Python", "x = 1\ny = 2", source)
+    matched = [snippet.id for snippet in filter_snippets(content="CharField", fuzzy=True)
+               if snippet.source_file == source]
+    assert matched == [misread.id]
+
+def test_word_similarity():
+    assert database.word_similarity("charfield", "charfield") == 1.0
+    assert database.word_similarity("charfield", "charricila") == pytest.approx(0.6)
+    assert database.word_similarity("charfield", "x", threshold=0.5) == 0.0
+
+def test_filters_are_limited_to_source_files(source):
+    other = f"other-{source}"
+    try:
+        mine = add_snippet("00:00:01", "Python", "name = models.CharField(max_length=200)", source)
+        add_snippet("00:00:01", "Python", "name = models.CharField(max_length=100)", other)
+        for fuzzy in (False, True):
+            matched = [snippet.id for snippet in filter_snippets(content="CharField", fuzzy=fuzzy,
+                                                                 source_files=[source])]
+            assert matched == [mine.id]
+    finally:
+        for snippet in session.query(CodeSnippet).filter(CodeSnippet.source_file == other):
+            session.delete(snippet)
+        session.commit()
+
+def test_edit_of_an_older_version_starts_a_new_chain(source):
+    first = add_snippet("00:00:01", "Python", "a = 1\nb = 2", source)
+    second = add_snippet("00:00:02", "Python", "a = 1\nb = 3", source, parent_id=first.id)
+    third = add_snippet("00:00:03", "Python", "a = 1\nb = 4", source, parent_id=first.id)
+    assert second.parent_id == first.id
+    assert third.parent_id is None
+    heads = session.query(CodeSnippet).filter(CodeSnippet.source_file == source, CodeSnippet.is_head.is_(True))
+    assert sorted(snippet.id for snippet in heads) == [second.id, third.id]
+
+def test_reformatting_keeps_indentation_read_off_the_screen(source):
+    from code_formatter import reformat_stored_snippets
+
+    # Indented like the boxes on screen; the formatter would dedent the body
+    code = "if ready:\nstart()\n        stop()"
+    kept = add_snippet("00:00:01", "Python", code, source, reindent=False)
+    reformat_stored_snippets("Python")
+    session.expire_all()
+    assert session.get(CodeSnippet, kept.id).code == code
+
+def test_content_filter_matches_deltas_and_short_words(source):
+    body = "".join(f"item_{number} = price * count\n" for number in range(40))
+    first = add_snippet("00:00:01", "Python", body, source)
+    edited = add_snippet("00:00:02", "Python", body + "print(Total)\n", source, parent_id=first.id)
+    assert edited.is_delta
+    for content, expected in (("PRINT(total", [edited.id]), ("= p", [first.id, edited.id]), ("%", [])):
+        matched = [snippet.id for snippet in filter_snippets(content=content, source_files=[source])]
+        assert matched == expected
+
+def test_content_filter_is_fast_on_a_large_database(source):
+    snippets = []
+    for number in range(2000):
+        snippet = CodeSnippet(timestamp=f"00:{number // 60 % 60:02d}:{number % 60:02d}", language="Python",
+                              source_file=source)
+        snippet.code = f"def handler_{number}(request):\n    value = compute_{number % 97}(request)\n    return value\n"
+        snippets.append(snippet)
+    session.add_all(snippets)
+    session.commit()
+    head = snippets[-1]
+    for number in range(50):
+        head = add_snippet("01:00:00", "Python", f"{head.code}line_{number} = {number}\n", source, parent_id=head.id)
+
+    for content in ("compute_42(", "e_4", "line_49 = 49"):
+        started = time.perf_counter()
+        matched = filter_snippets(content=content, source_files=[source])
+        elapsed = time.perf_counter() - started
+        assert matched
+        assert elapsed < 0.1, f"filtering for {content!r} took {elapsed * 1000:.0f} ms"
+
+@pytest.mark.parametrize("policy, rows, occurrences, last_timestamp", [
+    ("allow", 2, 1, None),
+    ("reject", 1, 1, None),
+    ("count", 1, 2, None),
+    ("span", 1, 2, "00:00:09"),
+])
+def test_duplicate_policies(source, policy, rows, occurrences, last_timestamp):
+    set_duplicate_policy(source, policy)
+    first = add_snippet("00:00:01", "Python", "total = price * count", source)
+    again = add_snippet("00:00:09", "Python", "total  =  price * count", source)
+    if policy == "reject":
+        assert again is None
+    elif policy == "allow":
+        assert again.id != first.id
+    else:
+        assert again.id == first.id
+    stored = session.query(CodeSnippet).filter(CodeSnippet.source_file == source).order_by(CodeSnippet.id).all()
+    assert len(stored) == rows
+    assert stored[0].occurrences == occurrences
+    assert stored[0].last_timestamp == last_timestamp
+
+def test_duplicate_policy_is_cached_until_it_is_set(source):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if "source_policies" in statement:
+            statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", count)
+    try:
+        assert get_duplicate_policy(source) == database.DEFAULT_DUPLICATE_POLICY
+        for number in range(3):
+            add_snippet(f"00:00:0{number}", "Python", f"value_{number} = {number}", source)
+        assert len(statements) == 1
+        set_duplicate_policy(source, "reject")
+        assert get_duplicate_policy(source) == "reject"
+        assert add_snippet("00:00:05", "Python", "value_0 = 0", source) is None
+    finally:
+        event.remove(database.engine, "before_cursor_execute", count)
+
+def test_statistics_stay_equal_to_a_rebuild(source):
+    def statistics():
+        rows = session.query(SnippetStatistic).filter(SnippetStatistic.source_file == source)
+        return sorted((row.language, row.bucket, row.snippet_count, row.code_bytes, row.first_seen, row.last_seen)
+                      for row in rows)
+
+    set_duplicate_policy(source, "count")
+    snippets = [add_snippet(f"00:00:0{number}", language, f"value_{number} = {number} * price", source)
+                for number, language in enumerate(["Python", "Python", "JavaScript", "Python", "Python"])]
+    # Merged into the first snippet by the count policy
+    assert add_snippet("00:00:09", "Python", "value_0 = 0 * price", source).id == snippets[0].id
+    # The first and the last snippet of the Python bucket
+    delete_snippet(snippets[0].id)
+    delete_snippet(snippets[4].id)
+    # Moves the last remaining Python snippet to the JavaScript counters
+    snippets[3].language = "JavaScript"
+    session.commit()
+    incremental = statistics()
+    assert [(language, count) for language, _, count, _, _, _ in incremental] == [("JavaScript", 2), ("Python", 1)]
+
+    rebuild_statistics()
+    assert statistics() == incremental
+
+@pytest.fixture
+def baseline_database(tmp_path):
+    # code_snippets as created by the first version, with code in a plain-text column
+    path = tmp_path / "baseline.db"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE code_snippets (id INTEGER PRIMARY KEY, timestamp VARCHAR(20) NOT NULL, "
+                       "language VARCHAR(50) NOT NULL, code TEXT NOT NULL, created_at DATETIME, "
+                       "source_file VARCHAR(255))")
+    connection.executemany("INSERT INTO code_snippets (timestamp, language, code, source_file) VALUES (?, ?, ?, ?)",
+                           [("00:00:01", "Python", "def first():\n    return 1", "talk.mp4"),
+                            ("00:00:02", "SQL", "SELECT * FROM users", "talk.mp4")])
+    connection.commit()
+    connection.close()
+    engine = create_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+def test_migration_of_a_baseline_database(baseline_database):
+    assert database.has_legacy_code_column(baseline_database)
+    assert database.migrate_legacy_code_column(baseline_database, batch_size=1) == 2
+    columns = {column["name"] for column in inspect(baseline_database).get_columns("code_snippets")}
+    assert "code" not in columns and {"code_blob", "code_size", "video_key"} <= columns
+    snippets = sessionmaker(bind=baseline_database)().query(CodeSnippet).order_by(CodeSnippet.id).all()
+    assert [(snippet.code, snippet.code_size) for snippet in snippets] == [
+        ("def first():\n    return 1", 25), ("SELECT * FROM users", 19)]
+    # Running it again does nothing
+    assert database.migrate_legacy_code_column(baseline_database) == 0
+
+def test_migration_needs_drop_column_support(baseline_database, monkeypatch):
+    monkeypatch.setattr(database.sqlite3, "sqlite_version_info", (3, 31, 1))
+    with pytest.raises(RuntimeError, match="3.35"):
+        database.migrate_legacy_code_column(baseline_database)
+    assert database.has_legacy_code_column(baseline_database)
+
+def test_json_round_trip_keeps_edit_chains(source, tmp_path):
+    imported_source = f"imported-{source}"
+    body = "".join(f"item_{number} = price * count\n" for number in range(40))
+    first = add_snippet("00:00:01", "Python", body, source, frame_number=30, video_key="0123456789abcdef")
+    second = add_snippet("00:00:02", "Python", body + "print(total)\n", source, parent_id=first.id)
+    third = add_snippet("00:00:03", "Python", body + "print(total)\nreturn\n", source, parent_id=second.id)
+    alone = add_snippet("00:00:04", "Python", "if ready:\n        start()", source, reindent=False)
+    assert second.is_delta and third.is_delta
+
+    exported_path = tmp_path / "all.json"
+    database.export_all_to_json(str(exported_path))
+    data = [item for item in json.loads(exported_path.read_text()) if item["source_file"] == source]
+    for item in data:
+        item["source_file"] = imported_source
+    import_path = tmp_path / "import.json"
+    import_path.write_text(json.dumps(data))
+    try:
+        database.import_from_json(str(import_path))
+        copies = session.query(CodeSnippet).filter(CodeSnippet.source_file == imported_source) \
+            .order_by(CodeSnippet.id).all()
+        originals = [first, second, third, alone]
+        assert [copy.code for copy in copies] == [original.code for original in originals]
+        new_first, new_second, new_third, new_alone = copies
+        assert (new_second.parent_id, new_third.parent_id) == (new_first.id, new_second.id)
+        assert new_second.chain_id == new_third.chain_id == new_first.id
+        assert [copy.is_delta for copy in copies] == [False, True, True, False]
+        assert [copy.is_head for copy in copies] == [False, False, True, True]
+        assert (new_first.video_key, new_first.frame_number) == ("0123456789abcdef", 30)
+        assert new_alone.reindent is False and new_alone.parent_id is None
+        assert [snippet.id for snippet in filter_snippets(content="return", source_files=[imported_source])] \
+            == [new_third.id]
+    finally:
+        for snippet in session.query(CodeSnippet).filter(CodeSnippet.source_file == imported_source):
+            session.delete(snippet)
+        session.commit()
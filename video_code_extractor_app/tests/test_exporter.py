@@ -0,0 +1,73 @@
+import json
+import tarfile
+import threading
+import zipfile
+
+import pytest
+
+from database import CodeSnippet, add_snippet, session
+from exporter import ARCHIVE_TAR_GZ, ARCHIVE_ZIP, EXPORT_WRITERS, export_snippets
+
+@pytest.fixture
+def snippet_ids(request):
+    name = f"{request.node.name}.mp4"
+    snippets = [add_snippet("00:00:01", "Python", "def first():\n    return 1", name),
+                add_snippet("00:00:02", "JavaScript", "const second = () => 2;", name),
+                add_snippet("00:00:03", "Python", "third = [3]", name)]
+    yield [snippet.id for snippet in snippets]
+    for snippet in session.query(CodeSnippet).filter(CodeSnippet.source_file == name):
+        session.delete(snippet)
+    session.commit()
+
+@pytest.mark.parametrize("export_format", sorted(EXPORT_WRITERS))
+def test_each_format_is_written_to_one_file(tmp_path, snippet_ids, export_format):
+    path = export_snippets(str(tmp_path), export_format, snippet_ids, base_filename="export")
+    assert path == str(tmp_path)
+    written = [entry.name for entry in tmp_path.iterdir()]
+    assert written == [f"export{EXPORT_WRITERS[export_format].extension}"]
+    text = (tmp_path / written[0]).read_text(encoding="utf-8")
+    assert "third = [3]" in text
+    if export_format == "python":
+        assert "const second" not in text
+    else:
+        assert "const second" in text
+
+def test_json_export_is_valid(tmp_path, snippet_ids):
+    export_snippets(str(tmp_path), "json", snippet_ids, base_filename="export")
+    data = json.loads((tmp_path / "export.json").read_text(encoding="utf-8"))
+    assert [entry["code"] for entry in data] == [
+        "def first():\n    return 1", "const second = () => 2;", "third = [3]"]
+
+def test_separate_files_only_split_python(tmp_path, snippet_ids):
+    export_snippets(str(tmp_path), "python", snippet_ids, base_filename="export", separate_files=True)
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["export_1.py", "export_3.py"]
+    markdown = tmp_path / "markdown"
+    markdown.mkdir()
+    export_snippets(str(markdown), "markdown", snippet_ids, base_filename="export", separate_files=True)
+    assert [entry.name for entry in markdown.iterdir()] == ["export.md"]
+
+def test_archives_hold_the_export_files(tmp_path, snippet_ids):
+    path = export_snippets(str(tmp_path), "python", snippet_ids, base_filename="export",
+                           separate_files=True, archive=ARCHIVE_ZIP)
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == ["export_1.py", "export_3.py"]
+        assert "return 1" in archive.read("export_1.py").decode("utf-8")
+    path = export_snippets(str(tmp_path), "text", snippet_ids, base_filename="export", archive=ARCHIVE_TAR_GZ)
+    with tarfile.open(path) as archive:
+        assert archive.getnames() == ["export.txt"]
+        assert b"const second" in archive.extractfile("export.txt").read()
+
+@pytest.mark.parametrize("archive", [None, ARCHIVE_ZIP, ARCHIVE_TAR_GZ])
+@pytest.mark.parametrize("separate_files", [False, True])
+def test_cancel_leaves_nothing_behind(tmp_path, snippet_ids, archive, separate_files):
+    cancel_event = threading.Event()
+
+    def on_progress(done, total):
+        if done == 1:
+            cancel_event.set()
+
+    path = export_snippets(str(tmp_path), "python", snippet_ids, base_filename="export",
+                           separate_files=separate_files, archive=archive,
+                           progress_callback=on_progress, cancel_event=cancel_event)
+    assert path is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from extraction_jobs import ExtractionJob, JobQueue, extract_in_process
+
+def fake_extract(video_path, progress_callback=None, snippet_callback=None, control=None, frames=3, fail=False):
+    # Stands in for extract_code_from_video in the job process
+    control.total_frames = frames
+    frame = 0
+    while frame < frames:
+        if not control.checkpoint():
+            return
+        frame += 1
+        control.frames_done = frame
+        snippet_callback({"id": frame, "source_file": video_path})
+        progress_callback(int(frame / frames * 100))
+        time.sleep(0.05)
+    if fail:
+        raise ValueError("unreadable video")
+
+def test_queue_starts_jobs_up_to_the_concurrency_limit():
+    started = []
+    jobs = JobQueue(started.append, concurrency=2)
+    first, second, third = (jobs.add(f"video{number}.mp4") for number in range(3))
+    jobs.start_pending()
+    assert started == [first, second]
+    assert third.status == ExtractionJob.PENDING
+
+    jobs.job_finished(first)
+    assert first.status == ExtractionJob.DONE
+    assert started == [first, second, third]
+
+    fourth = jobs.add("video3.mp4")
+    jobs.start_pending()
+    assert fourth.status == ExtractionJob.PENDING
+    jobs.set_concurrency(3)
+    assert started[-1] is fourth
+
+def test_paused_jobs_keep_their_slot():
+    started = []
+    jobs = JobQueue(started.append, concurrency=1)
+    first, second = jobs.add("a.mp4"), jobs.add("b.mp4")
+    jobs.start_pending()
+    jobs.toggle_pause(first)
+    assert first.status == ExtractionJob.PAUSED and first.control.paused
+    assert first.resumed_at is None
+    jobs.start_pending()
+    assert started == [first]
+
+    jobs.toggle_pause(first)
+    assert first.status == ExtractionJob.RUNNING and not first.control.paused
+    jobs.toggle_pause(second)  # Pending jobs cannot be paused
+    assert second.status == ExtractionJob.PENDING
+
+def test_cancel():
+    started = []
+    jobs = JobQueue(started.append, concurrency=1)
+    running, pending = jobs.add("a.mp4"), jobs.add("b.mp4")
+    jobs.start_pending()
+    jobs.cancel(pending)
+    assert pending.status == ExtractionJob.CANCELLED and not pending.control.cancelled
+    jobs.toggle_pause(running)
+    jobs.cancel(running)
+    # A paused job is woken so that it can stop
+    assert running.control.cancelled and not running.control.paused
+    assert running.status == ExtractionJob.PAUSED
+    jobs.job_finished(running)
+    assert running.status == ExtractionJob.CANCELLED
+    assert started == [running]
+    assert jobs.idle
+    assert jobs.clear_finished() == [1, 0]
+    assert jobs.jobs == []
+
+def test_failed_jobs_free_their_slot():
+    started = []
+    jobs = JobQueue(started.append, concurrency=1)
+    first, second = jobs.add("a.mp4"), jobs.add("b.mp4")
+    jobs.start_pending()
+    jobs.job_finished(first, "unreadable video")
+    assert first.status == ExtractionJob.FAILED and first.error == "unreadable video"
+    assert started == [first, second]
+
+def test_extract_in_process_relays_callbacks_and_counters():
+    job = ExtractionJob("talk.mp4")
+    progress, snippets = [], []
+    extract_in_process("talk.mp4", progress.append, snippets.append, job.control, extract=fake_extract)
+    assert progress == [33, 66, 100]
+    assert [snippet["id"] for snippet in snippets] == [1, 2, 3]
+    assert (job.control.frames_done, job.control.total_frames) == (3, 3)
+
+def test_extract_in_process_raises_the_job_error():
+    with pytest.raises(RuntimeError, match="unreadable video"):
+        extract_in_process("talk.mp4", extract=fake_extract, frames=1, fail=True)
+
+def test_extract_in_process_mirrors_pause_and_cancel():
+    job = ExtractionJob("talk.mp4")
+    progress = []
+
+    def on_progress(value):
+        progress.append(value)
+        if len(progress) == 1:
+            job.control.pause()
+            threading.Timer(1.0, job.control.cancel).start()
+
+    extract_in_process("talk.mp4", on_progress, control=job.control, extract=fake_extract, frames=1000)
+    # Unpaused, the process would have read about 20 frames before the cancel
+    assert job.control.frames_done < 5
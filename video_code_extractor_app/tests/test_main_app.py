@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication, QTreeWidgetItem
+
+import main_app
+from database import CodeSnippet, add_snippet, session
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+def run_extractor(extract):
+    # run() is called on the test's thread, so the signals are delivered directly
+    thread = main_app.ExtractorThread("talk.mp4", extract=extract)
+    batches, progress, outcome = [], [], []
+    thread.snippets_signal.connect(batches.append)
+    thread.progress_signal.connect(progress.append)
+    thread.completed_signal.connect(lambda: outcome.append("completed"))
+    thread.failed_signal.connect(outcome.append)
+    thread.run()
+    return batches, progress, outcome
+
+def test_extractor_thread_batches_snippets(app):
+    def extract(video_path, progress_callback, snippet_callback, control):
+        for number in range(100):
+            snippet_callback({"id": number})
+            if number % 10 == 0:
+                progress_callback(number)
+
+    batches, progress, outcome = run_extractor(extract)
+    assert outcome == ["completed"]
+    assert progress == list(range(0, 100, 10))
+    # The first snippet goes out at once, the rest within the batch interval in one final batch
+    assert [len(batch) for batch in batches] == [1, 99]
+    assert [snippet["id"] for batch in batches for snippet in batch] == list(range(100))
+
+def test_extractor_thread_delivers_queued_snippets_before_a_failure(app):
+    def extract(video_path, progress_callback, snippet_callback, control):
+        for number in range(3):
+            snippet_callback({"id": number})
+        raise RuntimeError("unreadable video")
+
+    batches, _, outcome = run_extractor(extract)
+    assert outcome == ["unreadable video"]
+    assert [snippet["id"] for batch in batches for snippet in batch] == [0, 1, 2]
+
+def highlighted(editor, block_number):
+    return bool(editor.document().findBlockByNumber(block_number).layout().formats())
+
+@pytest.mark.parametrize("lines, chunked", [(1000, False), (1001, True)])
+def test_large_snippets_are_highlighted_in_chunks(app, lines, chunked):
+    editor = main_app.CodeEditor()
+    editor.set_code("\n".join(f"def f{number}(): return {number}" for number in range(lines)), "Python")
+    highlighter = editor.highlighter
+    assert highlighter.chunk_timer.isActive() == chunked
+    assert highlighted(editor, lines - 1) != chunked
+    if chunked:
+        assert highlighter.highlighted_blocks == 0 and not highlighted(editor, 0)
+        highlighter.highlight_next_chunk()
+        chunk = main_app.SyntaxHighlighter.CHUNK_SIZE
+        assert highlighted(editor, chunk - 1) and not highlighted(editor, chunk)
+        while highlighter.chunk_timer.isActive():
+            highlighter.highlight_next_chunk()
+        assert highlighter.highlighted_blocks is None
+    assert all(highlighted(editor, number) for number in range(lines))
+
+@pytest.fixture
+def window(app, request):
+    source = f"{request.node.name}.mp4"
+    window = main_app.VideoCodeExtractorApp()
+    yield window
+    window.close()
+    for snippet in session.query(CodeSnippet).filter(CodeSnippet.source_file == source):
+        session.delete(snippet)
+    session.commit()
+
+def test_open_editors_recycle_the_least_recently_used(window, request):
+    source = f"{request.node.name}.mp4"
+    summaries = [add_snippet(f"00:00:0{number}", "Python", f"value = {number}", source).to_summary()
+                 for number in range(4)]
+    items = []
+    for summary in summaries:
+        item = QTreeWidgetItem()
+        item.setData(0, Qt.ItemDataRole.UserRole, summary)
+        items.append(item)
+    first, second, third, fourth = (summary["id"] for summary in summaries)
+    window.max_editors_spin.setValue(2)
+    tabs = window.tab_widget.count()
+
+    window.show_snippet(items[0], 0)
+    window.show_snippet(items[1], 0)
+    window.show_snippet(items[0], 0)  # Focusing the first makes the second the least recently used
+    recycled = window.open_editors[second]
+    window.show_snippet(items[2], 0)
+    assert list(window.open_editors) == [first, third]
+    assert window.open_editors[third] is recycled and recycled.toPlainText() == "value = 2"
+    assert window.tab_widget.count() == tabs + 2
+
+    window.trim_editors(1)
+    assert list(window.open_editors) == [third]
+    assert window.tab_widget.count() == tabs + 1
+    window.show_snippet(items[3], 0)
+    assert list(window.open_editors) == [third, fourth]
@@ -0,0 +1,80 @@
+import pytest
+
+from build_known_words import build_known_words
+from ocr_corrections import CorrectionEngine, get_correction_engine, is_confusion, load_known_words
+from text_distance import edit_distance
+
+@pytest.fixture(scope="module")
+def engine():
+    return get_correction_engine()
+
+# Valid words one edit away from a keyword of the language they are checked in
+@pytest.mark.parametrize("word, language", [
+    ("white", "python"),   # while
+    ("black", "css"),      # block
+    ("cover", "css"),      # hover
+    ("orange", "python"),  # range
+    ("Point", "python"),   # print
+    ("mount", "sql"),      # count
+    ("mount", "python"),
+    ("bloat", "java"),     # float
+    ("bloat", "python"),
+])
+def test_valid_words_are_kept(engine, word, language):
+    text = f"value = {word}\n"
+    assert engine.correct(text, language) == text
+
+@pytest.mark.parametrize("misread, expected, language", [
+    ("whlle", "while", "python"),
+    ("retum", "return", "python"),
+    ("Exceptlon", "Exception", "python"),
+    ("functlon", "function", "javascript"),
+    ("HAVlNG", "HAVING", "sql"),
+])
+def test_misreads_are_corrected(engine, misread, expected, language):
+    assert engine.correct(f"{misread} x\n", language) == f"{expected} x\n"
+
+def test_only_the_detected_language_vocabulary_is_used(engine):
+    # "while" is not an SQL word, so the misread is not turned into it
+    assert engine.correct("whlle x\n", "sql") == "whlle x\n"
+    # No vocabulary, no spelling correction
+    assert engine.correct("whlle x\n", "C++") == "whlle x\n"
+
+def test_spelling_waits_for_the_language(engine):
+    assert engine.correct("whlle x\n") == "whlle x\n"
+    assert engine.correct("Revense x\n") == "reverse x\n"
+
+def test_short_words_need_an_ocr_confusion():
+    engine = CorrectionEngine({}, {"python": ["while", "class"]})
+    assert engine.correct("whlle\n", "python") == "while\n"
+    assert engine.correct("whale\n", "python") == "whale\n"
+    assert engine.correct("clase\n", "python") == "clase\n"
+
+def test_is_confusion():
+    assert is_confusion("retum", "return")
+    assert is_confusion("whlle", "while")
+    assert not is_confusion("white", "while")
+    assert not is_confusion("orange", "range")
+
+def test_known_words_list_is_shipped():
+    known_words = load_known_words()
+    assert {"white", "black", "orange", "point", "mount"} <= known_words
+    assert "whlle" not in known_words
+    assert not any(word.startswith("#") for word in known_words)
+    assert "aaaaa" not in known_words and "abcdefg" not in known_words
+
+def test_known_words_generator_filters_rare_words_and_test_data(tmp_path):
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    (sources / "module.py").write_text(
+        "def ChartBuilder():\n    pass\n" * 3 + "aaaaaaa = 'abcdefgh' + 'tatata' + 'bcdfghj'\n" * 3 + "rarely = 1\n"
+    )
+    output = tmp_path / "known_words.txt"
+    assert build_known_words([str(sources)], str(output), min_count=3, header="test list") == 3
+    assert output.read_text().startswith("# test list\n")
+    assert load_known_words(str(output)) == {"chartbuilder", "chart", "builder"}
+
+def test_edit_distance():
+    assert edit_distance("while", "whlle", 2) == 1
+    assert edit_distance("form", "from", 2) == 1  # Transposition
+    assert edit_distance("short", "much longer", 2) == 3
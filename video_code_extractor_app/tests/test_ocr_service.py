@@ -0,0 +1,44 @@
+import os
+import stat
+
+import pytest
+
+import ocr_service
+
+@pytest.fixture
+def runtime_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.delenv("OCR_SERVICE_AUTHKEY", raising=False)
+    return tmp_path
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_runtime_dir_is_private(runtime_root):
+    path = ocr_service.runtime_dir()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    assert ocr_service.default_address().startswith(path)
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_runtime_dir_open_to_others_is_refused(runtime_root):
+    path = ocr_service.runtime_dir()
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        ocr_service.runtime_dir()
+
+def test_authkey_is_random_and_private(runtime_root):
+    first = ocr_service.create_authkey()
+    assert ocr_service.read_authkey() == first
+    assert ocr_service.create_authkey() != first
+    if hasattr(os, "getuid"):
+        key_path = os.path.join(ocr_service.runtime_dir(), ocr_service.AUTHKEY_FILE)
+        assert stat.S_IMODE(os.stat(key_path).st_mode) == 0o600
+
+def test_no_authkey_without_a_service(runtime_root):
+    with pytest.raises(FileNotFoundError):
+        ocr_service.read_authkey()
+    assert ocr_service.connect() is None
+
+def test_environment_authkey_wins(runtime_root, monkeypatch):
+    monkeypatch.setenv("OCR_SERVICE_AUTHKEY", "from-env")
+    assert ocr_service.create_authkey() == b"from-env"
+    assert ocr_service.read_authkey() == b"from-env"
+    assert not os.path.exists(os.path.join(ocr_service.runtime_dir(), ocr_service.AUTHKEY_FILE))
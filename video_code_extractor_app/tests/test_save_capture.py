@@ -0,0 +1,17 @@
+import pytest
+
+ocr_extractor = pytest.importorskip("ocr_extractor")
+from database import CodeSnippet, session
+
+def test_only_chain_heads_are_linked(tmp_path):
+    source = f"{tmp_path.name}.mp4"
+    recent = []
+    base = "def total(items):\n    result = 0\n    for item in items:\n        result += item\n    return result"
+    first = ocr_extractor.save_capture(source, 0, "00:00:01", "Python", base, recent)
+    edited = ocr_extractor.save_capture(source, 30, "00:00:02", "Python", base + "\n# done", recent)
+    again = ocr_extractor.save_capture(source, 60, "00:00:03", "Python", base + "\n# finished", recent)
+    assert edited.parent_id == first.id
+    assert again.parent_id == edited.id
+    assert [entry[0] for entry in recent] == [again.id]
+    heads = session.query(CodeSnippet).filter(CodeSnippet.source_file == source, CodeSnippet.is_head.is_(True))
+    assert [snippet.id for snippet in heads] == [again.id]
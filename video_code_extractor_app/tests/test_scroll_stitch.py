@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from scroll_stitch import MIN_SCROLL_PIXELS, OVERLAP_DIFFERENCE, ScrollStitcher, _shift_difference, code_region
+
+def code_file(rows, width, seed):
+    # A dark editor with lines of light "words" of random lengths, 32 pixels apart
+    rng = np.random.default_rng(seed)
+    image = np.full((rows, width, 3), 30, np.uint8)
+    for top in range(8, rows - 24, 32):
+        x = 40 + 40 * int(rng.integers(0, 6))
+        while x < width - 200:
+            length = int(rng.integers(30, 160))
+            image[top:top + 18, x:x + length] = rng.integers(150, 255)
+            x += length + 16
+    return image
+
+def view(image, top, height=720):
+    return image[top:top + height].copy()
+
+@pytest.fixture
+def stitcher():
+    return ScrollStitcher(reader=None, fps=30, check_interval=6)
+
+def displacement(stitcher, previous, current):
+    previous_small, scale = stitcher._analysis_copy(code_region(previous))
+    current_small, _ = stitcher._analysis_copy(code_region(current))
+    return stitcher._displacement(previous_small, current_small, scale)
+
+def test_shift_difference():
+    image = code_region(code_file(1200, 1280, seed=1)).astype(np.float32)
+    previous, moved_down = image[100:700], image[60:660]
+    assert _shift_difference(previous, moved_down, 40) == 0.0
+    assert _shift_difference(moved_down, previous, -40) == 0.0
+    assert _shift_difference(previous, moved_down, 39.6) == 0.0  # Rounded to whole rows
+    assert _shift_difference(previous, moved_down, 0) > OVERLAP_DIFFERENCE
+    assert _shift_difference(previous, moved_down, 600) == float("inf")
+
+@pytest.mark.parametrize("width, rows", [(1280, 45), (1920, -90), (1280, 0)])
+def test_displacement_of_a_scrolled_view(stitcher, width, rows):
+    image = code_file(2000, width, seed=2)
+    # The view moves down the file by rows, so the content moves up
+    dy, shifted = displacement(stitcher, view(image, 500), view(image, 500 + rows))
+    assert shifted
+    assert dy == pytest.approx(-rows, abs=1.0)
+
+def test_small_movement_is_not_scrolling(stitcher):
+    image = code_file(2000, 1280, seed=3)
+    # A still shifted copy, so a slow drift does not end a sequence
+    assert MIN_SCROLL_PIXELS > 1
+    assert displacement(stitcher, view(image, 500), view(image, 501)) == (0.0, True)
+
+def test_other_content_is_not_a_shifted_copy(stitcher):
+    previous = view(code_file(2000, 1280, seed=4), 500)
+    assert not displacement(stitcher, previous, view(code_file(2000, 1280, seed=5), 540))[1]
+    # A horizontal scroll
+    sideways = np.roll(previous, 60, axis=1)
+    assert not displacement(stitcher, previous, sideways)[1]
+    # A resized window
+    assert displacement(stitcher, previous, view(code_file(2000, 1280, seed=4), 500, 600)) == (0.0, False)
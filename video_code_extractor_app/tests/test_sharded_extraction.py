@@ -0,0 +1,142 @@
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from sharded_extraction import claim_shard, merge_results, plan_shards, process_shard, requeue_stale_claims
+
+def queue_shards(queue_dir, job_id, count):
+    pending = os.path.join(queue_dir, "pending")
+    os.makedirs(pending, exist_ok=True)
+    for index in range(count):
+        with open(os.path.join(pending, f"{job_id}_{index:04d}.json"), "w") as f:
+            json.dump({"job": job_id, "index": index, "video_path": "talk.mp4", "start_frame": index * 30,
+                       "end_frame": index * 30 + 30, "options": {}}, f)
+
+@pytest.mark.parametrize("total_frames, sampling_rate, shards", [
+    (1000, 30, 4), (1000, 30, 7), (31, 30, 4), (29, 30, 4), (900, 30, 30), (900, 1, 8), (1, 30, 3),
+])
+def test_shards_split_the_sampling_grid(total_frames, sampling_rate, shards):
+    ranges = plan_shards(total_frames, sampling_rate, shards)
+    assert 1 <= len(ranges) <= shards
+    assert ranges[0][0] == 0 and ranges[-1][1] == total_frames
+    assert all(start % sampling_rate == 0 for start, _ in ranges)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    # Every frame a single run samples is sampled by exactly one shard
+    sampled = [frame for start, end in ranges for frame in range(start, end) if frame % sampling_rate == 0]
+    assert sampled == list(range(0, total_frames, sampling_rate))
+
+def test_concurrent_claims_take_every_shard_once(tmp_path):
+    queue_dir = str(tmp_path)
+    queue_shards(queue_dir, "job", 40)
+    queue_shards(queue_dir, "other", 2)
+    claimed = []
+
+    def worker():
+        while True:
+            claim = claim_shard(queue_dir, "job")
+            if claim is None:
+                return
+            claimed.append(claim[1]["index"])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(40))
+    assert sorted(os.listdir(tmp_path / "pending")) == ["other_0000.json", "other_0001.json"]
+
+def test_only_stale_claims_are_requeued(tmp_path):
+    queue_dir = str(tmp_path)
+    queue_shards(queue_dir, "job", 2)
+    stale, _ = claim_shard(queue_dir)
+    fresh, _ = claim_shard(queue_dir)
+    # A claim just taken is fresh even though its pending file was old
+    assert requeue_stale_claims(queue_dir, timeout=60) == 0
+    old = time.time() - 120
+    os.utime(stale, (old, old))
+    assert requeue_stale_claims(queue_dir, timeout=60) == 1
+    assert os.listdir(tmp_path / "pending") == [os.path.basename(stale)]
+    assert os.listdir(tmp_path / "claimed") == [os.path.basename(fresh)]
+
+@pytest.fixture
+def fake_extractor(monkeypatch):
+    # process_shard imports extract_code_from_video from ocr_extractor, which needs the OCR packages
+    module = types.ModuleType("ocr_extractor")
+    monkeypatch.setitem(sys.modules, "ocr_extractor", module)
+    return module
+
+def test_heartbeat_keeps_a_slow_shard_claimed(tmp_path, fake_extractor):
+    queue_dir = str(tmp_path)
+    queue_shards(queue_dir, "job", 1)
+    claim_path, shard = claim_shard(queue_dir)
+    refreshed = []
+
+    def extract_code_from_video(video_path, start_frame, end_frame, store, frame_index, **options):
+        # One frame that takes longer than the claim timeout, without any progress callback
+        old = time.time() - 120
+        os.utime(claim_path, (old, old))
+        time.sleep(0.3)
+        refreshed.append(requeue_stale_claims(queue_dir, timeout=60) == 0)
+        store({"frame_number": start_frame, "timestamp": "00:00:00", "language": "Python", "code": "x = 1"})
+
+    fake_extractor.extract_code_from_video = extract_code_from_video
+    process_shard(claim_path, shard, queue_dir, heartbeat_interval=0.05)
+    assert refreshed == [True]
+    assert not os.path.exists(claim_path)
+    with open(tmp_path / "results" / "job_0000.json") as f:
+        result = json.load(f)
+    assert result["error"] is None and len(result["captures"]) == 1
+
+def test_a_requeued_shard_finished_by_its_first_worker_is_not_an_error(tmp_path, fake_extractor):
+    queue_dir = str(tmp_path)
+    queue_shards(queue_dir, "job", 1)
+    claim_path, shard = claim_shard(queue_dir)
+
+    def extract_code_from_video(video_path, **options):
+        os.rename(claim_path, os.path.join(queue_dir, "pending", os.path.basename(claim_path)))
+
+    fake_extractor.extract_code_from_video = extract_code_from_video
+    process_shard(claim_path, shard, queue_dir, heartbeat_interval=0.01)
+    assert os.listdir(tmp_path / "results") == ["job_0000.json"]
+
+def test_merge_links_edits_across_a_shard_boundary(tmp_path):
+    pytest.importorskip("ocr_extractor")
+    from database import CodeSnippet, SourcePolicy, session, set_duplicate_policy
+
+    video_path = tmp_path / f"{tmp_path.name}.mp4"
+    video_path.write_bytes(b"video")
+    results = tmp_path / "results"
+    results.mkdir()
+    base = "def total(items):\n    result = 0\n    for item in items:\n        result += item\n    return result"
+    shards = [
+        [(0, base), (30, base)],
+        # The first capture of the second shard repeats the last code of the first one
+        [(60, base), (90, base + "\n# done")],
+    ]
+    for index, captures in enumerate(shards):
+        with open(results / f"job_{index:04d}.json", "w") as f:
+            json.dump({"job": "job", "index": index, "error": None, "frame_numbers": [], "positions_msec": [],
+                       "captures": [{"frame_number": frame, "timestamp": f"00:00:{frame // 30:02d}",
+                                     "language": "Python", "code": code} for frame, code in captures]}, f)
+    set_duplicate_policy(video_path.name, "count")
+    new_snippets = merge_results(str(video_path), "job", str(tmp_path))
+    stored = session.query(CodeSnippet).filter(CodeSnippet.source_file == video_path.name) \
+        .order_by(CodeSnippet.id).all()
+    try:
+        assert new_snippets == 2
+        assert len(stored) == 2
+        first, edited = stored
+        assert first.occurrences == 3
+        assert edited.parent_id == first.id
+        assert os.listdir(results) == []
+    finally:
+        for snippet in stored:
+            session.delete(snippet)
+        session.query(SourcePolicy).filter(SourcePolicy.source_file == video_path.name).delete()
+        session.commit()
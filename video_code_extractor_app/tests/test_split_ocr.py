@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from split_ocr import CROP_GAP, DETECTION_MAX_SIDE, LINE_HEIGHT, MARGIN, detect_boxes, detection_image, split_readtext
+
+class FakeReader:
+    # Detects the given boxes (in full-resolution coordinates) and recognizes each crop as its strip row
+    def __init__(self, boxes, full_side):
+        self.boxes = boxes
+        self.full_side = full_side  # Longest side of the image the boxes are in
+        self.detected_shape = None
+        self.strip_shape = None
+
+    def detect(self, image):
+        self.detected_shape = image.shape
+        scale = max(image.shape) / self.full_side
+        horizontal = [[x_min * scale, x_max * scale, y_min * scale, y_max * scale]
+                      for x_min, x_max, y_min, y_max in self.boxes]
+        return [horizontal], [[]]
+
+    def recognize(self, strip, horizontal_list, free_list, detail):
+        self.strip_shape = strip.shape
+        return [([[x_min, top], [x_max, top], [x_max, bottom], [x_min, bottom]], f"line {index}", 0.9)
+                for index, (x_min, x_max, top, bottom) in enumerate(horizontal_list)]
+
+@pytest.mark.parametrize("shape, scale", [((2160, 3840), DETECTION_MAX_SIDE / 3840), ((720, 1280), 1.0)])
+def test_detection_image_is_at_most_max_side(shape, scale):
+    image, actual = detection_image(np.zeros(shape, np.uint8))
+    assert actual == pytest.approx(scale)
+    assert max(image.shape) <= DETECTION_MAX_SIDE
+
+def test_boxes_are_mapped_back_to_full_resolution():
+    gray = np.full((2160, 3840), 255, np.uint8)
+    boxes = [(100, 1900, 200, 260), (3000, 3840, 2100, 2160)]
+    reader = FakeReader(boxes, 3840)
+    mapped = detect_boxes(reader, gray)
+    assert max(reader.detected_shape) == DETECTION_MAX_SIDE
+    for (x_min, x_max, y_min, y_max), (mx_min, mx_max, my_min, my_max) in zip(boxes, mapped):
+        # Padded around the original box, and clipped to the frame
+        assert mx_min <= x_min and mx_max >= x_max and my_min <= y_min and my_max >= y_max
+        assert mx_max <= 3840 and my_max <= 2160
+        assert y_min - my_min <= max(2, (y_max - y_min) * 0.1) + 1
+    assert mapped[1][1] == 3840 and mapped[1][3] == 2160
+
+def test_results_are_in_frame_coordinates():
+    frame = np.full((2160, 3840, 3), 255, np.uint8)
+    margin_x, margin_y = int(3840 * MARGIN), int(2160 * MARGIN)
+    region_boxes = [(10, 900, 20, 80), (10, 1500, 120, 180), (40, 600, 220, 280)]
+    reader = FakeReader(region_boxes, 3840 - 2 * margin_x)
+    results = split_readtext(reader, frame)
+    assert [text for _, text, _ in results] == ["line 0", "line 1", "line 2"]
+    # All crops are recognized in one strip of line-height rows
+    assert reader.strip_shape[0] == 3 * (LINE_HEIGHT + CROP_GAP)
+    for (points, _, _), (x_min, x_max, y_min, y_max) in zip(results, region_boxes):
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        assert min(xs) <= x_min + margin_x and max(xs) >= x_max + margin_x
+        assert min(ys) <= y_min + margin_y and max(ys) >= y_max + margin_y
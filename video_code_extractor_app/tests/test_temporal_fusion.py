@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from temporal_fusion import fuse_lines, fuse_readings, read_fused
+
+def test_majority_outvotes_a_confident_misread():
+    text, confidence = fuse_lines([("def foo():", 0.9), ("def f0o():", 0.95), ("def foo():", 0.8)])
+    assert text == "def foo():"
+    # Disagreement lowers the confidence below the readings'
+    assert confidence < 0.9
+
+def test_unanimous_readings_keep_their_confidence():
+    assert fuse_lines([("x = 1", 0.9), ("x = 1", 0.9)]) == ("x = 1", pytest.approx(0.9))
+
+@pytest.mark.parametrize("candidates, expected", [
+    # A dropped character is restored by the readings that have it
+    ([("return x", 0.9), ("retrn x", 0.95), ("return x", 0.9)], "return x"),
+    # An inserted character is dropped when most readings lack it
+    ([("return x", 0.9), ("return  x", 0.95), ("return x", 0.8)], "return x"),
+    # A character only the reference has is outvoted
+    ([("values[i]]", 0.95), ("values[i]", 0.9), ("values[i]", 0.9)], "values[i]"),
+    # A run of characters read differently is voted on as a whole
+    ([("print(total)", 0.95), ("print(tota1)", 0.4), ("print(total)", 0.5)], "print(total)"),
+])
+def test_alignment_of_insertions_and_deletions(candidates, expected):
+    assert fuse_lines(candidates)[0] == expected
+
+def test_lines_are_matched_to_the_reference_in_order():
+    readings = [
+        [("a = 1", 0.9), ("total = price", 0.9), ("print(total)", 0.9)],
+        # A missed line must not shift the later lines
+        [("a = 1", 0.8), ("print(total)", 0.8)],
+        [("a = l", 0.7), ("total = prlce", 0.8), ("print(tota1)", 0.6)],
+    ]
+    assert [text for text, _ in fuse_readings(readings)] == ["a = 1", "total = price", "print(total)"]
+    assert fuse_readings([[], []]) == []
+
+class FrameList:
+    # Stands in for cv2.VideoCapture
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+def test_every_consumed_frame_is_reported():
+    still = np.zeros((36, 64, 3), np.uint8)
+    changed = np.full((36, 64, 3), 255, np.uint8)
+    seen = []
+    read = lambda frame: [("x = 1", 0.9)]
+    # Two more frames every third frame; the second of them shows another scene and is not fused
+    text, _, consumed = read_fused(FrameList([still, still, still, still, still, changed]), still, read,
+                                   frames=3, spacing=3, on_frame=lambda offset, frame: seen.append(offset))
+    assert text == "x = 1"
+    assert consumed == 6 and seen == [1, 2, 3, 4, 5, 6]
+    seen.clear()
+    _, _, consumed = read_fused(FrameList([still, changed]), still, read, frames=3, spacing=2,
+                                on_frame=lambda offset, frame: seen.append(offset))
+    assert consumed == 2 and seen == [1, 2]
@@ -0,0 +1,73 @@
+import sys
+import types
+
+import pytest
+
+from text_stage_memo import TextStageMemo, normalize_ocr_text
+
+@pytest.fixture
+def stages(monkeypatch):
+    # The memo imports the text stages from ocr_extractor, which needs the OCR packages
+    calls = {"single": [], "batch": []}
+
+    def decide(text, reindent):
+        return None if text.startswith("prose") else ("Python", text.upper() if reindent else text)
+
+    def run_text_stages(text, reindent=True):
+        calls["single"].append(text)
+        return decide(text, reindent)
+
+    def run_text_stages_batch(texts, reindents):
+        calls["batch"].append(list(texts))
+        return [decide(text, reindent) for text, reindent in zip(texts, reindents)]
+
+    module = types.ModuleType("ocr_extractor")
+    module.run_text_stages = run_text_stages
+    module.run_text_stages_batch = run_text_stages_batch
+    monkeypatch.setitem(sys.modules, "ocr_extractor", module)
+    return calls
+
+def test_normalization():
+    assert normalize_ocr_text("\n\n  x = 1  \r\n    y = 2\t\n\n") == "  x = 1\n    y = 2"
+
+def test_hits_and_misses(stages):
+    memo = TextStageMemo()
+    assert memo.process("x = 1") == ("Python", "X = 1")
+    assert memo.process("x = 1  \n") == ("Python", "X = 1")  # Same text once normalized
+    assert memo.process("prose text") is None
+    assert memo.process("prose text") is None  # Rejections are remembered too
+    assert memo.process("x = 1", reindent=False) == ("Python", "x = 1")  # A different decision
+    assert stages["single"] == ["x = 1", "prose text", "x = 1"]
+    assert memo.stats() == {"hits": 2, "misses": 3, "hit_rate": 0.4, "entries": 3}
+
+def test_least_recently_used_entries_are_evicted(stages):
+    memo = TextStageMemo(max_entries=2)
+    memo.process("a = 1")
+    memo.process("b = 2")
+    memo.process("a = 1")  # Now the most recently used
+    memo.process("c = 3")
+    assert memo.stats()["entries"] == 2
+    memo.process("a = 1")
+    assert stages["single"] == ["a = 1", "b = 2", "c = 3"]
+    memo.process("b = 2")
+    assert stages["single"][-1] == "b = 2"
+
+def test_rules_version_is_part_of_the_key():
+    assert TextStageMemo(rules_version=1).key("x = 1") != TextStageMemo(rules_version=2).key("x = 1")
+
+def test_process_many_runs_only_new_texts_as_one_batch(stages):
+    memo = TextStageMemo()
+    memo.process("a = 1")
+    texts = ["a = 1", "b = 2", "prose here", "b = 2  ", "c = 3"]
+    decisions = memo.process_many(texts, [True, True, True, True, False])
+    assert decisions == [("Python", "A = 1"), ("Python", "B = 2"), None, ("Python", "B = 2"), ("Python", "c = 3")]
+    assert stages["batch"] == [["b = 2", "prose here", "c = 3"]]
+    # The known text and the repeat within the batch are hits
+    assert memo.stats()["hits"] == 2 and memo.stats()["misses"] == 4
+    assert memo.process_many(texts[:2], [True, True]) == decisions[:2]
+    assert len(stages["batch"]) == 1
+
+def test_process_many_keeps_the_bound(stages):
+    memo = TextStageMemo(max_entries=3)
+    memo.process_many([f"value_{number} = {number}" for number in range(10)], [True] * 10)
+    assert memo.stats()["entries"] == 3
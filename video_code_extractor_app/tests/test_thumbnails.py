@@ -0,0 +1,86 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from thumbnails import FrameIndex, ThumbnailCache, seek_frame, video_key
+
+FPS = 25
+FRAMES = 150
+
+def numbered_frame(number):
+    # The frame number in binary, one 8-pixel block per bit, readable after lossy encoding
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for bit in range(8):
+        if number >> bit & 1:
+            frame[:, bit * 8:bit * 8 + 8] = 255
+    return frame
+
+def frame_number_of(frame):
+    return sum(1 << bit for bit in range(8) if frame[24, bit * 8 + 4].mean() > 127)
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "lecture.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("No MJPG encoder")
+    for number in range(FRAMES):
+        writer.write(numbered_frame(number))
+    writer.release()
+    return path
+
+def index_video(path, directory, sampling_rate=FPS * 2):
+    index = FrameIndex(path)
+    cap = cv2.VideoCapture(path)
+    frame_number = 0
+    while cap.grab():
+        if frame_number % sampling_rate == 0:
+            index.add(frame_number, cap.get(cv2.CAP_PROP_POS_MSEC))
+        frame_number += 1
+    cap.release()
+    index.save(directory)
+
+def test_videos_with_the_same_name_get_different_keys(tmp_path, video):
+    other = tmp_path / "copy" / "lecture.avi"
+    other.parent.mkdir()
+    other.write_bytes(open(video, "rb").read())
+    assert video_key(video) != video_key(str(other))
+    assert video_key(video) == video_key(video)
+
+    os.utime(video, ns=(0, 0))
+    before = video_key(video)
+    os.utime(video, ns=(10**9, 10**9))
+    assert video_key(video) != before
+
+def test_seek_frame_returns_the_exact_frame(tmp_path, video):
+    directory = str(tmp_path / "thumbnails")
+    index_video(video, directory)
+    key = video_key(video)
+    for number in (0, 1, 49, 50, 51, 99, 120, FRAMES - 1):
+        assert frame_number_of(seek_frame(key, number, directory)) == number
+
+def test_seek_frame_refuses_a_changed_video(tmp_path, video):
+    directory = str(tmp_path / "thumbnails")
+    index_video(video, directory)
+    key = video_key(video)
+    with open(video, "ab") as f:
+        f.write(b"\0")
+    assert seek_frame(key, 10, directory) is None
+    assert seek_frame(None, 10, directory) is None
+
+def test_thumbnails_are_kept_per_video_and_evicted_least_recent_first(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "thumbnails"), max_bytes=10**9)
+    first = cache.put("a" * 16, 10, numbered_frame(10))
+    cache.put("b" * 16, 10, numbered_frame(20))
+    assert cache.get("a" * 16, 10) == first
+    assert cache.get("b" * 16, 10) != first
+    assert cache.get("c" * 16, 10) is None
+    assert cache.get(None, 10) is None
+
+    os.utime(first, (1, 1))  # Least recently used
+    cache.max_bytes = cache.total_bytes - 1
+    cache.put("c" * 16, 10, numbered_frame(30))
+    assert cache.get("a" * 16, 10) is None
+    assert cache.total_bytes <= cache.max_bytes
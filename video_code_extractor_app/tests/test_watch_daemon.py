@@ -0,0 +1,116 @@
+import json
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from database import ProcessedVideo, record_processed_video, session
+from watch_daemon import MAX_ATTEMPTS, WatchDaemon, source_fingerprint
+
+STABLE_SECONDS = 0.2
+
+class StoppedPool:
+    # Stands in for the process pool of a collect() call
+    def __init__(self):
+        self.shut_down = False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+def write_video(path, content=b"recording"):
+    path.write_bytes(content)
+    return str(path)
+
+@pytest.fixture
+def daemon(tmp_path):
+    watched = tmp_path / "incoming"
+    watched.mkdir()
+    return WatchDaemon([str(watched)], workers=2, status_path=str(tmp_path / "status.json"),
+                       stable_seconds=STABLE_SECONDS)
+
+def test_scan_waits_until_a_file_stops_changing(daemon, tmp_path):
+    video = write_video(tmp_path / "incoming" / "talk.mp4")
+    write_video(tmp_path / "incoming" / "notes.txt")
+    write_video(tmp_path / "incoming" / ".hidden.mp4")
+    assert daemon.scan() == []
+    assert list(daemon.stat_cache) == [video]
+    time.sleep(STABLE_SECONDS)
+    write_video(tmp_path / "incoming" / "talk.mp4", b"recording, still growing")
+    assert daemon.scan() == []  # Changed, so it waits again
+    time.sleep(STABLE_SECONDS)
+    assert daemon.scan() == [video]
+
+def test_handled_files_are_not_scanned_again_until_they_change(daemon, tmp_path):
+    video = write_video(tmp_path / "incoming" / "talk.mp4")
+    daemon.scan()
+    time.sleep(STABLE_SECONDS)
+    assert daemon.scan() == [video]
+    daemon.enqueue(video)
+    time.sleep(STABLE_SECONDS)
+    assert daemon.scan() == [] and daemon.scan() == []
+    (tmp_path / "incoming" / "talk.mp4").unlink()
+    daemon.scan()
+    assert daemon.handled == {}
+
+def test_ledger_skips_videos_processed_under_any_name(daemon, tmp_path):
+    video = write_video(tmp_path / "incoming" / "renamed.mp4", b"an already extracted recording")
+    fingerprint = source_fingerprint(video)
+    record_processed_video(fingerprint, "/elsewhere/original.mp4", 30, 4)
+    try:
+        daemon.scan()
+        time.sleep(STABLE_SECONDS)
+        for path in daemon.scan():
+            daemon.enqueue(path)
+        assert daemon.skipped == 1 and not daemon.queue
+        # A copy of a queued file is skipped too
+        write_video(tmp_path / "incoming" / "new.mp4", b"a new recording")
+        copy = write_video(tmp_path / "incoming" / "copy.mp4", b"a new recording")
+        daemon.scan()
+        time.sleep(STABLE_SECONDS)
+        for path in sorted(daemon.scan()):
+            daemon.enqueue(path)
+        assert [item[0] for item in daemon.queue] == [copy]
+        assert daemon.skipped == 2
+    finally:
+        session.query(ProcessedVideo).filter(ProcessedVideo.fingerprint == fingerprint).delete()
+        session.commit()
+
+def test_files_lost_to_a_broken_pool_are_requeued(daemon):
+    items = [(f"/videos/{name}.mp4", name, 10) for name in ("first", "second")]
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        pool = StoppedPool()
+        daemon.executor = pool
+        crashed, still_running = Future(), Future()
+        crashed.set_exception(BrokenProcessPool("worker died"))
+        daemon.running = {crashed: items[0], still_running: items[1]}
+        daemon.collect()
+        assert pool.shut_down and daemon.executor is None and daemon.running == {}
+        if attempt < MAX_ATTEMPTS:
+            # Both go back to the front of the queue, in their order
+            assert list(daemon.queue) == items
+            assert daemon.attempts == {"first": attempt, "second": attempt}
+            daemon.queue.clear()
+    assert not daemon.queue and not daemon.attempts
+    assert [failure["path"] for failure in daemon.failures] == [item[0] for item in items]
+
+def test_status_file(daemon, tmp_path):
+    daemon.queue.append(("/videos/queued.mp4", "queued", 10))
+    done = Future()
+    done.set_result({"new_snippets": 3, "frames": 600, "seconds": 20.0})
+    failed = Future()
+    failed.set_exception(ValueError("unreadable video"))
+    daemon.running = {done: ("/videos/done.mp4", "done", 2**20), failed: ("/videos/bad.mp4", "bad", 10)}
+    try:
+        daemon.collect()
+        daemon.write_status()
+        with open(tmp_path / "status.json") as f:
+            status = json.load(f)
+    finally:
+        session.query(ProcessedVideo).filter(ProcessedVideo.fingerprint == "done").delete()
+        session.commit()
+    assert status["queued"] == ["/videos/queued.mp4"] and status["queue_depth"] == 1
+    assert status["completed"] == 1 and status["failed"] == 1
+    assert status["recent_failures"] == [{"path": "/videos/bad.mp4", "error": "unreadable video"}]
+    assert status["throughput"]["frames_per_second"] == 30.0
+    assert not (tmp_path / "status.json.tmp").exists()
@@ -0,0 +1,182 @@
+"""Memo of the text stages' decision for OCR texts seen before.
+
+A static scene yields the same OCR text on many sampled frames, and each
+copy went through cleanup, classification, language detection and
+formatting again. TextStageMemo keeps the final decision for recently seen
+texts in a bounded LRU: None if the text was rejected, otherwise
+(language, formatted code). Keys are digests of the normalized text, the
+formatting mode and RULES_VERSION, so stored decisions never outlive the
+rules that made them.
+
+    python text_stage_memo.py reclassify
+
+runs the stored snippets through the text stages again, through the memo.
+"""
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+
+# Bump whenever cleanup, classification, language detection or formatting rules change
+RULES_VERSION = 3
+# Decisions kept; a decision holds at most one formatted snippet
+MEMO_ENTRIES = 4096
+
+def normalize_ocr_text(text):
+    """OCR text with line endings, trailing spaces and surrounding blank lines normalized.
+
+    Leading whitespace is kept, since line OCR rebuilds indentation from it.
+    """
+    lines = [line.rstrip() for line in text.replace("\r\n", "\n").split("\n")]
+    return "\n".join(lines).strip("\n")
+
+class TextStageMemo:
+    """Bounded LRU of text stage decisions with hit and miss counters"""
+    def __init__(self, max_entries=MEMO_ENTRIES, rules_version=RULES_VERSION):
+        self.max_entries = max_entries
+        self.rules_version = rules_version
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text, reindent=True):
+        payload = f"{self.rules_version}\0{int(reindent)}\0{text}"
+        return hashlib.sha1(payload.encode("utf-8")).digest()
+
+    def process(self, text, reindent=True):
+        """The text stages' decision for OCR text: None if rejected, else (language, formatted code)."""
+        from ocr_extractor import run_text_stages
+
+        text = normalize_ocr_text(text)
+        key = self.key(text, reindent)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        # Computed outside the lock; two threads may compute the same text, with the same result
+        decision = run_text_stages(text, reindent)
+        with self.lock:
+            self.entries[key] = decision
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return decision
+
+    def process_many(self, texts, reindents):
+        """process() for many texts, with reindents[i] for texts[i]; texts not yet decided are run as a batch."""
+        from ocr_extractor import run_text_stages_batch
+
+        texts = [normalize_ocr_text(text) for text in texts]
+        keys = [self.key(text, reindent) for text, reindent in zip(texts, reindents)]
+        missing = {}  # Key -> index of its first text
+        with self.lock:
+            for index, key in enumerate(keys):
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                elif key in missing:
+                    self.hits += 1  # Decided by the batch, like a repeat seen after it
+                else:
+                    missing[key] = index
+                    self.misses += 1
+            decided = {key: self.entries[key] for key in keys if key in self.entries}
+        if missing:
+            indexes = list(missing.values())
+            decisions = run_text_stages_batch([texts[index] for index in indexes],
+                                              [reindents[index] for index in indexes])
+            with self.lock:
+                for key, decision in zip(missing, decisions):
+                    decided[key] = self.entries[key] = decision
+                    self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return [decided[key] for key in keys]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Hit and miss counts, hit rate and size of the memo."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries)
+            }
+
+_memo = None
+_memo_lock = threading.Lock()
+
+def get_text_stage_memo():
+    """The process-wide memo, created on first use."""
+    global _memo
+    with _memo_lock:
+        if _memo is None:
+            _memo = TextStageMemo()
+        return _memo
+
+def reclassify_stored_snippets(language=None, batch_size=500, progress_callback=None):
+    """Run stored snippets through the text stages again, e.g. after a rules upgrade.
+
+    Snippets whose language or formatted code changed are updated; snippets
+    the stages now reject are only counted, never deleted. Identical code
+    stored many times is processed once, through the memo. Snippets stored
+    with reindent=False keep their indentation. progress_callback
+    receives (snippets done, total). Returns {"relabelled", "reformatted",
+    "rejected"} counts.
+    """
+    from database import CodeSnippet, session, iter_snippets_with_code, update_snippet_codes
+
+    memo = get_text_stage_memo()
+    query = session.query(CodeSnippet.id).order_by(CodeSnippet.id)
+    if language:
+        query = query.filter(CodeSnippet.language == language)
+    snippet_ids = [snippet_id for snippet_id, in query]
+    counts = {"relabelled": 0, "reformatted": 0, "rejected": 0}
+    pairs = iter_snippets_with_code(snippet_ids, batch_size)
+    done = 0
+    while True:
+        # Classified together; see TextStageMemo.process_many
+        batch = list(itertools.islice(pairs, batch_size))
+        if not batch:
+            break
+        decisions = memo.process_many([code for _, code in batch], [snippet.reindent for snippet, _ in batch])
+        new_languages = {}
+        new_codes = {}
+        for (snippet, code), decision in zip(batch, decisions):
+            if decision is None:
+                counts["rejected"] += 1
+                continue
+            new_language, formatted = decision
+            if new_language != snippet.language:
+                new_languages[snippet.id] = new_language
+            if formatted != code:
+                new_codes[snippet.id] = formatted
+        for snippet_id, new_language in new_languages.items():
+            session.query(CodeSnippet).filter(CodeSnippet.id == snippet_id).one().language = new_language
+        session.commit()
+        counts["relabelled"] += len(new_languages)
+        counts["reformatted"] += update_snippet_codes(new_codes) if new_codes else 0
+        done += len(batch)
+        if progress_callback:
+            progress_callback(done, len(snippet_ids))
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run stored snippets through the text stages again")
+    parser.add_argument("command", choices=["reclassify"])
+    parser.add_argument("--language", help="Only reclassify snippets of this language")
+    args = parser.parse_args()
+    counts = reclassify_stored_snippets(args.language)
+    stats = get_text_stage_memo().stats()
+    print(f"Relabelled {counts['relabelled']}, reformatted {counts['reformatted']}, "
+          f"{counts['rejected']} no longer classified as code")
+    print(f"Memo: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})")
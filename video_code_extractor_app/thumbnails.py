@@ -0,0 +1,208 @@
+"""On-disk thumbnail cache and frame index for snippet previews.
+
+Extraction stores a small JPEG of the frame (or frame region) every new
+snippet was read from, keyed by video and frame number. Videos are keyed by
+video_key(), so two videos with the same file name do not share
+thumbnails; snippets remember the key of the video they were read from.
+The cache directory is bounded in size; the least recently used thumbnails
+are evicted first.
+
+For full-resolution previews every video also gets a frame index that maps
+the sampled frame numbers to the presentation timestamps reported while
+decoding them. OpenCV does not expose keyframe flags, so this is not a
+keyframe index: seek_frame jumps to the closest indexed timestamp at or
+before the wanted frame (the decoder starts from the preceding keyframe
+itself), checks by frame number where it landed and decodes forward from
+there, instead of decoding the video from the start.
+"""
+import bisect
+import hashlib
+import json
+import os
+import threading
+
+import cv2
+
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_MAX_BYTES = 64 * 1024 * 1024
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 70
+
+def video_key(video_path):
+    """Short digest identifying a video file by its absolute path, size and modification time."""
+    stat = os.stat(video_path)
+    identity = f"{os.path.abspath(video_path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+class ThumbnailCache:
+    """Size-bounded directory of JPEG thumbnails keyed by (video key, frame number)"""
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=THUMBNAIL_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".jpg")
+        )
+
+    def path_for(self, key, frame_number):
+        return os.path.join(self.directory, f"{key}_{frame_number}.jpg")
+
+    def put(self, key, frame_number, frame, region=None):
+        """Store a thumbnail of frame, cropped to region (x, y, width, height) if given."""
+        if region is not None:
+            x, y, width, height = region
+            frame = frame[y:y + height, x:x + width]
+        height, width = frame.shape[:2]
+        if width > THUMBNAIL_WIDTH:
+            frame = cv2.resize(frame, (THUMBNAIL_WIDTH, max(1, height * THUMBNAIL_WIDTH // width)),
+                               interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY])
+        if not ok:
+            return None
+        
+        path = self.path_for(key, frame_number)
+        with self.lock:
+            if os.path.exists(path):
+                self.total_bytes -= os.path.getsize(path)
+            # Write under a temporary name so readers never see a partial file
+            with open(path + ".tmp", "wb") as f:
+                f.write(encoded.tobytes())
+            os.replace(path + ".tmp", path)
+            self.total_bytes += len(encoded)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def get(self, key, frame_number):
+        """Path of the cached thumbnail, or None if there is none."""
+        if key is None:
+            return None  # Snippet stored before videos were keyed
+        path = self.path_for(key, frame_number)
+        try:
+            os.utime(path)  # The modification time doubles as the last use
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _evict(self):
+        """Remove least recently used thumbnails until the cache is below 90% of its limit."""
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        target = self.max_bytes * 0.9
+        for entry in entries:
+            if self.total_bytes <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self.total_bytes -= size
+
+class FrameIndex:
+    """Presentation timestamps of sampled frames of one video, for fast seeking"""
+    def __init__(self, video_path, frame_numbers=None, positions_msec=None):
+        self.video_path = video_path
+        self.frame_numbers = frame_numbers or []
+        self.positions_msec = positions_msec or []
+
+    def add(self, frame_number, position_msec):
+        """Record a decoded frame; frames must be added in increasing order."""
+        if self.frame_numbers and frame_number <= self.frame_numbers[-1]:
+            return
+        self.frame_numbers.append(frame_number)
+        self.positions_msec.append(position_msec)
+
+    def seek_point(self, frame_number):
+        """(frame number, position in ms) of the closest indexed frame at or before frame_number"""
+        index = bisect.bisect_right(self.frame_numbers, frame_number) - 1
+        if index < 0:
+            return 0, 0.0
+        return self.frame_numbers[index], self.positions_msec[index]
+
+    def save(self, directory=THUMBNAIL_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = index_path(video_key(self.video_path), directory)
+        with open(path + ".tmp", "w") as f:
+            json.dump({
+                "video_path": os.path.abspath(self.video_path),
+                "frame_numbers": self.frame_numbers,
+                "positions_msec": self.positions_msec
+            }, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, key, directory=THUMBNAIL_DIR):
+        """Index saved for a video key, or None if the video was never indexed."""
+        if key is None:
+            return None
+        try:
+            with open(index_path(key, directory)) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return cls(data["video_path"], data["frame_numbers"], data["positions_msec"])
+
+def index_path(key, directory=THUMBNAIL_DIR):
+    return os.path.join(directory, f"{key}.index.json")
+
+def seek_to_frame(cap, frame_number):
+    """Position cap so the next read returns frame_number; returns the frame number reached.
+
+    Seeking by frame number can land on a nearby frame for some codecs; the
+    position is checked and frames are skipped forward to the exact frame.
+    """
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position > frame_number:
+        # Overshot; decode forward from the start instead
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        position = 0
+    while position < frame_number and cap.grab():
+        position += 1
+    return position
+
+def seek_frame(key, frame_number, directory=THUMBNAIL_DIR):
+    """Decode one full-resolution frame of an indexed video, or return None.
+
+    None is also returned if the video changed since it was indexed.
+    """
+    index = FrameIndex.load(key, directory)
+    if index is None or not os.path.exists(index.video_path) or video_key(index.video_path) != key:
+        return None
+    cap = cv2.VideoCapture(index.video_path)
+    if not cap.isOpened():
+        return None
+    try:
+        start_frame, position_msec = index.seek_point(frame_number)
+        position = 0
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_MSEC, position_msec)
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            if position != start_frame:
+                # Timestamps and frame numbers disagree (variable frame rate, broken
+                # timestamps); seek by frame number, which checks where it lands
+                position = seek_to_frame(cap, frame_number)
+        # grab() skips decoding into an image for the frames in between
+        while position < frame_number:
+            if not cap.grab():
+                return None
+            position += 1
+        ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
+
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+def get_thumbnail_cache():
+    """The shared thumbnail cache, created on first use."""
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
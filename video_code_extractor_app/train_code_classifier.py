@@ -0,0 +1,492 @@
+"""Offline training and benchmarking of the code-versus-prose classifier.
+
+The corpus is built from local files: code from the Python standard
+library (plus any --code-dir), prose from standard library docstrings and
+the pydoc topic help (plus any --prose-dir). The standard library has no
+SQL, HTML or CSS and no slide text, so those are generated (see
+synthetic_samples): queries, markup and style sheets from templates, and
+slides and editor chrome from title-and-bullet layouts around phrases cut
+from the prose. Samples are cut to the size of an OCR capture and half of
+them lose their indentation, as EasyOCR's detail=0 output does. Files (and
+generated samples) are split between training and test sets, so the
+benchmark never scores text from a file the model was trained on. The
+benchmark reports recall per language and the share of each kind of prose
+taken for code.
+
+    python train_code_classifier.py train [--code-dir DIR] [--prose-dir DIR]
+    python train_code_classifier.py benchmark
+"""
+import argparse
+import ast
+import hashlib
+import os
+import random
+import re
+import sysconfig
+import time
+
+import numpy as np
+
+from code_classifier import CodeClassifier, CLASSIFIER_FILE, DEFAULT_THRESHOLD
+
+LANGUAGES_BY_EXTENSION = {
+    ".py": "Python", ".js": "JavaScript", ".css": "CSS", ".html": "HTML", ".sql": "SQL", ".java": "Java",
+    ".c": "C++", ".cpp": "C++", ".h": "C++",
+}
+CODE_EXTENSIONS = tuple(LANGUAGES_BY_EXTENSION)
+PROSE_EXTENSIONS = (".txt", ".md", ".rst")
+SEED = 1234
+# Generated samples per kind (SQL, HTML, CSS, slides, editor chrome)
+SYNTHETIC_SAMPLES = 1500
+
+def legacy_is_code_snippet(text):
+    """The regex heuristics is_code_snippet used before the classifier, for comparison."""
+    if len(text) < 20:
+        return False
+    lines = text.splitlines()
+    if len(lines) < 2:
+        return False
+    code_indicators = [
+        r"def\s+\w+\s*\(", r"class\s+\w+", r"function\s+\w+",
+        r"import\s+\w+", r"from\s+\w+\s+import", r"var\s+\w+\s*=",
+        r"let\s+\w+\s*=", r"const\s+\w+\s*=", r"if\s*\(", r"for\s*\(",
+        r"while\s*\(", r"{\s*\n", r"}\s*\n", r"<\w+>.*</\w+>",
+        r"#include", r"public\s+class", r"private\s+\w+\s+\w+\(",
+        r"@Override", r"int\s+\w+\s*\(", r"void\s+\w+\s*\(",
+        r"print\(", r"return\s", r"==", r"!=", r"->", r"=>",
+        r"//", r"#", r"/\*", r"\*/", r"'''", r'"""'
+    ]
+    indented_lines = sum(1 for line in lines if re.match(r"^\s{2,}.*$", line))
+    code_symbols = ["{", "}", "[", "]", "(", ")", ";", "=", "==", "!=", ">=", "<=", "+=", "-=", "*=", "/="]
+    symbol_count = sum(text.count(symbol) for symbol in code_symbols)
+    avg_line_length = sum(len(line) for line in lines) / len(lines)
+    if indented_lines >= 2 or symbol_count > 5:
+        return True
+    for pattern in code_indicators:
+        if re.search(pattern, text):
+            return True
+    return 10 <= avg_line_length <= 80
+
+def _is_test_file(path):
+    """Deterministic 20% of files held out for the benchmark."""
+    return hashlib.sha1(path.encode("utf-8")).digest()[0] < 51
+
+def _files(directories, extensions, limit):
+    paths = []
+    for directory in directories:
+        for root, _, names in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in names if name.endswith(extensions))
+    paths.sort()
+    random.Random(SEED).shuffle(paths)
+    return paths[:limit]
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def _python_code_lines(source):
+    """Lines of a Python file without its docstrings, which are prose."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    skipped = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Expr) and isinstance(getattr(node, "value", None), ast.Constant) \
+                and isinstance(node.value.value, str):
+            skipped.update(range(node.lineno, node.end_lineno + 1))
+    return [line for number, line in enumerate(source.splitlines(), 1) if number not in skipped]
+
+def _docstring_paragraphs(source):
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    paragraphs = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            docstring = ast.get_docstring(node)
+            if docstring:
+                paragraphs.extend(docstring.split("\n\n"))
+    return paragraphs
+
+def _string_constants(source):
+    """Long string constants of a Python file, e.g. the help texts in pydoc_data/topics.py."""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    return [node.value for node in ast.walk(tree)
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and len(node.value) > 200]
+
+def _prose_paragraphs(text):
+    """Paragraphs of running text, without code blocks or examples."""
+    text = re.sub(r"```.*?```", "", text, flags=re.DOTALL)
+    return text.split("\n\n")
+
+def _is_prose(paragraph):
+    lines = [line for line in paragraph.splitlines() if line.strip()]
+    if len(lines) < 2:
+        return False
+    # Indented lines are examples or tables, doctests are code
+    return not any(line.startswith((" ", "\t", ">>>", "...")) for line in lines) and \
+        sum(len(line) for line in lines) > 60
+
+def _chunks(lines, rng, count):
+    """Up to count windows of 2 to 15 consecutive non-blank-ish lines."""
+    chunks = []
+    if len(lines) < 2:
+        return chunks
+    for _ in range(count):
+        size = rng.randint(2, 15)
+        start = rng.randrange(0, max(1, len(lines) - size))
+        window = lines[start:start + size]
+        if sum(1 for line in window if line.strip()) >= 2:
+            chunks.append("\n".join(window))
+    return chunks
+
+def _as_ocr_output(text, rng):
+    """Roughly what OCR returns: half the samples lose indentation and blank lines."""
+    if rng.random() < 0.5:
+        text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+    return text.strip()
+
+# Material for the generated samples
+_TABLES = {
+    "users": ["id", "name", "email", "created_at", "is_active", "country"],
+    "orders": ["id", "user_id", "total", "status", "created_at", "shipped_at"],
+    "products": ["id", "name", "price", "category_id", "stock", "sku"],
+    "order_items": ["order_id", "product_id", "quantity", "unit_price"],
+    "categories": ["id", "name", "parent_id"],
+    "employees": ["id", "first_name", "last_name", "salary", "department_id", "hire_date", "manager_id"],
+    "departments": ["id", "name", "budget", "location"],
+    "posts": ["id", "author_id", "title", "body", "published", "views"],
+    "comments": ["id", "post_id", "author_id", "content", "created_at"],
+    "students": ["id", "name", "grade", "class_id", "enrolled_on"],
+}
+_SQL_TYPES = ["INTEGER", "INT", "VARCHAR(255)", "VARCHAR(100)", "TEXT", "DECIMAL(10, 2)", "DATE", "TIMESTAMP",
+              "BOOLEAN", "SERIAL", "REAL"]
+_SQL_AGGREGATES = ["COUNT(*)", "SUM({c})", "AVG({c})", "MAX({c})", "MIN({c})", "COUNT(DISTINCT {c})"]
+_HTML_WORDS = ("home about contact blog products services pricing login sign up docs getting started news "
+               "welcome to our site learn more read the tutorial download now your account settings profile "
+               "first name last name email password submit search results previous next page").split()
+_CSS_PROPERTIES = {
+    "color": ["#333", "#fff", "red", "rgb(0, 0, 0)", "#1e90ff", "inherit"],
+    "background-color": ["#f5f5f5", "white", "transparent", "#222", "rgba(0, 0, 0, 0.5)"],
+    "margin": ["0", "0 auto", "10px", "1rem 0", "20px 10px"],
+    "padding": ["0", "8px 16px", "1em", "12px", "4px"],
+    "display": ["flex", "block", "grid", "none", "inline-block"],
+    "font-size": ["14px", "1.2rem", "2em", "16px", "small"],
+    "font-weight": ["bold", "400", "600", "normal"],
+    "border": ["none", "1px solid #ccc", "2px dashed red"],
+    "border-radius": ["4px", "50%", "8px"],
+    "width": ["100%", "50px", "auto", "300px", "calc(100% - 20px)"],
+    "height": ["auto", "100vh", "40px"],
+    "justify-content": ["center", "space-between", "flex-start"],
+    "align-items": ["center", "stretch"],
+    "position": ["relative", "absolute", "fixed", "sticky"],
+    "text-align": ["center", "left", "right"],
+    "transition": ["all 0.3s ease", "opacity 200ms"],
+    "grid-template-columns": ["repeat(3, 1fr)", "1fr 2fr"],
+}
+_CSS_SELECTORS = ["body", "h1", "p", "a", "a:hover", ".container", ".btn", ".btn-primary", "#header", "nav ul li",
+                  ".card .title", "footer", "img", "input[type=text]", ".grid > div", "button:focus", "*", "html",
+                  ".menu-item.active", "table td", "::selection", ".sidebar"]
+_SLIDE_MARKERS = ["", "• ", "- ", "* ", "> ", "o "]
+_SLIDE_TITLES = ["Agenda", "Overview", "Summary", "Key Takeaways", "Learning Objectives", "Prerequisites",
+                 "What You Will Learn", "Recap", "Next Steps", "Questions?", "Exercise", "Homework", "Introduction",
+                 "Part 2: Models and Views", "Why Use a Database?", "Setting Up Your Environment", "Best Practices"]
+_UI_LINES = ["File  Edit  Selection  View  Go  Run  Terminal  Help", "EXPLORER", "OPEN EDITORS", "OUTLINE",
+             "TIMELINE", "PROBLEMS  OUTPUT  DEBUG CONSOLE  TERMINAL", "Ln 12, Col 4  Spaces: 4  UTF-8  LF  Python",
+             "Subscribe", "Like and subscribe for more tutorials", "Share  Save  Clip", "Up next", "Autoplay",
+             "Search or jump to...", "Pull requests  Issues  Marketplace  Explore", "Sign in", "Watch later",
+             "Chapter 3 of 12", "Loading...", "Do you want to save the changes you made?", "Don't Save  Cancel  Save",
+             "1 file changed, 3 insertions", "Connected to Wi-Fi", "Settings", "Extensions: Marketplace"]
+
+def _sql_keyword(rng, keyword):
+    return keyword.lower() if rng.random() < 0.25 else keyword
+
+def _sql_sample(rng):
+    table = rng.choice(list(_TABLES))
+    columns = _TABLES[table]
+    kind = rng.random()
+    if kind < 0.5:
+        alias = table[0]
+        selected = rng.sample(columns, rng.randint(1, min(4, len(columns))))
+        lines = [_sql_keyword(rng, "SELECT") + " " + ", ".join(f"{alias}.{column}" for column in selected)]
+        lines.append(f"{_sql_keyword(rng, 'FROM')} {table} {alias}")
+        if rng.random() < 0.6:
+            other = rng.choice([name for name in _TABLES if name != table])
+            join = rng.choice(["JOIN", "INNER JOIN", "LEFT JOIN", "LEFT OUTER JOIN"])
+            lines.append(f"{_sql_keyword(rng, join)} {other} {other[0]}2 ON {other[0]}2.{rng.choice(_TABLES[other])} "
+                         f"= {alias}.{rng.choice(columns)}")
+        if rng.random() < 0.7:
+            condition = rng.choice(["{a}.{c} > {n}", "{a}.{c} = '{w}'", "{a}.{c} IS NOT NULL",
+                                    "{a}.{c} BETWEEN {n} AND {m}", "{a}.{c} IN ({n}, {m})", "{a}.{c} LIKE '%{w}%'"])
+            lines.append(_sql_keyword(rng, "WHERE") + " " + condition.format(
+                a=alias, c=rng.choice(columns), n=rng.randint(0, 100), m=rng.randint(100, 999), w=rng.choice(_HTML_WORDS)))
+        if rng.random() < 0.5:
+            group = rng.choice(columns)
+            lines[0] += ", " + rng.choice(_SQL_AGGREGATES).format(c=f"{alias}.{rng.choice(columns)}")
+            lines.append(f"{_sql_keyword(rng, 'GROUP BY')} {alias}.{group}")
+            if rng.random() < 0.5:
+                lines.append(f"{_sql_keyword(rng, 'HAVING')} COUNT(*) > {rng.randint(1, 10)}")
+        if rng.random() < 0.5:
+            lines.append(f"{_sql_keyword(rng, 'ORDER BY')} {alias}.{rng.choice(columns)} {rng.choice(['DESC', 'ASC', ''])}".rstrip())
+        if rng.random() < 0.3:
+            lines.append(f"{_sql_keyword(rng, 'LIMIT')} {rng.randint(1, 100)}")
+        lines[-1] += ";"
+        if rng.random() < 0.3:
+            lines = [line if index == 0 else "  " + line for index, line in enumerate(lines)]
+        return "\n".join(lines)
+    if kind < 0.7:
+        lines = [f"{_sql_keyword(rng, 'CREATE TABLE')} {table} ("]
+        for index, column in enumerate(columns):
+            ddl = "INTEGER PRIMARY KEY" if column == "id" else rng.choice(_SQL_TYPES)
+            if rng.random() < 0.3 and column != "id":
+                ddl += rng.choice([" NOT NULL", " UNIQUE", " DEFAULT 0", " DEFAULT CURRENT_TIMESTAMP"])
+            lines.append(f"    {column} {ddl}" + ("," if index < len(columns) - 1 else ""))
+        lines.append(");")
+        return "\n".join(lines)
+    if kind < 0.85:
+        chosen = columns[1:rng.randint(2, len(columns))]
+        rows = []
+        for _ in range(rng.randint(1, 4)):
+            rows.append("(" + ", ".join(rng.choice([str(rng.randint(1, 500)), f"'{rng.choice(_HTML_WORDS)}'", "NULL"])
+                                        for _ in chosen) + ")")
+        return (f"{_sql_keyword(rng, 'INSERT INTO')} {table} ({', '.join(chosen)})\n{_sql_keyword(rng, 'VALUES')} "
+                + ",\n       ".join(rows) + ";")
+    column = rng.choice(columns[1:])
+    if rng.random() < 0.5:
+        return (f"{_sql_keyword(rng, 'UPDATE')} {table}\n{_sql_keyword(rng, 'SET')} {column} = {rng.randint(0, 99)}\n"
+                f"{_sql_keyword(rng, 'WHERE')} id = {rng.randint(1, 999)};")
+    return f"{_sql_keyword(rng, 'DELETE FROM')} {table}\n{_sql_keyword(rng, 'WHERE')} {column} < {rng.randint(1, 99)};"
+
+def _html_words(rng, low=1, high=4):
+    return " ".join(rng.choice(_HTML_WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+def _html_element(rng, depth):
+    """Lines of a random HTML element, indented by depth."""
+    indent = "  " * depth
+    kind = rng.random() if depth < 3 else 1.0
+    if kind < 0.2:
+        items = [f'{indent}  <li><a href="/{rng.choice(_HTML_WORDS)}">{_html_words(rng)}</a></li>'
+                 for _ in range(rng.randint(2, 5))]
+        tag = rng.choice(["ul", "ol"])
+        return [f"{indent}<{tag}>"] + items + [f"{indent}</{tag}>"]
+    if kind < 0.4:
+        tag = rng.choice(["div", "section", "main", "article", "nav", "header", "footer"])
+        attribute = rng.choice(["", f' class="{rng.choice(_HTML_WORDS)}"', f' id="{rng.choice(_HTML_WORDS)}"'])
+        children = [line for _ in range(rng.randint(1, 3)) for line in _html_element(rng, depth + 1)]
+        return [f"{indent}<{tag}{attribute}>"] + children + [f"{indent}</{tag}>"]
+    if kind < 0.55:
+        fields = []
+        for _ in range(rng.randint(1, 3)):
+            name = rng.choice(["email", "name", "password", "search", "username"])
+            fields.append(f'{indent}  <label for="{name}">{name.capitalize()}</label>')
+            fields.append(f'{indent}  <input type="{rng.choice(["text", "email", "password"])}" id="{name}" name="{name}">')
+        fields.append(f'{indent}  <button type="submit">{_html_words(rng, 1, 2)}</button>')
+        return [f'{indent}<form action="/{rng.choice(_HTML_WORDS)}" method="{rng.choice(["post", "get"])}">'] + fields + [f"{indent}</form>"]
+    if kind < 0.65:
+        rows = [f"{indent}  <tr>" + "".join(f"<td>{_html_words(rng, 1, 2)}</td>" for _ in range(3)) + "</tr>"
+                for _ in range(rng.randint(1, 3))]
+        return [f"{indent}<table>", f"{indent}  <tr><th>Name</th><th>Price</th><th>Stock</th></tr>"] + rows + [f"{indent}</table>"]
+    if kind < 0.72:
+        return [f'{indent}<img src="images/{rng.choice(_HTML_WORDS)}.png" alt="{_html_words(rng)}">']
+    tag = rng.choice(["p", "h1", "h2", "h3", "span", "a", "p", "button"])
+    attribute = f' href="#{rng.choice(_HTML_WORDS)}"' if tag == "a" else ""
+    return [f"{indent}<{tag}{attribute}>{_html_words(rng, 2, 8)}</{tag}>"]
+
+def _html_sample(rng):
+    if rng.random() < 0.2:
+        lines = ["<!DOCTYPE html>", '<html lang="en">', "<head>", '  <meta charset="UTF-8">',
+                 f"  <title>{_html_words(rng)}</title>", '  <link rel="stylesheet" href="style.css">', "</head>", "<body>"]
+        lines += [line for _ in range(rng.randint(1, 2)) for line in _html_element(rng, 1)]
+        return "\n".join(lines + ["</body>", "</html>"])
+    return "\n".join(line for _ in range(rng.randint(1, 3)) for line in _html_element(rng, 0))
+
+def _css_sample(rng):
+    rules = []
+    for _ in range(rng.randint(1, 4)):
+        selector = ", ".join(rng.sample(_CSS_SELECTORS, rng.randint(1, 2)))
+        declarations = [f"  {name}: {rng.choice(values)};"
+                        for name, values in rng.sample(list(_CSS_PROPERTIES.items()), rng.randint(1, 5))]
+        rules.append("\n".join([selector + " {"] + declarations + ["}"]))
+    text = "\n\n".join(rules)
+    if rng.random() < 0.15:
+        text = f"@media (max-width: {rng.choice([480, 768, 1024])}px) {{\n{text}\n}}"
+    return text
+
+def _phrase(rng, phrases):
+    words = rng.choice(phrases).split()
+    start = rng.randrange(0, max(1, len(words) - 3))
+    phrase = " ".join(words[start:start + rng.randint(2, 9)]).strip(".,;:")
+    return phrase[:1].upper() + phrase[1:]
+
+def _slide_sample(rng, phrases):
+    """Slide text: a title and short bullets, as OCR reads lecture slides."""
+    marker = rng.choice(_SLIDE_MARKERS)
+    title = rng.choice(_SLIDE_TITLES) if rng.random() < 0.6 else _phrase(rng, phrases)
+    bullets = []
+    for number in range(1, rng.randint(3, 7)):
+        prefix = f"{number}. " if marker == "" and rng.random() < 0.3 else marker
+        bullets.append(prefix + _phrase(rng, phrases))
+        if rng.random() < 0.2:
+            bullets.append("   " + rng.choice(["- ", "o ", ""]) + _phrase(rng, phrases))
+    return "\n".join([title] + bullets)
+
+def _chrome_sample(rng, phrases):
+    """Editor and video player text around the code: menus, tabs, status bars, captions."""
+    lines = rng.sample(_UI_LINES, rng.randint(2, 4))
+    lines.insert(rng.randrange(len(lines) + 1), _phrase(rng, phrases))
+    return "\n".join(lines)
+
+def synthetic_samples(rng, phrases, count=SYNTHETIC_SAMPLES):
+    """(kind, text, label) of generated SQL, HTML and CSS code and slide and editor chrome prose.
+
+    phrases are prose sentences the slide bullets are cut from.
+    """
+    generators = [("SQL", _sql_sample, 1), ("HTML", _html_sample, 1), ("CSS", _css_sample, 1)]
+    samples = [(kind, generate(rng), label) for kind, generate, label in generators for _ in range(count)]
+    if phrases:
+        samples += [("slides", _slide_sample(rng, phrases), 0) for _ in range(count)]
+        samples += [("editor chrome", _chrome_sample(rng, phrases), 0) for _ in range(count)]
+    return samples
+
+def build_corpus(code_dirs, prose_dirs, max_files=3000, chunks_per_file=4, synthetic_count=SYNTHETIC_SAMPLES):
+    """(train, test) sample sets, each (texts, labels, kinds); label 1 is code.
+
+    A code sample's kind is its language, a prose sample's "prose",
+    "slides" or "editor chrome".
+    """
+    rng = random.Random(SEED)
+    samples = {True: ([], [], []), False: ([], [], [])}  # test? -> (texts, labels, kinds)
+    phrases = []
+
+    def add(split_key, text, label, kind):
+        text = _as_ocr_output(text, rng)
+        if len(text) >= 20:
+            texts, labels, kinds = samples[_is_test_file(split_key)]
+            texts.append(text)
+            labels.append(label)
+            kinds.append(kind)
+
+    prose_roots = tuple(os.path.join(os.path.abspath(directory), "") for directory in prose_dirs)
+    for path in _files(code_dirs, CODE_EXTENSIONS, max_files):
+        if os.path.abspath(path).startswith(prose_roots):
+            continue
+        source = _read(path)
+        if source is None:
+            continue
+        lines = _python_code_lines(source) if path.endswith(".py") else source.splitlines()
+        language = LANGUAGES_BY_EXTENSION[os.path.splitext(path)[1]]
+        for chunk in _chunks(lines or [], rng, chunks_per_file):
+            add(path, chunk, 1, language)
+        if path.endswith(".py"):
+            for paragraph in _docstring_paragraphs(source):
+                if _is_prose(paragraph):
+                    add(path, paragraph, 0, "prose")
+                    phrases.append(" ".join(paragraph.split()))
+
+    for path in _files(prose_dirs, PROSE_EXTENSIONS + (".py",), max_files):
+        text = _read(path)
+        if text is None:
+            continue
+        if path.endswith(".py"):
+            # pydoc_data/topics.py keeps the documentation as string constants
+            text = "\n\n".join(_string_constants(text))
+        for number, paragraph in enumerate(_prose_paragraphs(text)):
+            if _is_prose(paragraph):
+                # Split by paragraph, since single documents such as topics.py are large
+                lines = paragraph.splitlines()
+                start = rng.randrange(0, max(1, len(lines) - 15))
+                add(f"{path}:{number}", "\n".join(lines[start:start + 15]), 0, "prose")
+
+    for number, (kind, text, label) in enumerate(synthetic_samples(rng, phrases, synthetic_count)):
+        add(f"synthetic:{number}", text, label, kind)
+    return samples[False], samples[True]
+
+def default_dirs():
+    stdlib = sysconfig.get_paths()["stdlib"]
+    return [stdlib], [os.path.join(stdlib, "pydoc_data")]
+
+def _scores(predictions, labels):
+    predictions = np.asarray(predictions, dtype=bool)
+    labels = np.asarray(labels, dtype=bool)
+    true_positives = np.sum(predictions & labels)
+    precision = true_positives / max(predictions.sum(), 1)
+    recall = true_positives / max(labels.sum(), 1)
+    accuracy = np.mean(predictions == labels)
+    return precision, recall, accuracy
+
+def benchmark(classifier, texts, labels, kinds, threshold=None):
+    """Print precision, recall, accuracy and speed of the classifier and the old heuristics.
+
+    Also prints the recall on each language's code and the share of each
+    kind of prose taken for code.
+    """
+    threshold = classifier.threshold if threshold is None else threshold
+
+    start = time.perf_counter()
+    legacy = [legacy_is_code_snippet(text) for text in texts]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = classifier.probabilities(texts)
+    batch_seconds = time.perf_counter() - start
+
+    sample = texts[:500]
+    start = time.perf_counter()
+    for text in sample:
+        classifier.is_code(text, threshold)
+    single_seconds = (time.perf_counter() - start) / max(len(sample), 1) * len(texts)
+
+    print(f"{len(texts)} test samples, {int(np.sum(labels))} code")
+    print(f"{'':24}{'precision':>10}{'recall':>10}{'accuracy':>10}{'us/text':>10}")
+    rows = [
+        ("heuristics", legacy, legacy_seconds),
+        (f"classifier (batch)", probabilities >= threshold, batch_seconds),
+        (f"classifier (one by one)", probabilities >= threshold, single_seconds),
+    ]
+    for name, predictions, seconds in rows:
+        precision, recall, accuracy = _scores(predictions, labels)
+        print(f"{name:24}{precision:10.3f}{recall:10.3f}{accuracy:10.3f}{seconds / len(texts) * 1e6:10.1f}")
+    print(f"{'by kind':30}{'samples':>10}{'heuristics':>12}{'classifier':>12}")
+    kinds = np.asarray(kinds)
+    predictions = probabilities >= threshold
+    for kind in sorted(set(kinds), key=lambda value: (value in ("prose", "slides", "editor chrome"), value)):
+        selected = kinds == kind
+        # Recall for code, share wrongly taken for code for prose
+        legacy_share = np.mean(np.asarray(legacy)[selected])
+        name = f"{kind} {'recall' if np.asarray(labels)[selected][0] else 'taken for code'}"
+        print(f"{name:30}{selected.sum():10d}{legacy_share:12.3f}{np.mean(predictions[selected]):12.3f}")
+    print("classifier by threshold:")
+    for value in (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9):
+        precision, recall, accuracy = _scores(probabilities >= value, labels)
+        print(f"  {value:.1f}{precision:10.3f}{recall:10.3f}{accuracy:10.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or benchmark the code-versus-prose classifier")
+    parser.add_argument("command", choices=["train", "benchmark"])
+    parser.add_argument("--code-dir", action="append", default=[], help="Extra directory of source files")
+    parser.add_argument("--prose-dir", action="append", default=[], help="Extra directory of .txt/.md/.rst files")
+    parser.add_argument("--max-files", type=int, default=3000)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--output", default=CLASSIFIER_FILE)
+    args = parser.parse_args()
+
+    code_dirs, prose_dirs = default_dirs()
+    (train_texts, train_labels, _), (test_texts, test_labels, test_kinds) = build_corpus(
+        code_dirs + args.code_dir, prose_dirs + args.prose_dir, args.max_files
+    )
+    if args.command == "train":
+        print(f"Training on {len(train_texts)} samples ({sum(train_labels)} code)")
+        classifier = CodeClassifier.train(train_texts, train_labels, threshold=args.threshold)
+        classifier.save(args.output)
+        print(f"Saved weights to {args.output}")
+    else:
+        classifier = CodeClassifier.load(args.output)
+    benchmark(classifier, test_texts, test_labels, test_kinds, args.threshold)
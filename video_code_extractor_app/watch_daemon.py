@@ -0,0 +1,298 @@
+"""Watch-folder daemon: extracts every new recording dropped into some directories.
+
+The directories are polled, so no OS-specific file notification API is
+needed. Each poll only stats the directory entries; a file's (size, mtime)
+is cached, and a file is handed on once it has not changed for
+STABLE_SECONDS, i.e. the recorder has finished writing it. Only then is it
+fingerprinted and looked up in the ledger of processed videos (see
+database.ProcessedVideo), so files extracted before - even under another
+name or by an earlier run of the daemon - are skipped.
+
+Stable files wait in a queue for a pool of worker processes. Each worker
+loads the OCR models once when it starts and keeps them for every video it
+extracts. At most one video per worker is handed to the pool; the rest
+stays in the daemon's queue. Finished videos are added to the ledger. If
+a worker dies, the whole pool breaks; every file it was extracting is
+queued again with a new pool, up to MAX_ATTEMPTS times.
+
+Queue depth, running files and throughput are written to a JSON status
+file (STATUS_FILE) after every poll:
+
+    python watch_daemon.py /recordings/incoming [more dirs] [--workers 2]
+"""
+import collections
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".webm")
+STATUS_FILE = "watch_status.json"
+# Seconds between two scans of the watched directories
+POLL_INTERVAL = 5.0
+# Seconds a file's size and mtime must stay the same before it is extracted
+STABLE_SECONDS = 30.0
+# Concurrent extractions; each worker holds its own copy of the OCR models
+DEFAULT_WORKERS = 2
+# Bytes read from each end of a file for its fingerprint
+FINGERPRINT_BYTES = 1024 * 1024
+# Seconds of finished videos the throughput figures are computed over
+THROUGHPUT_WINDOW = 3600
+# Failures listed in the status file
+RECENT_FAILURES = 20
+# Extractions of a file lost to a dying worker before the file counts as failed
+MAX_ATTEMPTS = 3
+
+def source_fingerprint(path, size=None):
+    """Digest of a file's size and its first and last FINGERPRINT_BYTES.
+
+    Recordings are large, so they are not hashed in full; size plus both
+    ends tell different recordings apart and survive renames and copies.
+    """
+    size = os.path.getsize(path) if size is None else size
+    digest = hashlib.sha1(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > 2 * FINGERPRINT_BYTES:
+            f.seek(-FINGERPRINT_BYTES, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+def _warm_worker():
+    # Runs once per worker process, so every video it extracts finds the models loaded
+    from ocr_extractor import get_reader
+    get_reader()
+
+def _extract_file(path, options):
+    """Extract one video in a worker process; returns its counters."""
+    from database import session
+    from ocr_extractor import ExtractionControl, extract_code_from_video
+
+    control = ExtractionControl()
+    new_snippets = []
+    start = time.monotonic()
+    try:
+        extract_code_from_video(path, snippet_callback=new_snippets.append, control=control, **options)
+    finally:
+        session.remove()
+    return {"new_snippets": len(new_snippets), "frames": control.total_frames, "seconds": time.monotonic() - start}
+
+class WatchDaemon:
+    """Polls directories for new, fully written videos and extracts them in a worker pool"""
+    def __init__(self, directories, workers=DEFAULT_WORKERS, status_path=STATUS_FILE,
+                 stable_seconds=STABLE_SECONDS, options=None):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.workers = max(1, workers)
+        self.status_path = status_path
+        self.stable_seconds = stable_seconds
+        self.options = options or {}
+        self.stat_cache = {}  # Path -> [size, mtime_ns, monotonic time of the last change]
+        self.handled = {}  # Path -> (size, mtime_ns) of files already queued, processed or failed
+        self.queue = collections.deque()  # (path, fingerprint, size) waiting for a worker
+        self.running = {}  # Future -> (path, fingerprint, size)
+        self.attempts = collections.Counter()  # Fingerprint -> extractions lost to a broken pool
+        self.finished = collections.deque()  # (monotonic finish time, size, frames, seconds) within THROUGHPUT_WINDOW
+        self.completed = 0
+        self.skipped = 0
+        self.failures = collections.deque(maxlen=RECENT_FAILURES)
+        self.started_at = time.time()
+        self.executor = None
+
+    def _start_pool(self):
+        # Spawned, so workers do not inherit the database connections of this process
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker
+        )
+
+    def scan(self):
+        """Stat the watched directories; returns paths of new files that stopped changing."""
+        now = time.monotonic()
+        seen = set()
+        stable = []
+        for directory in self.directories:
+            for root, dirnames, filenames in os.walk(directory):
+                dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+                for name in filenames:
+                    if name.startswith(".") or not name.lower().endswith(VIDEO_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    seen.add(path)
+                    key = (stat.st_size, stat.st_mtime_ns)
+                    if self.handled.get(path) == key:
+                        continue
+                    cached = self.stat_cache.get(path)
+                    if cached is None or (cached[0], cached[1]) != key:
+                        self.stat_cache[path] = [stat.st_size, stat.st_mtime_ns, now]
+                    elif now - cached[2] >= self.stable_seconds and stat.st_size > 0:
+                        stable.append(path)
+        # Forget files that were deleted or moved away
+        for path in [path for path in self.stat_cache if path not in seen]:
+            del self.stat_cache[path]
+        for path in [path for path in self.handled if path not in seen]:
+            del self.handled[path]
+        return stable
+
+    def enqueue(self, path):
+        """Queue a stable file unless the ledger already has it."""
+        from database import is_video_processed
+
+        size, mtime_ns, _ = self.stat_cache.pop(path)
+        self.handled[path] = (size, mtime_ns)
+        try:
+            fingerprint = source_fingerprint(path, size)
+        except OSError as e:
+            self.failures.append({"path": path, "error": str(e)})
+            return
+        queued = {item[1] for item in self.queue} | {item[1] for item in self.running.values()}
+        if fingerprint in queued or is_video_processed(fingerprint):
+            self.skipped += 1
+            return
+        self.queue.append((path, fingerprint, size))
+
+    def dispatch(self):
+        """Hand queued files to the pool, at most one per worker."""
+        if self.executor is None:
+            self._start_pool()
+        while self.queue and len(self.running) < self.workers:
+            item = self.queue.popleft()
+            self.running[self.executor.submit(_extract_file, item[0], self.options)] = item
+
+    def collect(self):
+        """Record finished extractions in the ledger, and requeue those lost to a broken pool."""
+        from database import record_processed_video
+
+        broken = []
+        for future in [future for future in self.running if future.done()]:
+            item = self.running.pop(future)
+            path, fingerprint, size = item
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken.append(item)
+                continue
+            except Exception as e:
+                # Not retried until the file changes, so a bad file cannot block the queue
+                self.attempts.pop(fingerprint, None)
+                self.failures.append({"path": path, "error": str(e)})
+                continue
+            self.attempts.pop(fingerprint, None)
+            record_processed_video(fingerprint, path, size, result["new_snippets"], result["seconds"])
+            self.completed += 1
+            self.finished.append((time.monotonic(), size, result["frames"], result["seconds"]))
+            print(f"Extracted {path}: {result['new_snippets']} new snippets in {result['seconds']:.0f}s")
+        if broken:
+            # Futures of the broken pool that are not done yet fail the same way
+            broken.extend(self.running.values())
+            self.running.clear()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            # Any of them may have killed the worker, so all are retried; the next dispatch starts a new pool
+            retried = []
+            for item in broken:
+                path, fingerprint, _ = item
+                self.attempts[fingerprint] += 1
+                if self.attempts[fingerprint] < MAX_ATTEMPTS:
+                    retried.append(item)
+                else:
+                    del self.attempts[fingerprint]
+                    self.failures.append({"path": path, "error": f"worker died {MAX_ATTEMPTS} times"})
+            self.queue.extendleft(reversed(retried))
+
+    def status(self):
+        """Queue depth and throughput, as written to the status file."""
+        now = time.monotonic()
+        while self.finished and now - self.finished[0][0] > THROUGHPUT_WINDOW:
+            self.finished.popleft()
+        window = min(THROUGHPUT_WINDOW, max(time.time() - self.started_at, 1.0))
+        frames = sum(item[2] for item in self.finished)
+        busy_seconds = sum(item[3] for item in self.finished)
+        return {
+            "updated_at": time.time(),
+            "directories": self.directories,
+            "workers": self.workers,
+            "waiting_for_stability": len(self.stat_cache),
+            "queued": [item[0] for item in self.queue],
+            "running": [item[0] for item in self.running.values()],
+            "queue_depth": len(self.queue) + len(self.running),
+            "completed": self.completed,
+            "skipped_already_processed": self.skipped,
+            "failed": len(self.failures),
+            "recent_failures": list(self.failures),
+            "throughput": {
+                "window_seconds": round(window),
+                "videos_per_hour": len(self.finished) * 3600 / window,
+                "megabytes_per_hour": sum(item[1] for item in self.finished) / 2**20 * 3600 / window,
+                # Per worker, while extracting
+                "frames_per_second": frames / busy_seconds if busy_seconds else 0.0
+            }
+        }
+
+    def write_status(self):
+        if not self.status_path:
+            return
+        # Written under a temporary name so readers never see a partial file
+        temporary = f"{self.status_path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(temporary, self.status_path)
+
+    def poll(self):
+        """One round: collect finished work, scan, queue and dispatch, write the status."""
+        self.collect()
+        for path in self.scan():
+            self.enqueue(path)
+        self.dispatch()
+        self.write_status()
+
+    def run(self, poll_interval=POLL_INTERVAL, stop=None):
+        """Poll until stop (a threading or multiprocessing Event) is set or the process is interrupted."""
+        try:
+            while stop is None or not stop.is_set():
+                self.poll()
+                if stop is not None:
+                    stop.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.executor is not None:
+                # Running extractions finish; queued files are picked up again on the next start
+                self.executor.shutdown(wait=True, cancel_futures=True)
+                self.collect()
+            self.write_status()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract code from every new video dropped into directories")
+    parser.add_argument("directories", nargs="+")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent extractions")
+    parser.add_argument("--status", default=STATUS_FILE, help="JSON file with queue depth and throughput")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Seconds between directory scans")
+    parser.add_argument("--stable", type=float, default=STABLE_SECONDS,
+                        help="Seconds a file must stop changing before it is extracted")
+    parser.add_argument("--line-ocr", action="store_true", help="Only recognize lines that changed between frames")
+    parser.add_argument("--fusion", action="store_true", help="Fuse several native-resolution frames per sample")
+    parser.add_argument("--split-resolution", action="store_true",
+                        help="Detect text on a downscaled frame, recognize full-resolution crops")
+    parser.add_argument("--scroll-stitch", action="store_true",
+                        help="Read only newly revealed rows while scrolling, one snippet per scroll")
+    args = parser.parse_args()
+
+    daemon = WatchDaemon(
+        args.directories, args.workers, args.status, args.stable,
+        options={"incremental_ocr": args.line_ocr, "fusion": args.fusion, "split_resolution": args.split_resolution,
+                 "scroll_stitch": args.scroll_stitch}
+    )
+    print(f"Watching {', '.join(daemon.directories)} with {daemon.workers} workers")
+    daemon.run(args.interval)